@@ -3,7 +3,8 @@ Configuration settings for the Revenue Calculator application.
 
 This file contains model selection and other configuration settings.
 """
-from typing import TypedDict, List, Dict, Any
+import os
+from typing import TypedDict, List, Dict, Any, Optional
 
 class PlanConfig(TypedDict):
     name: str
@@ -129,6 +130,20 @@ BUDDY_MODEL = {
 # CURRENT_MODEL = WEB_DESIGN_MODEL  # Web Design Development Business Model
 CURRENT_MODEL = BUDDY_MODEL        # Buddy Business Model
 
+# Available models by name. The REVENUE_MODEL environment variable overrides
+# the selection above (e.g. REVENUE_MODEL=web_design python benchmark.py).
+MODELS = {
+    'web_design': WEB_DESIGN_MODEL,
+    'buddy': BUDDY_MODEL,
+}
+if os.environ.get('REVENUE_MODEL'):
+    try:
+        CURRENT_MODEL = MODELS[os.environ['REVENUE_MODEL']]
+    except KeyError:
+        raise ValueError(
+            f"Unknown REVENUE_MODEL '{os.environ['REVENUE_MODEL']}', expected one of {list(MODELS)}"
+        )
+
 # Extract hosting plans and addons for the selected model
 PLANS = CURRENT_MODEL['plans']
 ADDONS = CURRENT_MODEL['addons']
@@ -190,6 +205,16 @@ SCENARIOS = {
     "10 customers per month": 10,
 }
 
+def get_scenarios(customers: Optional[List[int]] = None) -> Dict[str, int]:
+    """Scenario label -> customers acquired per month (SCENARIOS by default)"""
+    if not customers:
+        return SCENARIOS
+    return {f"{n} customer{'' if n == 1 else 's'} per month": n for n in customers}
+
+def scenario_slug(label: str) -> str:
+    """File name form of a scenario label"""
+    return label.lower().replace(" ", "_")
+
 # Export all configuration values
 __all__ = [
     'SETUP_FEE',
@@ -201,7 +226,10 @@ __all__ = [
     'CURRENT_MODEL',
     'WEB_DESIGN_MODEL',
     'BUDDY_MODEL',
+    'MODELS',
     'REVENUE_STREAMS',
     'SCENARIOS',
-    'get_revenue_streams'
+    'get_revenue_streams',
+    'get_scenarios',
+    'scenario_slug'
 ]
@@ -0,0 +1,66 @@
+"""
+Aggregate count sampling for the Revenue Calculator.
+
+Instead of drawing every customer individually, each month's cohort is drawn
+directly as counts: a multinomial for the plan mix, a binomial per addon over
+all of the cohort's quantity slots, and a multinomial over the joint outcomes
+of the mutually exclusive SEO services. The cost per month no longer depends
+on `customers_per_month`.
+"""
+from typing import Optional, Tuple
+
+import numpy as np
+
+from model_spec import ModelSpec, CURRENT_SPEC
+from expected_value import exclusive_group_outcomes
+
+__all__ = ['CohortCountSampler']
+
+
+class CohortCountSampler:
+    """Draws per-month cohort aggregates in the schema's feature layout"""
+
+    def __init__(
+        self,
+        customers_per_month: int,
+        rng: Optional[np.random.Generator] = None,
+        spec: ModelSpec = CURRENT_SPEC
+    ):
+        self.customers_per_month = customers_per_month
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.spec = spec
+        self.n_plans = spec.n_plans
+        self.n_addons = spec.n_addons
+
+        # Mutually exclusive groups are drawn jointly, other addons independently
+        grouped = {i for group in spec.exclusive_groups for i in group}
+        self._independent = [
+            (i, spec.addon_slots[i], spec.addon_probs[i])
+            for i in range(spec.n_addons) if i not in grouped
+        ]
+        self._groups = []
+        for group in spec.exclusive_groups:
+            outcomes = exclusive_group_outcomes(spec, group)
+            values = np.array([q for q, _ in outcomes], dtype=np.int64)
+            probs = np.array([p for _, p in outcomes])
+            self._groups.append((list(group), values, probs / probs.sum()))
+
+    @property
+    def n_features(self) -> int:
+        return 1 + self.n_plans + self.n_addons
+
+    def sample(self, shape: Tuple[int, ...]) -> np.ndarray:
+        """Draw cohort aggregates for every cell of `shape` (e.g. (months,))"""
+        n = self.customers_per_month
+        features = np.zeros(tuple(shape) + (self.n_features,))
+        features[..., 0] = n
+        if self.n_plans:
+            features[..., 1:1 + self.n_plans] = self.rng.multinomial(n, self.spec.plan_probs, size=shape)
+
+        offset = 1 + self.n_plans
+        for i, slots, prob in self._independent:
+            features[..., offset + i] = self.rng.binomial(n * slots, prob, size=shape)
+        for group, values, probs in self._groups:
+            counts = self.rng.multinomial(n, probs, size=shape)
+            features[..., [offset + i for i in group]] = counts @ values
+        return features
@@ -1,30 +1,106 @@
 import pandas as pd
+import numpy as np
+from openpyxl import Workbook
 from openpyxl.utils import get_column_letter
-from typing import Dict, Any, List
+from typing import TYPE_CHECKING, Dict, Any, List, Optional, Tuple
 import os
 
+if TYPE_CHECKING:
+    from streaming_stats import TrialSummary
+
 class ExcelGenerator:
-    def __init__(self, output_file: str = "customer_revenue_breakdown.xlsx"):
+    # Frames longer than this are written in streaming mode automatically
+    STREAMING_ROW_THRESHOLD = 10_000
+    # Rows converted to Python values at a time when streaming
+    CHUNK_SIZE = 5_000
+    # Rows inspected per column when estimating its width
+    WIDTH_SAMPLE_ROWS = 1_000
+    MAX_COLUMN_WIDTH = 30
+
+    def __init__(self, output_file: str = "customer_revenue_breakdown.xlsx",
+                 streaming: Optional[bool] = None):
+        """
+        `streaming` selects openpyxl's write-only mode, which streams rows to
+        disk so peak memory does not grow with the row count. By default it is
+        enabled for frames longer than STREAMING_ROW_THRESHOLD.
+        """
         # Ensure output directory exists
         os.makedirs('output', exist_ok=True)
         # Set the output path to be in the output directory
         # e.g. output generated excel file will be in output/customer_revenue_breakdown.xlsx
         self.output_file = os.path.join('output', output_file)
+        self.streaming = streaming
+
+    def generate_excel(self, data_frames: Dict[str, pd.DataFrame],
+                       summaries: Optional[Dict[str, 'TrialSummary']] = None,
+                       bands: Tuple[float, ...] = (5, 50, 95)) -> None:
+        """Generate Excel file with multiple sheets for different scenarios.
 
-    def generate_excel(self, data_frames: Dict[str, pd.DataFrame]) -> None:
-        """Generate Excel file with multiple sheets for different scenarios"""
+        `summaries` maps scenarios to Monte Carlo TrialSummary objects; each
+        adds a '<scenario> bands' sheet with the mean and `bands` percentiles
+        of every column per month.
+        """
+        if summaries:
+            data_frames = dict(data_frames)
+            for scenario_name, summary in summaries.items():
+                # Keep the suffix within Excel's 31 character sheet name limit
+                data_frames[f"{scenario_name[:25]} bands"] = summary.band_frame(bands)
+        streaming = self.streaming
+        if streaming is None:
+            streaming = any(len(df) > self.STREAMING_ROW_THRESHOLD for df in data_frames.values())
+        if streaming:
+            self._generate_streaming(data_frames)
+        else:
+            self._generate_in_memory(data_frames)
+
+        print(f"\nExcel file generated: {os.path.abspath(self.output_file)}")
+
+    def _generate_in_memory(self, data_frames: Dict[str, pd.DataFrame]) -> None:
         with pd.ExcelWriter(self.output_file, engine='openpyxl') as writer:
             for scenario_name, df in data_frames.items():
                 sheet_name = scenario_name[:31]  # Excel sheet name limit
                 df.to_excel(writer, sheet_name=sheet_name, index=False)
-                
+
                 # Auto-adjust column widths
                 worksheet = writer.sheets[sheet_name]
                 for i, col in enumerate(df.columns, 1):
-                    max_length = max(
-                        df[col].astype(str).apply(len).max(),
-                        len(str(col))
-                    ) + 2
-                    worksheet.column_dimensions[get_column_letter(i)].width = min(max_length, 30)
-        
-        print(f"\nExcel file generated: {os.path.abspath(self.output_file)}")
\ No newline at end of file
+                    worksheet.column_dimensions[get_column_letter(i)].width = self._column_width(df, col)
+
+    def _generate_streaming(self, data_frames: Dict[str, pd.DataFrame]) -> None:
+        workbook = Workbook(write_only=True)
+        for scenario_name, df in data_frames.items():
+            worksheet = workbook.create_sheet(title=scenario_name[:31])  # Excel sheet name limit
+
+            # Column widths must be set before any row is written
+            for i, col in enumerate(df.columns, 1):
+                worksheet.column_dimensions[get_column_letter(i)].width = self._column_width(df, col)
+
+            worksheet.append([str(col) for col in df.columns])
+            for start in range(0, len(df), self.CHUNK_SIZE):
+                chunk = df.iloc[start:start + self.CHUNK_SIZE]
+                # Per-column tolist() keeps ints as ints and yields plain Python values
+                for row in zip(*(chunk[col].tolist() for col in chunk.columns)):
+                    worksheet.append(row)
+        workbook.save(self.output_file)
+
+    @classmethod
+    def _column_width(cls, df: pd.DataFrame, col: Any) -> float:
+        """Estimate a column's display width from a bounded sample of its values.
+
+        Short columns are measured in full. Longer columns are measured on
+        evenly spaced rows plus, for numeric columns, the extreme values that
+        determine the widest integer part.
+        """
+        series = df[col]
+        n = len(series)
+        if n <= cls.WIDTH_SAMPLE_ROWS:
+            sample = series
+        else:
+            rows = np.linspace(0, n - 1, cls.WIDTH_SAMPLE_ROWS).astype(np.intp)
+            if pd.api.types.is_numeric_dtype(series) and series.notna().any():
+                values = series.to_numpy()
+                rows = np.concatenate([rows, [np.nanargmax(values), np.nanargmin(values)]])
+            sample = series.iloc[rows]
+        longest = sample.astype(str).str.len().max() if n else 0
+        max_length = max(longest, len(str(col))) + 2
+        return min(max_length, cls.MAX_COLUMN_WIDTH)
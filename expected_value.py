@@ -0,0 +1,144 @@
+"""
+Closed-form expected-value engine for the Revenue Calculator.
+
+Every customer is an independent draw of the same plan/addon distribution, and
+every output column is a linear function of the customers' plan and addon
+choices (see `schema.py`). The expected value and variance of each column can
+therefore be computed from the per-customer mean vector and covariance matrix
+without any sampling.
+"""
+from itertools import product
+from math import comb
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config import MONTHS_TO_CALCULATE
+from model_spec import ModelSpec, CURRENT_SPEC
+from schema import NEW, ACTIVE, GROWTH
+
+__all__ = [
+    'quantity_pmf',
+    'exclusive_group_outcomes',
+    'customer_moments',
+    'expected_revenue'
+]
+
+# Columns that hold whole numbers in every engine
+INTEGER_COLUMNS = ("Month", "Total Customers", "New Customers")
+
+
+def quantity_pmf(slots: int, probability: float) -> List[float]:
+    """Distribution of an addon's quantity for a single customer.
+
+    Quantity-based addons get one draw per unit up to `max_quantity`, so the
+    quantity is binomial; yes/no addons are a single Bernoulli draw.
+    """
+    p = probability
+    return [comb(slots, k) * p ** k * (1 - p) ** (slots - k) for k in range(slots + 1)]
+
+
+def exclusive_group_outcomes(spec: ModelSpec, group: Tuple[int, ...]) -> List[Tuple[Tuple[int, ...], float]]:
+    """Joint quantity distribution of a group of mutually exclusive addons.
+
+    Mirrors `generate_customer_upsells`: when more than one unit is selected
+    across the group, one service is picked uniformly at random and every other
+    service is reset to zero.
+    """
+    outcomes: Dict[Tuple[int, ...], float] = {}
+    pmfs = [quantity_pmf(spec.addon_slots[i], spec.addon_probs[i]) for i in group]
+    for quantities in product(*(range(len(pmf)) for pmf in pmfs)):
+        prob = 1.0
+        for pmf, qty in zip(pmfs, quantities):
+            prob *= pmf[qty]
+        if len(group) > 1 and sum(quantities) > 1:
+            for keep in range(len(group)):
+                kept = tuple(qty if i == keep else 0 for i, qty in enumerate(quantities))
+                outcomes[kept] = outcomes.get(kept, 0.0) + prob / len(group)
+        else:
+            outcomes[quantities] = outcomes.get(quantities, 0.0) + prob
+    return sorted(outcomes.items())
+
+
+def customer_moments(spec: ModelSpec = CURRENT_SPEC) -> Tuple[np.ndarray, np.ndarray]:
+    """Mean vector and covariance matrix of a single customer's features"""
+    n_plans = spec.n_plans
+    n_features = 1 + n_plans + spec.n_addons
+    mean = np.zeros(n_features)
+    cov = np.zeros((n_features, n_features))
+    mean[0] = 1.0
+
+    # Plan choice is a single categorical draw
+    if n_plans:
+        probs = spec.plan_probs
+        plan_slice = slice(1, 1 + n_plans)
+        mean[plan_slice] = probs
+        cov[plan_slice, plan_slice] = np.diag(probs) - np.outer(probs, probs)
+
+    # Independent addons, plus exclusive groups whose members are correlated
+    offset = 1 + n_plans
+    grouped = {i for group in spec.exclusive_groups for i in group}
+    for i in range(spec.n_addons):
+        if i in grouped:
+            continue
+        pmf = np.array(quantity_pmf(spec.addon_slots[i], spec.addon_probs[i]))
+        qty = np.arange(len(pmf))
+        mean[offset + i] = pmf @ qty
+        cov[offset + i, offset + i] = pmf @ qty ** 2 - mean[offset + i] ** 2
+    for group in spec.exclusive_groups:
+        outcomes = exclusive_group_outcomes(spec, group)
+        values = np.array([q for q, _ in outcomes], dtype=np.float64)
+        probs = np.array([p for _, p in outcomes])
+        group_mean = probs @ values
+        group_cov = (values * probs[:, None]).T @ values - np.outer(group_mean, group_mean)
+        idx = [offset + i for i in group]
+        mean[idx] = group_mean
+        cov[np.ix_(idx, idx)] = group_cov
+    return mean, cov
+
+
+def expected_revenue(
+    customers_per_month: int,
+    months: int = MONTHS_TO_CALCULATE,
+    spec: ModelSpec = CURRENT_SPEC
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Expected value and variance of every output column per month.
+
+    A customer who joined in month j contributes to month m through the
+    ACTIVE weights, the NEW weights when j == m and the GROWTH weights
+    (m - j + 1) times, so the sums over cohorts reduce to closed forms.
+    """
+    schema = spec.schema
+    mean, cov = customer_moments(spec)
+    n = customers_per_month
+    m = np.arange(1, months + 1, dtype=np.float64)[:, None]
+    tri = m * (m + 1) / 2           # sum of k for k = 1..m
+    sq = m * (m + 1) * (2 * m + 1) / 6  # sum of k^2 for k = 1..m
+
+    w_new, w_act, w_grow = schema.weights[NEW], schema.weights[ACTIVE], schema.weights[GROWTH]
+    expected = n * (m * (mean @ w_act) + mean @ w_new + tri * (mean @ w_grow))
+
+    def quad(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        return np.einsum('fc,fg,gc->c', a, cov, b)
+
+    variance = n * (
+        m * quad(w_act, w_act)
+        + quad(w_new, w_new)
+        + 2 * quad(w_act, w_new)
+        + 2 * tri * quad(w_act, w_grow)
+        + sq * quad(w_grow, w_grow)
+        + 2 * quad(w_new, w_grow)
+    )
+    month_col = schema.index("Month")
+    expected[:, month_col] = m[:, 0]
+    variance[:, month_col] = 0.0
+    # Guard against tiny negative values from floating point cancellation
+    variance = np.maximum(variance, 0.0)
+
+    mean_df = pd.DataFrame(expected, columns=schema.columns)
+    var_df = pd.DataFrame(variance, columns=schema.columns)
+    for column in INTEGER_COLUMNS:
+        mean_df[column] = mean_df[column].round().astype(int)
+    var_df["Month"] = mean_df["Month"]
+    return mean_df, var_df
@@ -1,130 +1,348 @@
-import matplotlib.pyplot as plt
 import os
-from typing import Dict, List
-import pandas as pd
-from models import REVENUE_STREAMS
+import time
+from types import MethodType
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Tuple
+from model_spec import CURRENT_SPEC, ModelSpec
+
+# matplotlib and pandas are only imported once a chart is rendered, so the
+# CLI can read the chart options without paying for them
+if TYPE_CHECKING:
+    import pandas as pd
+    from matplotlib.figure import Figure
+    from streaming_stats import TrialSummary
+
+# Columns and percentiles drawn by the fan charts
+FAN_COLUMNS = ('Total Monthly Revenue', 'Total Revenue (Cumulative)')
+FAN_QUANTILES = (5, 25, 50, 75, 95)
+
+# Charts are drawn on standalone Figure objects with the Agg canvas instead
+# of pyplot's global state, so they can render safely in worker processes.
+
+def _new_figure(figsize: Tuple[float, float]) -> 'Figure':
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig
+
+def _render_revenue_breakdown(df: 'pd.DataFrame', title: str,
+                              revenue_streams: Dict[str, Dict[str, Any]],
+                              filename: str, dpi: int) -> str:
+    """Plot the revenue breakdown for a single scenario"""
+    fig = _new_figure((14, 7))
+    ax = fig.add_subplot()
+
+    # Get revenue columns and their colors from the model's revenue streams
+    revenue_columns = list(revenue_streams.keys())
+    colors = [revenue_streams[col]['color'] for col in revenue_columns]
+
+    # Plot each revenue stream
+    ax.stackplot(
+        df['Month'],
+        [df[col] for col in revenue_columns],
+        labels=[revenue_streams[col]['display_name'] for col in revenue_columns],
+        colors=colors,
+        alpha=0.7
+    )
+
+    # Add customer count on secondary y-axis
+    ax2 = ax.twinx()
+    ax2.plot(df['Month'], df['Total Customers'], 'k--', label='Total Customers', alpha=0.7)
+
+    # Formatting
+    ax.set_title(title, fontsize=14, pad=20)
+    ax.set_xlabel('Month', fontsize=12)
+    ax.set_ylabel('Monthly Revenue ($)', fontsize=12)
+    ax2.set_ylabel('Total Customers', fontsize=12)
+
+    # Add legend
+    ax.legend(loc='upper left', bbox_to_anchor=(0.01, 1.15), ncol=4)
+    ax2.legend(loc='upper right', bbox_to_anchor=(0.99, 1.15))
+
+    ax2.grid(True, alpha=0.3)
+    fig.tight_layout()
+    fig.savefig(filename, bbox_inches='tight', dpi=dpi)
+    return f"Saved chart as: {filename}"
+
+def _render_revenue_comparison(series: Dict[str, 'pd.DataFrame'], filename: str, dpi: int) -> str:
+    """Plot total monthly revenue of every scenario on one chart"""
+    fig = _new_figure((14, 8))
+    ax = fig.add_subplot()
+
+    # Plot each scenario with proper formatting
+    for label, df in series.items():
+        ax.plot(
+            df['Month'],
+            df['Total Monthly Revenue'],
+            label=f'{label} Revenue',
+            linewidth=2.5
+        )
+
+    # Format the plot
+    ax.set_xlabel('Month', fontsize=12, labelpad=10)
+    ax.set_ylabel('Total Monthly Revenue', fontsize=12, labelpad=10)
+    ax.set_title('Monthly Revenue Comparison by Scenario', fontsize=14, pad=20)
+
+    # Format y-axis to show full dollar amounts with comma separators
+    ax.yaxis.set_major_formatter('${x:,.0f}')
+
+    # Rotate y-tick labels for better readability
+    for tick in ax.get_yticklabels():
+        tick.set_rotation(45)
+        tick.set_horizontalalignment('right')
+
+    ax.legend(fontsize=10, framealpha=1, shadow=True)
+    ax.grid(True, linestyle='--', alpha=0.7)
+    fig.tight_layout()
+    fig.savefig(filename, bbox_inches='tight', dpi=dpi)
+    return f"Saved comparison chart: {filename}"
+
+def _render_cumulative_revenue(series: Dict[str, 'pd.DataFrame'], filename: str, dpi: int) -> str:
+    """Plot the cumulative revenue projection of every scenario"""
+    fig = _new_figure((14, 8))
+    ax = fig.add_subplot()
+
+    # Plot each scenario with final total in the legend
+    for label, df in series.items():
+        ax.plot(df['Month'],
+                df['Total Revenue (Cumulative)'],
+                label=f'{label} (${df["Total Revenue (Cumulative)"].iloc[-1]:,.0f} total)',
+                linewidth=2.5)
+
+    # Format the plot
+    ax.set_title('Cumulative Revenue Projection by Customer Acquisition Rate',
+                 fontsize=16, pad=20)
+    ax.set_xlabel('Month', fontsize=12, labelpad=10)
+    ax.set_ylabel('Cumulative Revenue ($)', fontsize=12, labelpad=10)
+    ax.grid(True, linestyle='--', alpha=0.7)
+    ax.legend(fontsize=10, framealpha=1, shadow=True)
+
+    # Format y-axis to show dollar values with comma separators
+    ax.yaxis.set_major_formatter('${x:,.0f}')
+
+    # Add some padding around the plot
+    fig.tight_layout()
+
+    # Save the figure
+    fig.savefig(filename, dpi=dpi, bbox_inches='tight')
+    # Ensure forward slashes in the output message for consistency
+    return f"Saved cumulative revenue projection: {filename.replace(os.sep, '/')}"
+
+def _render_fan_chart(bands: 'pd.DataFrame', column: str, title: str, filename: str, dpi: int) -> str:
+    """Plot percentile bands of one column: shaded between symmetric percentiles, median as a line.
+
+    `bands` has a Month column and one column per percentile (e.g. 5, 25, 50, 75, 95).
+    """
+    fig = _new_figure((14, 8))
+    ax = fig.add_subplot()
+    qs = sorted(q for q in bands.columns if q != 'Month')
+
+    # Outer bands first, each inner band drawn darker on top
+    pairs = [(qs[i], qs[-1 - i]) for i in range(len(qs) // 2)]
+    for depth, (low, high) in enumerate(pairs, 1):
+        ax.fill_between(bands['Month'], bands[low], bands[high], color='#1f77b4',
+                        alpha=0.15 + 0.2 * depth / len(pairs), linewidth=0,
+                        label=f'P{low:g} - P{high:g}')
+    if len(qs) % 2:
+        median = qs[len(qs) // 2]
+        ax.plot(bands['Month'], bands[median], color='#1f77b4', linewidth=2.5, label=f'P{median:g}')
+
+    ax.set_title(title, fontsize=14, pad=20)
+    ax.set_xlabel('Month', fontsize=12, labelpad=10)
+    ax.set_ylabel(column, fontsize=12, labelpad=10)
+    ax.yaxis.set_major_formatter('${x:,.0f}')
+    ax.legend(loc='upper left', fontsize=10, framealpha=1)
+    ax.grid(True, linestyle='--', alpha=0.7)
+    fig.tight_layout()
+    fig.savefig(filename, bbox_inches='tight', dpi=dpi)
+    return f"Saved fan chart: {filename}"
+
+def _render_tornado(tornado: 'pd.DataFrame', metric: str, title: str, filename: str, dpi: int) -> str:
+    """Plot one-at-a-time sensitivities as a tornado chart, largest swing on top"""
+    rows = tornado.iloc[::-1]
+    baseline = float(tornado['Baseline'].iloc[0]) if len(tornado) else 0.0
+    fig = _new_figure((12, max(3.0, 0.6 * len(rows) + 2)))
+    ax = fig.add_subplot()
+
+    # Bars start at the baseline and extend to the metric at each end of the range
+    positions = range(len(rows))
+    ax.barh(positions, rows['At Low'] - baseline, left=baseline, color='#1f77b4', alpha=0.8,
+            label='Low value')
+    ax.barh(positions, rows['At High'] - baseline, left=baseline, color='#ff7f0e', alpha=0.8,
+            label='High value')
+    ax.set_yticks(list(positions))
+    ax.set_yticklabels([
+        f"{row['Parameter']} ({row['Low Value']:,.4g} - {row['High Value']:,.4g})"
+        for _, row in rows.iterrows()
+    ])
+    ax.axvline(baseline, color='k', linewidth=1)
+
+    ax.set_title(title, fontsize=14, pad=20)
+    ax.set_xlabel(metric, fontsize=12)
+    ax.xaxis.set_major_formatter('${x:,.0f}')
+    ax.legend(loc='lower right')
+    ax.grid(True, axis='x', linestyle='--', alpha=0.7)
+    fig.tight_layout()
+    fig.savefig(filename, bbox_inches='tight', dpi=dpi)
+    return f"Saved tornado chart: {filename}"
+
+def _render_heatmap(table: 'pd.DataFrame', metric: str, title: str, filename: str, dpi: int) -> str:
+    """Plot a metric over two swept parameters (rows of `table` on the y axis)"""
+    fig = _new_figure((12, 8))
+    ax = fig.add_subplot()
+    image = ax.imshow(table.to_numpy(), origin='lower', aspect='auto', cmap='viridis')
+
+    ax.set_xticks(range(len(table.columns)))
+    ax.set_xticklabels([f'{v:,.4g}' for v in table.columns], rotation=45, ha='right')
+    ax.set_yticks(range(len(table.index)))
+    ax.set_yticklabels([f'{v:,.4g}' for v in table.index])
+    ax.set_xlabel(table.columns.name, fontsize=12)
+    ax.set_ylabel(table.index.name, fontsize=12)
+    ax.set_title(title, fontsize=14, pad=20)
+
+    colorbar = fig.colorbar(image, ax=ax)
+    colorbar.set_label(metric)
+    colorbar.formatter.set_useOffset(False)
+    fig.tight_layout()
+    fig.savefig(filename, bbox_inches='tight', dpi=dpi)
+    return f"Saved heatmap: {filename}"
+
+def _run_job(job: Tuple[Callable[..., str], tuple]) -> Tuple[str, float, float]:
+    """Render one chart; returns its message, wall time and CPU time"""
+    func, args = job
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    message = func(*args)
+    return message, time.perf_counter() - wall_start, time.process_time() - cpu_start
+
+class _default_instance_method:
+    """A method that can also be called on the class, like a staticmethod,
+    in which case it runs on an instance with the default configuration"""
+
+    def __init__(self, func: Callable[..., Any]):
+        self.func = func
+        self.__doc__ = func.__doc__
+
+    def __get__(self, instance: Any, owner: type) -> Callable[..., Any]:
+        return MethodType(self.func, instance if instance is not None else owner())
+
 
 class ChartGenerator:
-    @staticmethod
-    def generate_revenue_charts(data_frames: Dict[str, pd.DataFrame]) -> None:
+    FORMATS = ('png', 'svg', 'pdf')
+    DEFAULT_DPI = 300
+    PREVIEW_DPI = 72
+
+    def __init__(self, output_dir: str = 'output', dpi: int = DEFAULT_DPI, fmt: str = 'png',
+                 workers: int = 1, preview: bool = False, profiler=None,
+                 spec: ModelSpec = CURRENT_SPEC):
+        """
+        Configure chart rendering.
+
+        `fmt` is one of FORMATS. `preview` renders quick low-DPI PNGs.
+        `workers` > 1 renders charts in parallel worker processes.
+        `profiler` (a profiling.StageProfiler) records the time spent per chart.
+        `spec` is the model whose revenue streams are charted.
+        """
+        fmt = fmt.lower()
+        if fmt not in self.FORMATS:
+            raise ValueError(f"Unsupported chart format '{fmt}', expected one of {self.FORMATS}")
+        self.output_dir = output_dir
+        self.dpi = self.PREVIEW_DPI if preview else dpi
+        self.fmt = 'png' if preview else fmt
+        self.workers = workers
+        self.profiler = profiler
+        self.spec = spec
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.output_dir, f'{name}.{self.fmt}')
+
+    # Also callable as ChartGenerator.generate_revenue_charts(data_frames), as
+    # when it was a staticmethod, with the default output directory and format
+    @_default_instance_method
+    def generate_revenue_charts(self, data_frames: Dict[str, 'pd.DataFrame']) -> None:
         """Generate and save revenue charts for each scenario"""
-        os.makedirs('output', exist_ok=True)
-        
-        # Individual scenario charts
+        os.makedirs(self.output_dir, exist_ok=True)
+        jobs: List[Tuple[Callable[..., str], tuple]] = []
+
+        # Individual scenario charts; only the plotted columns are shipped to workers
+        revenue_streams = self.spec.revenue_streams
+        breakdown_columns = ['Month', 'Total Customers'] + list(revenue_streams.keys())
         for label, df in data_frames.items():
-            filename = f'output/revenue_breakdown_{label.lower().replace(" ", "_")}.png'
-            ChartGenerator._plot_revenue_breakdown(
-                df, 
+            filename = self._path(f'revenue_breakdown_{label.lower().replace(" ", "_")}')
+            jobs.append((_render_revenue_breakdown, (
+                df[breakdown_columns],
                 f'Monthly Revenue Breakdown - {label}',
-                filename
-            )
-        
+                revenue_streams,
+                filename,
+                self.dpi
+            )))
+
         # Combined monthly revenue comparison chart
-        plt.figure(figsize=(14, 8))
-        
-        # Plot each scenario with proper formatting
-        for label, df in data_frames.items():
-            plt.plot(
-                df['Month'], 
-                df['Total Monthly Revenue'],
-                label=f'{label} Revenue',
-                linewidth=2.5
-            )
-        
-        # Format the plot
-        plt.xlabel('Month', fontsize=12, labelpad=10)
-        plt.ylabel('Total Monthly Revenue', fontsize=12, labelpad=10)
-        plt.title('Monthly Revenue Comparison by Scenario', fontsize=14, pad=20)
-        
-        # Format y-axis to show full dollar amounts with comma separators
-        ax = plt.gca()
-        ax.yaxis.set_major_formatter('${x:,.0f}')
-        
-        # Rotate y-tick labels for better readability
-        plt.setp(ax.get_yticklabels(), rotation=45, ha='right')
-        
-        plt.legend(fontsize=10, framealpha=1, shadow=True)
-        plt.grid(True, linestyle='--', alpha=0.7)
-        plt.tight_layout()
-        plt.savefig('output/revenue_comparison.png', bbox_inches='tight', dpi=300)
-        plt.close()
-        print("Saved comparison chart: output/revenue_comparison.png")
-        
-        # Generate cumulative revenue projection chart
-        ChartGenerator._generate_cumulative_revenue_graph(data_frames)
-    
-    @staticmethod
-    def _generate_cumulative_revenue_graph(data_frames: Dict[str, pd.DataFrame]) -> None:
-        """Generate a detailed cumulative revenue projection graph"""
-        plt.figure(figsize=(14, 8))
-        
-        # Plot each scenario with final total in the legend
-        for label, df in data_frames.items():
-            plt.plot(df['Month'], 
-                    df['Total Revenue (Cumulative)'], 
-                    label=f'{label} (${df["Total Revenue (Cumulative)"].iloc[-1]:,.0f} total)',
-                    linewidth=2.5)
-        
-        # Format the plot
-        plt.title('Cumulative Revenue Projection by Customer Acquisition Rate', 
-                fontsize=16, pad=20)
-        plt.xlabel('Month', fontsize=12, labelpad=10)
-        plt.ylabel('Cumulative Revenue ($)', fontsize=12, labelpad=10)
-        plt.grid(True, linestyle='--', alpha=0.7)
-        plt.legend(fontsize=10, framealpha=1, shadow=True)
-        
-        # Format y-axis to show dollar values with comma separators
-        ax = plt.gca()
-        ax.yaxis.set_major_formatter('${x:,.0f}')
-        
-        # Add some padding around the plot
-        plt.tight_layout()
-        
-        # Save the figure
-        output_path = os.path.join('output', 'cumulative_revenue_projection.png')
-        plt.savefig(output_path, dpi=300, bbox_inches='tight')
-        plt.close()
-        # Ensure forward slashes in the output message for consistency
-        print(f"Saved cumulative revenue projection: {output_path.replace(os.sep, '/')}")
-
-    @staticmethod
-    def _plot_revenue_breakdown(df: pd.DataFrame, title: str, filename: str) -> None:
-        """Helper method to plot revenue breakdown for a single scenario"""
-        plt.figure(figsize=(14, 7))
-        
-        # Calculate one-time revenue per month (difference between cumulative values)
-        df['Monthly One-Time Revenue'] = df['One-Time Revenue (Cumulative)'].diff().fillna(df['One-Time Revenue (Cumulative)'].iloc[0])
-        
-        # Get revenue columns and their colors from REVENUE_STREAMS
-        revenue_columns = list(REVENUE_STREAMS.keys())
-        colors = [REVENUE_STREAMS[col]['color'] for col in revenue_columns]
-        
-        # Plot each revenue stream
-        ax = plt.gca()
-        ax.stackplot(
-            df['Month'],
-            [df[col] for col in revenue_columns],
-            labels=[REVENUE_STREAMS[col]['display_name'] for col in revenue_columns],
-            colors=colors,
-            alpha=0.7
-        )
-        
-        # Add customer count on secondary y-axis
-        ax2 = ax.twinx()
-        ax2.plot(df['Month'], df['Total Customers'], 'k--', label='Total Customers', alpha=0.7)
-        
-        # Formatting
-        plt.title(title, fontsize=14, pad=20)
-        ax.set_xlabel('Month', fontsize=12)
-        ax.set_ylabel('Monthly Revenue ($)', fontsize=12)
-        ax2.set_ylabel('Total Customers', fontsize=12)
-        
-        # Add legend
-        ax.legend(loc='upper left', bbox_to_anchor=(0.01, 1.15), ncol=4)
-        ax2.legend(loc='upper right', bbox_to_anchor=(0.99, 1.15))
-        
-        plt.grid(True, alpha=0.3)
-        plt.tight_layout()
-        plt.savefig(filename, bbox_inches='tight', dpi=300)
-        print(f"Saved chart as: {filename}")
-        plt.close()
+        jobs.append((_render_revenue_comparison, (
+            {label: df[['Month', 'Total Monthly Revenue']] for label, df in data_frames.items()},
+            self._path('revenue_comparison'),
+            self.dpi
+        )))
+
+        # Cumulative revenue projection chart
+        jobs.append((_render_cumulative_revenue, (
+            {label: df[['Month', 'Total Revenue (Cumulative)']] for label, df in data_frames.items()},
+            self._path('cumulative_revenue_projection'),
+            self.dpi
+        )))
+
+        self._render(jobs)
+
+    def generate_fan_charts(self, summaries: Dict[str, 'TrialSummary'],
+                            columns: Tuple[str, ...] = FAN_COLUMNS,
+                            quantiles: Tuple[float, ...] = FAN_QUANTILES) -> None:
+        """Render a fan chart of each column's percentile bands for every scenario"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        jobs: List[Tuple[Callable[..., str], tuple]] = []
+        for label, summary in summaries.items():
+            # Only the plotted percentiles of each column are shipped to workers
+            bands = summary.percentiles(quantiles)
+            for column in columns:
+                df = bands[quantiles[0]][['Month']].copy()
+                for q in quantiles:
+                    df[q] = bands[q][column]
+                slug = f'{label}_{column}'.lower().replace(' ', '_').replace('(', '').replace(')', '')
+                jobs.append((_render_fan_chart, (
+                    df, column, f'{column} Percentile Bands - {label} ({summary.trials:,} trials)',
+                    self._path(f'fan_chart_{slug}'), self.dpi
+                )))
+        self._render(jobs)
+
+    def generate_sweep_charts(self, sweep: 'pd.DataFrame', tornado: 'pd.DataFrame', metric: str,
+                              heatmap: Tuple[str, ...] = (), label: str = '') -> None:
+        """Render a parameter sweep's tornado chart and, for two parameters, its heatmap.
+
+        `heatmap` names the (x, y) parameters; the metric is averaged over any
+        other swept parameters.
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        suffix = f'_{label.lower().replace(" ", "_")}' if label else ''
+        title = f' - {label}' if label else ''
+        jobs: List[Tuple[Callable[..., str], tuple]] = [(_render_tornado, (
+            tornado, metric, f'Sensitivity of {metric}{title}', self._path(f'sweep_tornado{suffix}'), self.dpi
+        ))]
+        if heatmap:
+            x, y = heatmap
+            table = sweep.pivot_table(index=y, columns=x, values=metric, aggfunc='mean')
+            jobs.append((_render_heatmap, (
+                table, metric, f'{metric} by {y} and {x}{title}', self._path(f'sweep_heatmap{suffix}'), self.dpi
+            )))
+        self._render(jobs)
+
+    def _render(self, jobs: List[Tuple[Callable[..., str], tuple]]) -> None:
+        """Render jobs serially or in worker processes, printing in job order"""
+        if self.workers > 1 and len(jobs) > 1:
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(jobs))) as pool:
+                results = list(pool.map(_run_job, jobs))
+        else:
+            results = [_run_job(job) for job in jobs]
+        for (func, args), (message, wall, cpu) in zip(jobs, results):
+            if self.profiler is not None:
+                # The output filename is the second-to-last argument of every job
+                self.profiler.add(f"chart:{os.path.basename(args[-2])}", wall, cpu)
+            print(message)
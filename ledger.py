@@ -0,0 +1,180 @@
+"""
+Chunked per-customer ledger export.
+
+A LedgerSink receives every cohort of customers as the calculator simulates
+it and writes one record per customer: an id, the month joined, the plan, the
+quantity of every addon and the `get_upsell_description` text. Records are
+buffered in fixed-size typed arrays and written a chunk at a time, so memory
+stays flat however many customers are simulated:
+
+    with open_ledger('output/ledger.csv', spec) as ledger:
+        RevenueCalculator(1000, 120, seed=1, ledger=ledger).calculate_results()
+
+CSV is written with the standard library; Parquet requires pyarrow.
+"""
+import abc
+import csv
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from model_spec import ModelSpec, CURRENT_SPEC
+from models import CustomerUpsells, get_upsell_description
+
+__all__ = ['LedgerSink', 'CSVLedger', 'ParquetLedger', 'open_ledger', 'LEDGER_FORMATS']
+
+# Customers buffered before a chunk is written
+DEFAULT_CHUNK_ROWS = 65_536
+
+LEDGER_FORMATS = ('csv', 'parquet')
+
+
+class LedgerSink(abc.ABC):
+    """Buffers customer records and writes them in chunks; subclasses write the chunks"""
+
+    def __init__(self, path: str, spec: ModelSpec = CURRENT_SPEC, chunk_rows: int = DEFAULT_CHUNK_ROWS):
+        if chunk_rows < 1:
+            raise ValueError(f"chunk_rows must be at least 1, got {chunk_rows}")
+        self.path = path
+        self.spec = spec
+        self.chunk_rows = chunk_rows
+        self.rows_written = 0
+        self.chunks_written = 0
+        self._month = np.zeros(chunk_rows, dtype=np.int32)
+        self._plan = np.zeros(chunk_rows, dtype=np.int64)
+        self._quantities = np.zeros((chunk_rows, spec.n_addons), dtype=np.int64)
+        self._size = 0
+        # Few distinct addon combinations occur, so their descriptions are reused
+        self._descriptions: Dict[bytes, str] = {}
+        self.closed = False
+
+    @property
+    def columns(self) -> List[str]:
+        return ['customer', 'month_joined', 'plan', *self.spec.addon_names, 'upsells']
+
+    def write(self, month_joined: np.ndarray, plan_index: np.ndarray, quantities: np.ndarray) -> None:
+        """Add a batch of customers (e.g. one month's cohort of a CustomerTable)"""
+        if self.closed:
+            raise ValueError(f"Ledger {self.path} is closed")
+        start, total = 0, len(month_joined)
+        while start < total:
+            take = min(self.chunk_rows - self._size, total - start)
+            rows = slice(self._size, self._size + take)
+            self._month[rows] = month_joined[start:start + take]
+            self._plan[rows] = plan_index[start:start + take]
+            self._quantities[rows] = quantities[start:start + take]
+            self._size += take
+            start += take
+            if self._size == self.chunk_rows:
+                self.flush()
+
+    def flush(self) -> None:
+        """Write the buffered customers"""
+        if not self._size:
+            return
+        n = self._size
+        first = self.rows_written
+        self._write_chunk(np.arange(first + 1, first + n + 1), self._month[:n], self._plan[:n],
+                          self._quantities[:n], self._describe(self._quantities[:n]))
+        self.rows_written += n
+        self.chunks_written += 1
+        self._size = 0
+
+    def _describe(self, quantities: np.ndarray) -> List[str]:
+        descriptions = []
+        for row in quantities:
+            key = row.tobytes()
+            text = self._descriptions.get(key)
+            if text is None:
+                text = get_upsell_description(CustomerUpsells(row.tolist(), self.spec))
+                self._descriptions[key] = text
+            descriptions.append(text)
+        return descriptions
+
+    @abc.abstractmethod
+    def _write_chunk(self, customer: np.ndarray, month_joined: np.ndarray, plan_index: np.ndarray,
+                     quantities: np.ndarray, descriptions: List[str]) -> None:
+        """Write one chunk of customers"""
+
+    def close(self) -> None:
+        """Write the remaining customers and close the file"""
+        if not self.closed:
+            self.flush()
+            self._close()
+            self.closed = True
+
+    def _close(self) -> None:
+        pass
+
+    def __enter__(self) -> 'LedgerSink':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class CSVLedger(LedgerSink):
+    """Ledger written as a CSV file"""
+
+    def __init__(self, path: str, spec: ModelSpec = CURRENT_SPEC, chunk_rows: int = DEFAULT_CHUNK_ROWS):
+        super().__init__(path, spec, chunk_rows)
+        self._file = open(path, 'w', newline='')
+        self._writer = csv.writer(self._file, lineterminator='\n')
+        self._writer.writerow(self.columns)
+
+    def _write_chunk(self, customer, month_joined, plan_index, quantities, descriptions) -> None:
+        plans = [self.spec.plan_names[i] for i in plan_index.tolist()]
+        self._writer.writerows(zip(
+            customer.tolist(), month_joined.tolist(), plans, *quantities.T.tolist(), descriptions
+        ))
+
+    def _close(self) -> None:
+        self._file.close()
+
+
+class ParquetLedger(LedgerSink):
+    """Ledger written as a Parquet file, one row group per chunk (requires pyarrow)"""
+
+    def __init__(self, path: str, spec: ModelSpec = CURRENT_SPEC, chunk_rows: int = DEFAULT_CHUNK_ROWS):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet ledgers require pyarrow (pip install pyarrow)") from None
+        super().__init__(path, spec, chunk_rows)
+        self._pa = pa
+        fields = [
+            ('customer', pa.int64()),
+            ('month_joined', pa.int32()),
+            ('plan', pa.dictionary(pa.int8(), pa.string())),
+        ]
+        fields += [(name, pa.int64()) for name in spec.addon_names]
+        fields.append(('upsells', pa.string()))
+        self._schema = pa.schema(fields)
+        self._writer = pq.ParquetWriter(path, self._schema)
+
+    def _write_chunk(self, customer, month_joined, plan_index, quantities, descriptions) -> None:
+        pa = self._pa
+        plans = pa.DictionaryArray.from_arrays(pa.array(plan_index.astype(np.int8)),
+                                               pa.array(list(self.spec.plan_names), pa.string()))
+        arrays = [pa.array(customer), pa.array(month_joined), plans]
+        arrays += [pa.array(quantities[:, i]) for i in range(self.spec.n_addons)]
+        arrays.append(pa.array(descriptions, pa.string()))
+        self._writer.write_table(pa.Table.from_arrays(arrays, schema=self._schema))
+
+    def _close(self) -> None:
+        self._writer.close()
+
+
+def open_ledger(path: str, spec: ModelSpec = CURRENT_SPEC, chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                fmt: Optional[str] = None) -> LedgerSink:
+    """Open a CSV or Parquet ledger, chosen by `fmt` or the file extension"""
+    if fmt is None:
+        fmt = 'parquet' if os.path.splitext(path)[1].lower() in ('.parquet', '.pq') else 'csv'
+    if fmt not in LEDGER_FORMATS:
+        raise ValueError(f"Unknown ledger format '{fmt}', expected one of {LEDGER_FORMATS}")
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    return ParquetLedger(path, spec, chunk_rows) if fmt == 'parquet' else CSVLedger(path, spec, chunk_rows)
@@ -1,31 +1,566 @@
-import pandas as pd
+"""
+Command line interface of the Revenue Calculator.
+
+    python main.py [all]       simulate every scenario, write the Excel report and charts
+    python main.py simulate    simulate and print the results (csv, table) or save them (npz)
+    python main.py excel       simulate and write the Excel report
+    python main.py charts      simulate and render the charts
+    python main.py sweep       evaluate a grid of prices/probabilities (see sweep.py)
+
+`--model web_design buddy` runs several business models in one process; each
+model's reports are written to its own file or directory.
+
+pandas, openpyxl and matplotlib are only imported by the stages that need them,
+so `python main.py simulate --format csv` starts without loading them.
+"""
+import argparse
 import os
-from revenue_calculator import RevenueCalculator
-from excel import ExcelGenerator
+import sys
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, Tuple
+from config import MONTHS_TO_CALCULATE, MODELS, get_scenarios, scenario_slug
+from profiling import StageProfiler, peak_rss_bytes
+from result_cache import ResultCache, cached_results
+from ledger import LEDGER_FORMATS
 from generate_charts import ChartGenerator
-from config import MONTHS_TO_CALCULATE, SCENARIOS
 
-def main():
+if TYPE_CHECKING:
+    import pandas as pd
+    from results import ResultTable
+    from streaming_stats import TrialSummary
+
+COMMANDS = ('simulate', 'excel', 'charts', 'sweep', 'all')
+OUTPUT_FORMATS = ('csv', 'table', 'npz')
+MODES = ('sample', 'expected', 'counts', 'scale')
+
+def run_scenario(label: str, rate: int, seed: Optional[int], months: int = MONTHS_TO_CALCULATE,
+                 mode: str = 'sample', profile_months: bool = False,
+                 cache: Optional[ResultCache] = None,
+                 model: Optional[str] = None,
+                 ledger_path: Optional[str] = None,
+                 memory_limit: Optional[int] = None) -> Tuple[str, 'ResultTable', Dict[str, Any]]:
+    """Calculate revenue for a single scenario (runs in a worker process).
+
+    `model` is a name in config.MODELS (default: the current model). Seeded
+    runs are looked up in `cache` first. With `ledger_path`, every customer is
+    streamed to that CSV/Parquet ledger and the cache is bypassed.
+    `memory_limit` caps the working memory (bytes) of 'scale' mode. Returns the
+    scenario label, its raw results and timing statistics.
+    """
+    from revenue_calculator import RevenueCalculator
+    from model_spec import get_spec
+    month_seconds = []
+    ledger = None
+    if ledger_path is not None:
+        from ledger import open_ledger
+        ledger = open_ledger(ledger_path, get_spec(model))
+    calculator = RevenueCalculator(
+        customers_per_month=rate,
+        months=months,
+        mode=mode,
+        seed=seed,
+        month_hook=StageProfiler.month_hook(month_seconds) if profile_months else None,
+        model=model,
+        ledger=ledger,
+        memory_limit=memory_limit
+    )
+    hits_before = cache.hits if cache is not None else 0
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    try:
+        results = cached_results(calculator, cache)
+    finally:
+        if ledger is not None:
+            ledger.close()
+    stats = {
+        'scenario': label,
+        'model': calculator.spec.name,
+        'customers_per_month': rate,
+        'total_customers': int(results['Total Customers'][-1]) if len(results) else 0,
+        'cache_hit': cache is not None and cache.hits > hits_before,
+        'wall_seconds': time.perf_counter() - wall_start,
+        'cpu_seconds': time.process_time() - cpu_start,
+        'simulation_seconds': calculator.timings.get('simulation'),
+        'peak_rss_bytes': peak_rss_bytes(),
+        'pid': os.getpid(),
+    }
+    if len(calculator.customers):
+        # Memory of the struct-of-arrays customer store ('sample' mode)
+        memory = calculator.customers.memory_report()
+        stats['customer_table_bytes'] = memory['bytes_allocated']
+        stats['customer_table_bytes_per_customer'] = memory['bytes_per_customer']
+    if profile_months:
+        stats['month_seconds'] = month_seconds
+    return label, results, stats
+
+def _add_common_options(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="Number of worker processes used to run scenarios (default: 1)"
+    )
+    parser.add_argument(
+        "--seed", type=int, default=None,
+        help="Master seed; each scenario gets an independent stream derived from it"
+    )
+    parser.add_argument(
+        "--model", nargs='+', choices=list(MODELS), default=None, metavar="MODEL",
+        help=f"Business models to run, from {list(MODELS)} (default: the one selected in config.py)"
+    )
+    parser.add_argument(
+        "--customers", type=int, nargs='+', metavar="N", default=None,
+        help="Customers acquired per month, one scenario each (default: config.SCENARIOS)"
+    )
+    parser.add_argument(
+        "--months", type=int, default=MONTHS_TO_CALCULATE,
+        help=f"Months to simulate (default: {MONTHS_TO_CALCULATE})"
+    )
+    parser.add_argument(
+        "--mode", choices=MODES, default='sample',
+        help="sample: one random path; expected: exact expected values; counts: aggregate draws; "
+             "scale: every customer drawn in memory-capped chunks (see --memory-limit)"
+    )
+    parser.add_argument(
+        "--memory-limit", type=int, default=None, metavar="MB",
+        help="Working memory cap of --mode scale per scenario (default: 256)"
+    )
+    parser.add_argument(
+        "--cache-dir", default=os.path.join("output", "cache"),
+        help="Directory of cached scenario results for seeded runs (default: output/cache)"
+    )
+    parser.add_argument(
+        "--cache-size", type=int, default=ResultCache.DEFAULT_MAX_BYTES // 2**20, metavar="MB",
+        help="Size budget of the result cache; least recently used entries are evicted"
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help="Always re-simulate, bypassing the result cache"
+    )
+    parser.add_argument(
+        "--ledger", metavar="DIR", default=None,
+        help="Stream every simulated customer to one ledger file per scenario in DIR (sample or scale mode)"
+    )
+    parser.add_argument(
+        "--ledger-format", choices=LEDGER_FORMATS, default="csv",
+        help="File format of the customer ledgers (default: csv; parquet requires pyarrow)"
+    )
+    _add_profile_options(parser)
+
+def _add_profile_options(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--profile", metavar="PATH", nargs="?", const="output/profile.json", default=None,
+        help="Write per-stage timings as JSON/Chrome trace (default: output/profile.json)"
+    )
+    parser.add_argument(
+        "--profile-months", action="store_true",
+        help="Also record the time spent on each simulated month (with --profile)"
+    )
+    parser.add_argument(
+        "--cprofile", metavar="PATH", default=None,
+        help="Dump cProfile statistics of the whole run to PATH"
+    )
+
+def _add_chart_options(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--chart-format", choices=ChartGenerator.FORMATS, default="png",
+        help="File format of the generated charts (default: png)"
+    )
+    parser.add_argument(
+        "--chart-dpi", type=int, default=ChartGenerator.DEFAULT_DPI,
+        help=f"Resolution of raster charts (default: {ChartGenerator.DEFAULT_DPI})"
+    )
+    parser.add_argument(
+        "--preview", action="store_true",
+        help="Render quick low-resolution PNG charts"
+    )
+
+def _add_band_options(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--bands", type=int, metavar="TRIALS", default=0,
+        help="Also simulate TRIALS Monte Carlo trials per scenario and report P5/P50/P95 "
+             "bands (Excel sheets and fan charts) from streaming statistics, with the scenarios "
+             "drawn from common random numbers and the variance reduction this achieves"
+    )
+
+def parse_args(argv=None) -> argparse.Namespace:
+    argv = list(sys.argv[1:] if argv is None else argv)
+    # Without a subcommand, run the full pipeline (the original behavior)
+    if not argv or (argv[0] not in COMMANDS and argv[0] not in ('-h', '--help')):
+        argv.insert(0, 'all')
+
+    parser = argparse.ArgumentParser(description="Expected revenue calculator")
+    subparsers = parser.add_subparsers(dest="command", metavar="COMMAND")
+
+    simulate_parser = subparsers.add_parser(
+        "simulate", help="Simulate the scenarios and output the results"
+    )
+    _add_common_options(simulate_parser)
+    simulate_parser.add_argument(
+        "--format", choices=OUTPUT_FORMATS, default="csv",
+        help="csv or table (printed or written to --output), npz (one file per scenario)"
+    )
+    simulate_parser.add_argument(
+        "--output", metavar="PATH", default=None,
+        help="Output file (csv, table) or directory (npz); default: standard output"
+    )
+
+    excel_parser = subparsers.add_parser(
+        "excel", help="Simulate the scenarios and write the Excel report"
+    )
+    _add_common_options(excel_parser)
+    _add_band_options(excel_parser)
+
+    charts_parser = subparsers.add_parser(
+        "charts", help="Simulate the scenarios and render the charts"
+    )
+    _add_common_options(charts_parser)
+    _add_chart_options(charts_parser)
+    _add_band_options(charts_parser)
+
+    sweep_parser = subparsers.add_parser(
+        "sweep", help="Evaluate the model over a grid of prices, fees and probabilities"
+    )
+    sweep_parser.add_argument(
+        "--param", action="append", required=True, metavar="NAME=RANGE",
+        help="Parameter and values, e.g. setup_fee=1500:3000:7 (start:stop:count), "
+             "plan.pro.probability=0.2,0.3 or addon.analytics.price=47; repeat for a grid"
+    )
+    sweep_parser.add_argument(
+        "--model", choices=list(MODELS), default=None,
+        help="Business model to sweep (default: the one selected in config.py)"
+    )
+    sweep_parser.add_argument(
+        "--customers", type=int, nargs='+', metavar="N", default=None,
+        help="Customers acquired per month, one sweep each (default: config.SCENARIOS)"
+    )
+    sweep_parser.add_argument(
+        "--months", type=int, default=MONTHS_TO_CALCULATE,
+        help=f"Months to simulate; metrics are reported at the last one (default: {MONTHS_TO_CALCULATE})"
+    )
+    sweep_parser.add_argument(
+        "--trials", type=int, default=0,
+        help="Monte Carlo trials per point from common random numbers (default: 0, exact expected values)"
+    )
+    sweep_parser.add_argument(
+        "--seed", type=int, default=None,
+        help="Seed of the common random numbers (with --trials)"
+    )
+    sweep_parser.add_argument(
+        "--metric", nargs='+', default=None, metavar="COLUMN",
+        help="Output columns to report; the first one is charted "
+             "(default: Total Revenue (Cumulative), Total Monthly Revenue)"
+    )
+    sweep_parser.add_argument(
+        "--heatmap", nargs=2, metavar=("X", "Y"), default=None,
+        help="Parameters on the heatmap axes (default: the first two --param)"
+    )
+    sweep_parser.add_argument(
+        "--output", metavar="PATH", default=os.path.join("output", "sweep.csv"),
+        help="CSV file of the sweep; the tornado table is written next to it (default: output/sweep.csv)"
+    )
+    sweep_parser.add_argument(
+        "--no-charts", action="store_true",
+        help="Only write the tables, without the tornado chart and heatmap"
+    )
+    _add_chart_options(sweep_parser)
+    _add_profile_options(sweep_parser)
+
+    all_parser = subparsers.add_parser(
+        "all", help="Write the Excel report and the charts (default)"
+    )
+    _add_common_options(all_parser)
+    _add_chart_options(all_parser)
+    _add_band_options(all_parser)
+
+    args = parser.parse_args(argv)
+    if args.command == 'simulate' and args.format == 'npz' and not args.output:
+        parser.error("--format npz requires --output DIRECTORY")
+    if getattr(args, 'ledger', None) and args.mode not in ('sample', 'scale'):
+        parser.error(f"--ledger requires --mode sample or scale, got {args.mode}")
+    if getattr(args, 'memory_limit', None) is not None and args.mode != 'scale':
+        parser.error(f"--memory-limit requires --mode scale, got {args.mode}")
+    if getattr(args, 'memory_limit', None) is not None and args.memory_limit < 1:
+        parser.error(f"--memory-limit must be at least 1 MB, got {args.memory_limit}")
+    if getattr(args, 'ledger', None) and args.ledger_format == 'parquet':
+        import importlib.util
+        if importlib.util.find_spec('pyarrow') is None:
+            parser.error("--ledger-format parquet requires pyarrow (pip install pyarrow)")
+    if args.command == 'sweep':
+        from model_spec import get_spec
+        from sweep import parse_range, sweep_parameters
+        try:
+            args.param = dict(parse_range(text) for text in args.param)
+        except ValueError as e:
+            parser.error(str(e))
+        valid = sweep_parameters(get_spec(args.model))
+        unknown = [name for name in args.param if name not in valid]
+        if unknown:
+            parser.error(f"Unknown parameters {unknown}, expected some of {valid}")
+        if args.heatmap and any(name not in args.param for name in args.heatmap):
+            parser.error(f"--heatmap parameters must be swept with --param, got {args.heatmap}")
+    return args
+
+def simulate(args: argparse.Namespace, profiler: StageProfiler,
+             log: Callable[[str], None] = print) -> Dict[Optional[str], Dict[str, 'ResultTable']]:
+    """Run every model x scenario, in worker processes when requested.
+
+    Returns the results per model name (None for the current model) and scenario.
+    """
+    from seeding import derive_seed, new_master_seed
 
     # Scenarios: number of customers acquired per month
-    scenarios = SCENARIOS
+    scenarios = get_scenarios(args.customers)
+
+    # Every scenario and model gets the same seed derived from the master
+    # seed (common random numbers): scenarios start from the same random
+    # stream, so comparisons between them carry less noise, and results do
+    # not depend on the worker count or scheduling order. The --bands trials
+    # share their draws customer by customer (see summarize_bands).
+    # Without --seed a single process keeps using the global random state.
+    master_seed = args.seed
+    if master_seed is None and args.workers > 1:
+        master_seed = new_master_seed()
+    if master_seed is not None:
+        log(f"Master seed: {master_seed}")
+    scenario_seed = derive_seed(master_seed, 'scenarios') if master_seed is not None else None
+    seeds = {label: scenario_seed for label in scenarios}
+    profile_months = args.profile is not None and args.profile_months
+
+    # Only reproducible runs (explicitly seeded or expected values) are cached
+    cache = None
+    if (args.seed is not None or args.mode == 'expected') and not args.no_cache:
+        cache = ResultCache(args.cache_dir, args.cache_size * 2**20)
+
+    # Calculate revenue for all models and scenarios
+    models = args.model or [None]
+    jobs = [
+        (label, rate, seeds[label], args.months, args.mode, profile_months, cache, model,
+         _ledger_path(args, model, label),
+         args.memory_limit * 2**20 if args.memory_limit is not None else None)
+        for model in models
+        for label, rate in scenarios.items()
+    ]
+    with profiler.stage('simulate', scenarios=len(jobs), workers=args.workers):
+        if args.workers > 1:
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(max_workers=args.workers) as pool:
+                futures = [pool.submit(run_scenario, *job) for job in jobs]
+                outcomes = [future.result() for future in futures]
+        else:
+            outcomes = [run_scenario(*job) for job in jobs]
 
-    # Calculate revenue for all scenarios
-    dfs = {}
+    results = {model: {} for model in models}
+    for job, (label, table, stats) in zip(jobs, outcomes):
+        model = job[7]
+        results[model][label] = table
+        profiler.add(f"scenario:{label}" if model is None else f"scenario:{model}/{label}", **stats)
+    if cache is not None:
+        hits = sum(stats['cache_hit'] for _, _, stats in outcomes)
+        log(f"Result cache: {hits}/{len(outcomes)} scenarios loaded from {args.cache_dir}")
+    return results
+
+def _ledger_path(args: argparse.Namespace, model: Optional[str], label: str) -> Optional[str]:
+    """Ledger file of a scenario (the --ledger option)"""
+    if not args.ledger:
+        return None
+    prefix = f"{model}_" if model else ""
+    return os.path.join(args.ledger, f"{prefix}{scenario_slug(label)}.{args.ledger_format}")
+
+def summarize_bands(args: argparse.Namespace, model: Optional[str]
+                    ) -> Tuple[Dict[str, 'TrialSummary'], Optional['pd.DataFrame']]:
+    """Monte Carlo percentile bands of every scenario (the --bands option).
+
+    The scenarios are simulated from common random numbers: trial i of every
+    scenario shares its draws. Also returns the variance reduction this
+    achieves for the differences between scenarios (None for one scenario).
+    """
+    from model_spec import get_spec
+    from monte_carlo import summarize_scenarios
+    from seeding import derive_seed
+    from variance_reduction import report_columns, scenario_differences
+    spec = get_spec(model)
+    # Independent of the scenarios' single runs, but reproducible with --seed
+    seed = derive_seed(args.seed, 'bands') if args.seed is not None else None
+    columns = report_columns(spec)
+    summaries, final = summarize_scenarios(get_scenarios(args.customers), args.bands, args.months,
+                                           seed, spec, paired_columns=columns)
+    reduction = scenario_differences(final, columns) if len(final) > 1 else None
+    return summaries, reduction
+
+def write_results(results: Dict[Optional[str], Dict[str, 'ResultTable']], fmt: str,
+                  output: Optional[str]) -> None:
+    """Output the results of the `simulate` command"""
+    # Results are only labelled by model when several models were run
+    multiple = len(results) > 1
+    if fmt == 'npz':
+        for model, tables in results.items():
+            directory = os.path.join(output, model) if multiple else output
+            os.makedirs(directory, exist_ok=True)
+            for label, table in tables.items():
+                path = os.path.join(directory, f'{scenario_slug(label)}.npz')
+                table.to_npz(path)
+                print(f"Saved results: {path}", file=sys.stderr)
+        return
+
+    # Models can have different columns; a combined CSV uses all of them
+    columns = []
+    for tables in results.values():
+        for table in tables.values():
+            columns.extend(c for c in table.columns if c not in columns)
+
+    out = open(output, 'w', newline='') if output else sys.stdout
+    try:
+        header = True
+        for model, tables in results.items():
+            for label, table in tables.items():
+                if fmt == 'csv':
+                    # One table for everything, with leading Model/Scenario columns
+                    prefix = {'Model': model, 'Scenario': label} if multiple else {'Scenario': label}
+                    table.to_csv(out, prefix=prefix, header=header, columns=columns)
+                    header = False
+                else:
+                    title = f"{model}: {label}" if multiple else label
+                    out.write(f"== {title} ==\n{table.to_frame().to_string(index=False)}\n\n")
+    finally:
+        if output:
+            out.close()
+
+def run_sweep(args: argparse.Namespace, profiler: StageProfiler) -> None:
+    """Run the `sweep` command: one grid per scenario, written as tidy tables"""
+    import pandas as pd
+    from sweep import DEFAULT_METRICS, ParameterSweep
+
+    metrics = args.metric or list(DEFAULT_METRICS)
+    scenarios = get_scenarios(args.customers)
+    sweeps, tornados = [], []
     for label, rate in scenarios.items():
-        calculator = RevenueCalculator(customers_per_month=rate, months=MONTHS_TO_CALCULATE)
-        dfs[label] = calculator.calculate_revenue()
-    
-    # Generate Excel and charts
-    excel_generator = ExcelGenerator()
-    excel_generator.generate_excel(dfs)
-    
-    # Generate charts using ChartGenerator
-    chart_generator = ChartGenerator()
-    chart_generator.generate_revenue_charts(dfs)
-    
-    print("\nAll reports and charts have been generated successfully!")
-    print("Charts saved in the 'output' directory")
+        sweep = ParameterSweep(args.param, rate, args.months, trials=args.trials, seed=args.seed,
+                               model=args.model, metrics=metrics)
+        with profiler.stage('sweep', scenario=label, points=sweep.size, trials=args.trials):
+            df = sweep.run()
+            tornado = sweep.tornado()
+        print(f"{label}: evaluated {sweep.size} points")
+        df.insert(0, 'Customers per Month', rate)
+        tornado.insert(0, 'Customers per Month', rate)
+        sweeps.append(df)
+        tornados.append(tornado)
+
+        if not args.no_charts:
+            heatmap = args.heatmap or list(args.param)[:2]
+            with profiler.stage('charts', scenario=label):
+                chart_generator = ChartGenerator(
+                    dpi=args.chart_dpi,
+                    fmt=args.chart_format,
+                    preview=args.preview,
+                    profiler=profiler,
+                    spec=sweep.spec
+                )
+                chart_generator.generate_sweep_charts(
+                    df, tornado, metrics[0],
+                    heatmap=tuple(heatmap) if len(heatmap) == 2 else (),
+                    label=label if len(scenarios) > 1 else ''
+                )
+
+    with profiler.stage('output', format='csv'):
+        os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+        root, ext = os.path.splitext(args.output)
+        tornado_path = f"{root}_tornado{ext or '.csv'}"
+        pd.concat(sweeps, ignore_index=True).to_csv(args.output, index=False)
+        pd.concat(tornados, ignore_index=True).to_csv(tornado_path, index=False)
+    print(f"Saved sweep: {args.output}")
+    print(f"Saved sensitivities: {tornado_path}")
+
+def run(args: argparse.Namespace, profiler: StageProfiler) -> None:
+    if args.command == 'sweep':
+        run_sweep(args, profiler)
+        return
+
+    # simulate keeps standard output for its data
+    stream = sys.stderr if args.command == 'simulate' else sys.stdout
+
+    def log(message: str) -> None:
+        print(message, file=stream)
+
+    results = simulate(args, profiler, log)
+
+    if args.command == 'simulate':
+        with profiler.stage('output', format=args.format):
+            write_results(results, args.format, args.output)
+        return
+
+    from model_spec import get_spec
+    multiple = len(results) > 1
+    for model, tables in results.items():
+        # The reports are presented from rounded DataFrames
+        with profiler.stage('dataframes', model=model):
+            dfs = {label: table.to_frame() for label, table in tables.items()}
+
+        # Monte Carlo percentile bands, kept as streaming statistics
+        summaries, reduction = {}, None
+        if args.bands:
+            with profiler.stage('bands', model=model, trials=args.bands):
+                summaries, reduction = summarize_bands(args, model)
+            if reduction is not None:
+                import pandas as pd
+                with pd.option_context('display.width', 200, 'display.max_columns', None,
+                                       'display.float_format', '{:,.2f}'.format):
+                    log(f"\nVariance reduction of scenario differences from common random numbers"
+                        f"{f' ({model})' if multiple else ''}:\n{reduction.to_string(index=False)}")
+
+        # Generate Excel report (one workbook per model when several are run)
+        if args.command in ('excel', 'all'):
+            from excel import ExcelGenerator
+            with profiler.stage('excel', model=model, sheets=len(dfs),
+                                rows=sum(len(df) for df in dfs.values())):
+                excel_generator = (
+                    ExcelGenerator(f"customer_revenue_breakdown_{model}.xlsx") if multiple
+                    else ExcelGenerator()
+                )
+                sheets = dfs if reduction is None else {**dfs, 'Variance Reduction': reduction}
+                excel_generator.generate_excel(sheets, summaries)
+
+        # Generate charts using ChartGenerator (in output/<model>/ when several are run)
+        if args.command in ('charts', 'all'):
+            with profiler.stage('charts', model=model, workers=args.workers):
+                chart_generator = ChartGenerator(
+                    output_dir=os.path.join('output', model) if multiple else 'output',
+                    dpi=args.chart_dpi,
+                    fmt=args.chart_format,
+                    workers=args.workers,
+                    preview=args.preview,
+                    profiler=profiler,
+                    spec=get_spec(model)
+                )
+                chart_generator.generate_revenue_charts(dfs)
+                if summaries:
+                    chart_generator.generate_fan_charts(summaries)
+
+def main(argv=None):
+    args = parse_args(argv)
+    profiler = StageProfiler()
+
+    cprofiler = None
+    if args.cprofile:
+        import cProfile
+        cprofiler = cProfile.Profile()
+        cprofiler.enable()
+    try:
+        run(args, profiler)
+    finally:
+        if cprofiler is not None:
+            cprofiler.disable()
+            cprofiler.dump_stats(args.cprofile)
+            print(f"cProfile statistics saved: {args.cprofile}", file=sys.stderr)
+
+    if args.profile:
+        profiler.write(args.profile)
+        print(f"Profile saved: {args.profile}", file=sys.stderr)
+
+    if args.command == 'all':
+        print("\nAll reports and charts have been generated successfully!")
+        print("Charts saved in the 'output' directory")
+    elif args.command == 'excel':
+        print("\nExcel report generated successfully!")
+    elif args.command == 'charts':
+        print("\nCharts saved in the 'output' directory")
 
 if __name__ == "__main__":
     main()
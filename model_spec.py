@@ -0,0 +1,221 @@
+"""
+Compiled, immutable view of a business model.
+
+The raw model definitions in `config.py` are lists of dicts, which are
+convenient to edit but slow to consult inside simulation loops. A ModelSpec
+is compiled once per model and holds everything the calculation paths need
+as NumPy vectors (for the vectorized engines) and plain tuples (for the
+per-customer engine), plus a name -> index map for addons.
+"""
+from dataclasses import dataclass
+from functools import cached_property
+from itertools import accumulate
+from types import MappingProxyType
+from typing import Dict, List, Any, Mapping, Tuple, Union
+
+import numpy as np
+
+from config import (
+    SETUP_FEE,
+    ANNUAL_DOMAIN_COST,
+    MONTHLY_DOMAIN_COST,
+    CURRENT_MODEL,
+    MODELS
+)
+
+__all__ = [
+    'EXCLUSIVE_ADDON_PREFIXES',
+    'ModelSpec',
+    'compile_model',
+    'get_spec',
+    'ModelLike',
+    'CURRENT_SPEC'
+]
+
+# Addons sharing one of these name prefixes are mutually exclusive
+EXCLUSIVE_ADDON_PREFIXES = ('seo_',)
+
+
+def _frozen(values: List[Any], dtype: Any) -> np.ndarray:
+    array = np.array(values, dtype=dtype)
+    array.setflags(write=False)
+    return array
+
+
+@dataclass(frozen=True, eq=False)
+class ModelSpec:
+    """Array-backed prices, probabilities and lookups for one business model"""
+    # Original definitions, kept for metadata such as colors and descriptions
+    plans: Tuple[Mapping[str, Any], ...]
+    addons: Tuple[Mapping[str, Any], ...]
+
+    # Plans
+    plan_names: Tuple[str, ...]
+    plan_display_names: Tuple[str, ...]
+    plan_prices: np.ndarray
+    plan_probs: np.ndarray              # normalized selection probabilities
+    plan_cum_weights: Tuple[float, ...]  # cumulative weights as used by random.choices
+
+    # Addons
+    addon_names: Tuple[str, ...]
+    addon_display_names: Tuple[str, ...]
+    addon_prices: np.ndarray
+    addon_probs: np.ndarray
+    addon_max_qty: np.ndarray
+    addon_slots: Tuple[int, ...]        # independent draws per addon
+    recurring_mask: np.ndarray
+    onetime_mask: np.ndarray
+    exclusive_groups: Tuple[Tuple[int, ...], ...]
+    addon_index: Mapping[str, int]
+
+    # Fees and costs
+    setup_fee: float
+    annual_domain_cost: float
+    monthly_domain_cost: float
+    base_monthly_fee: float
+
+    # Name of the model in config.MODELS, if it has one
+    name: str = ''
+
+    def __reduce__(self):
+        # Recompile from the definition, so specs can be sent to worker processes
+        return (compile_model, (
+            self.definition(), self.setup_fee, self.annual_domain_cost,
+            self.monthly_domain_cost, self.name
+        ))
+
+    def definition(self) -> Dict[str, List[Dict[str, Any]]]:
+        """The model definition (plans + addons) as plain dicts"""
+        return {
+            'plans': [dict(p) for p in self.plans],
+            'addons': [dict(a) for a in self.addons]
+        }
+
+    @property
+    def n_plans(self) -> int:
+        return len(self.plan_names)
+
+    @property
+    def n_addons(self) -> int:
+        return len(self.addon_names)
+
+    # Plain-Python views for the per-customer engine, where NumPy scalars
+    # would be slower than floats and ints
+
+    @cached_property
+    def addon_draws(self) -> Tuple[Tuple[str, int, float], ...]:
+        """(name, slots, probability) of every addon, in model order"""
+        return tuple(
+            (name, slots, float(prob))
+            for name, slots, prob in zip(self.addon_names, self.addon_slots, self.addon_probs)
+        )
+
+    @cached_property
+    def recurring_addons(self) -> Tuple[Tuple[int, str, str, float], ...]:
+        """(index, name, display name, price) of every recurring addon, in model order"""
+        return tuple(
+            (i, self.addon_names[i], self.addon_display_names[i], float(self.addon_prices[i]))
+            for i in range(self.n_addons) if self.recurring_mask[i]
+        )
+
+    @cached_property
+    def onetime_addons(self) -> Tuple[Tuple[int, str, str, float], ...]:
+        """(index, name, display name, price) of every one-time addon, in model order"""
+        return tuple(
+            (i, self.addon_names[i], self.addon_display_names[i], float(self.addon_prices[i]))
+            for i in range(self.n_addons) if self.onetime_mask[i]
+        )
+
+    @cached_property
+    def revenue_streams(self) -> Dict[str, Dict[str, Any]]:
+        """Revenue stream metadata keyed by display name, like get_revenue_streams()"""
+        streams = {}
+        for item in self.plans + self.addons:
+            streams[item['display_name']] = {
+                'color': item['color'],
+                'display_name': f"{item['display_name']} (${item['price']})",
+                'type': item['type'],
+                'price': item['price']
+            }
+        return streams
+
+    @cached_property
+    def schema(self):
+        """Output column schema for this model"""
+        from schema import build_column_schema
+        return build_column_schema(self)
+
+
+def compile_model(
+    model: Dict[str, List[Dict[str, Any]]],
+    setup_fee: float = SETUP_FEE,
+    annual_domain_cost: float = ANNUAL_DOMAIN_COST,
+    monthly_domain_cost: float = MONTHLY_DOMAIN_COST,
+    name: str = ''
+) -> ModelSpec:
+    """Compile a model definition (plans + addons) into a ModelSpec"""
+    plans = model['plans']
+    addons = model['addons']
+
+    weights = [p.get('probability', 1.0) for p in plans]
+    total = sum(weights)
+    if plans and total <= 0:
+        raise ValueError(f"Plan probabilities must be positive, got {total}")
+
+    groups = []
+    for prefix in EXCLUSIVE_ADDON_PREFIXES:
+        group = tuple(i for i, a in enumerate(addons) if a['name'].startswith(prefix))
+        if len(group) > 1:
+            groups.append(group)
+
+    return ModelSpec(
+        plans=tuple(MappingProxyType(dict(p)) for p in plans),
+        addons=tuple(MappingProxyType(dict(a)) for a in addons),
+        plan_names=tuple(p['name'] for p in plans),
+        plan_display_names=tuple(p['display_name'] for p in plans),
+        plan_prices=_frozen([p['price'] for p in plans], np.float64),
+        plan_probs=_frozen([w / total for w in weights] if plans else [], np.float64),
+        plan_cum_weights=tuple(accumulate(weights)),
+        addon_names=tuple(a['name'] for a in addons),
+        addon_display_names=tuple(a['display_name'] for a in addons),
+        addon_prices=_frozen([a['price'] for a in addons], np.float64),
+        addon_probs=_frozen([a['probability'] for a in addons], np.float64),
+        addon_max_qty=_frozen([a.get('max_quantity', 1) for a in addons], np.int64),
+        addon_slots=tuple(max(a.get('max_quantity', 1), 1) for a in addons),
+        recurring_mask=_frozen([a['type'] == 'recurring' for a in addons], bool),
+        onetime_mask=_frozen([a['type'] == 'onetime' for a in addons], bool),
+        exclusive_groups=tuple(groups),
+        addon_index=MappingProxyType({a['name']: i for i, a in enumerate(addons)}),
+        setup_fee=setup_fee,
+        annual_domain_cost=annual_domain_cost,
+        monthly_domain_cost=monthly_domain_cost,
+        base_monthly_fee=plans[0]['price'] if plans else 0.0,
+        name=name
+    )
+
+# Spec for the model selected in config.py
+CURRENT_SPEC = compile_model(
+    CURRENT_MODEL,
+    name=next((name for name, model in MODELS.items() if model is CURRENT_MODEL), '')
+)
+
+# Specs of the models in config.MODELS, compiled on first use
+_NAMED_SPECS: Dict[str, ModelSpec] = {CURRENT_SPEC.name: CURRENT_SPEC} if CURRENT_SPEC.name else {}
+
+ModelLike = Union[None, str, Dict[str, List[Dict[str, Any]]], ModelSpec]
+
+
+def get_spec(model: ModelLike = None) -> ModelSpec:
+    """Resolve a model given as a ModelSpec, a name in config.MODELS or a
+    definition dict (plans + addons); None selects the current model."""
+    if model is None:
+        return CURRENT_SPEC
+    if isinstance(model, ModelSpec):
+        return model
+    if isinstance(model, str):
+        if model not in MODELS:
+            raise ValueError(f"Unknown model '{model}', expected one of {list(MODELS)}")
+        if model not in _NAMED_SPECS:
+            _NAMED_SPECS[model] = compile_model(MODELS[model], name=model)
+        return _NAMED_SPECS[model]
+    return compile_model(model)
@@ -5,6 +5,8 @@ import random
 from dataclasses import dataclass, field
 from typing import Dict, List, Optional, Tuple, ClassVar, TypedDict, Any
 
+import numpy as np
+
 # Import configuration from config.py
 from config import (
     SETUP_FEE,
@@ -17,9 +19,10 @@ from config import (
     get_revenue_streams,
     REVENUE_STREAMS
 )
+from model_spec import CURRENT_SPEC, ModelSpec
 
 # Calculate base hosting fee from the first plan
-BASE_MONTHLY_HOSTING_FEE = PLANS[0]['price'] if PLANS else 0.0
+BASE_MONTHLY_HOSTING_FEE = CURRENT_SPEC.base_monthly_fee
 
 # Export BASE_MONTHLY_HOSTING_FEE
 __all__ = [
@@ -29,7 +32,11 @@ __all__ = [
     'UPSELL_PACKAGES',
     'ServiceNames',
     'CustomerUpsells',
+    'CustomerRecord',
+    'CustomerTable',
     'generate_customer_upsells',
+    'build_upsell_packages',
+    'build_service_names',
     'get_upsell_description',
     'select_random_plan'
 ]
@@ -38,9 +45,6 @@ __all__ = [
 premium_plans = [p for p in PLANS if p.get('name') == 'premium' or p.get('name') == 'pro']
 PREMIUM_MONTHLY_HOSTING_FEE = premium_plans[0]['price'] if premium_plans else 0
 
-# Get REVENUE_STREAMS from config
-REVENUE_STREAMS = get_revenue_streams()
-
 @dataclass
 class UpsellPackage:
     """Represents an upsell package with its pricing and type."""
@@ -57,156 +61,310 @@ class UpsellPackage:
         qty = min(quantity, self.max_quantity) if self.max_quantity > 1 else quantity
         return (self.monthly_price * qty, self.one_time_price * qty)
 
-# Create upsell packages from the current model
-UPSELL_PACKAGES = {}
-for addon in ADDONS:
-    UPSELL_PACKAGES[addon['name']] = UpsellPackage(
-        name=addon['display_name'],
-        monthly_price=addon['price'] if addon['type'] == 'recurring' else 0,
-        one_time_price=addon['price'] if addon['type'] == 'onetime' else 0,
-        probability=addon['probability'],
-        is_quantity_based=addon.get('max_quantity', 1) > 1,
-        max_quantity=addon.get('max_quantity', 1),
-        revenue_stream=addon['display_name']
-    )
-
-# Service Names (for reference)
-class ServiceNames:
-    # These will be populated based on the current model
-    pass
-
-# Dynamically add service names based on the current model
-for plan in PLANS + ADDONS:
-    name = plan['name'].upper()
-    display_name = plan['display_name']
-    setattr(ServiceNames, name, display_name)
+# Model-derived lookup tables (UPSELL_PACKAGES, ServiceNames) are built on
+# first access rather than at import, so importing this module stays cheap.
+
+def build_upsell_packages(spec: ModelSpec = CURRENT_SPEC) -> Dict[str, UpsellPackage]:
+    """Create upsell packages from a model (the current one by default)"""
+    packages = {}
+    for addon in spec.addons:
+        packages[addon['name']] = UpsellPackage(
+            name=addon['display_name'],
+            monthly_price=addon['price'] if addon['type'] == 'recurring' else 0,
+            one_time_price=addon['price'] if addon['type'] == 'onetime' else 0,
+            probability=addon['probability'],
+            is_quantity_based=addon.get('max_quantity', 1) > 1,
+            max_quantity=addon.get('max_quantity', 1),
+            revenue_stream=addon['display_name']
+        )
+    return packages
+
+def build_service_names(spec: ModelSpec = CURRENT_SPEC) -> type:
+    """Service Names (for reference), one attribute per plan and addon"""
+    attributes = {item['name'].upper(): item['display_name'] for item in spec.plans + spec.addons}
+    return type('ServiceNames', (), attributes)
+
+_LAZY_TABLES = {
+    'UPSELL_PACKAGES': build_upsell_packages,
+    'ServiceNames': build_service_names,
+}
+
+def __getattr__(name: str) -> Any:
+    # Build the table once and cache it as a regular module attribute
+    if name in _LAZY_TABLES:
+        value = globals()[name] = _LAZY_TABLES[name]()
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-@dataclass
 class CustomerUpsells:
-    """Tracks all potential upsells for a single customer"""
-    _packages: Dict[str, int] = field(default_factory=dict)
+    """Tracks all potential upsells for a single customer.
+
+    Quantities are stored positionally in the addon order of `spec` (the
+    current model by default). A CustomerUpsells is either a standalone record
+    or a view over one row of a CustomerTable.
+    """
+    __slots__ = ('_quantities', '_spec')
     
-    def __post_init__(self):
+    def __init__(self, quantities=None, spec: ModelSpec = CURRENT_SPEC):
+        self._spec = spec
         # Initialize all addons with 0 quantity
-        self._packages = {addon['name']: 0 for addon in ADDONS}
+        self._quantities = quantities if quantities is not None else [0] * spec.n_addons
+    
+    def __repr__(self) -> str:
+        return f"CustomerUpsells({dict(self.items())})"
+    
+    def items(self) -> List[Tuple[str, int]]:
+        """(package name, quantity) for every addon in the model"""
+        return [(name, int(qty)) for name, qty in zip(self._spec.addon_names, self._quantities)]
     
     def add_upsell(self, package_name: str, quantity: int = 1) -> None:
         """Add an upsell package"""
-        if package_name in self._packages:
-            addon = next((a for a in ADDONS if a['name'] == package_name), None)
-            if addon:
-                if addon.get('max_quantity', 1) > 1:  # Quantity-based addon
-                    self._packages[package_name] = min(
-                        self._packages[package_name] + quantity,
-                        addon.get('max_quantity', 1)
-                    )
-                else:
-                    self._packages[package_name] = 1
+        index = self._spec.addon_index.get(package_name)
+        if index is not None:
+            max_quantity = self._spec.addon_slots[index]
+            if max_quantity > 1:  # Quantity-based addon
+                self._quantities[index] = min(
+                    self._quantities[index] + quantity,
+                    max_quantity
+                )
+            else:
+                self._quantities[index] = 1
+    
+    def remove_upsell(self, package_name: str) -> None:
+        """Remove an upsell package entirely"""
+        index = self._spec.addon_index.get(package_name)
+        if index is not None:
+            self._quantities[index] = 0
     
     def get_quantity(self, package_name: str) -> int:
         """Get quantity of a specific package"""
-        return self._packages.get(package_name, 0)
+        index = self._spec.addon_index.get(package_name)
+        return int(self._quantities[index]) if index is not None else 0
     
     def get_monthly_revenue(self) -> Dict[str, float]:
         """Calculate monthly revenue by package"""
         revenue = {}
-        for addon in ADDONS:
-            name = addon['name']
-            if self._packages.get(name, 0) > 0 and addon['type'] == 'recurring':
-                revenue[addon['display_name']] = addon['price'] * self._packages[name]
+        for index, _, display_name, price in self._spec.recurring_addons:
+            qty = self._quantities[index]
+            if qty > 0:
+                revenue[display_name] = price * int(qty)
         return revenue
     
     def get_one_time_revenue(self) -> Dict[str, float]:
         """Calculate one-time revenue by package"""
         revenue = {}
-        for addon in ADDONS:
-            name = addon['name']
-            if self._packages.get(name, 0) > 0 and addon['type'] == 'onetime':
-                revenue[addon['display_name']] = addon['price'] * self._packages[name]
+        for index, _, display_name, price in self._spec.onetime_addons:
+            qty = self._quantities[index]
+            if qty > 0:
+                revenue[display_name] = price * int(qty)
         return revenue
     
     def calculate_monthly_upsell_total(self) -> float:
         """Calculate total monthly cost of all active upsells"""
         total = 0.0
-        for addon in ADDONS:
-            name = addon['name']
-            if addon['type'] == 'recurring':
-                total += addon['price'] * self._packages.get(name, 0)
+        for index, _, _, price in self._spec.recurring_addons:
+            total += price * int(self._quantities[index])
         # Add domain cost (negative cost)
-        total -= MONTHLY_DOMAIN_COST
+        total -= self._spec.monthly_domain_cost
         return total
         
     def calculate_one_time_fees(self) -> float:
         """Calculate one-time fees (setup fee + one-time addons)"""
         one_time_total = 0.0
-        for addon in ADDONS:
-            name = addon['name']
-            if addon['type'] == 'onetime':
-                one_time_total += addon['price'] * self._packages.get(name, 0)
-        return SETUP_FEE + one_time_total - ANNUAL_DOMAIN_COST
+        for index, _, _, price in self._spec.onetime_addons:
+            one_time_total += price * int(self._quantities[index])
+        return self._spec.setup_fee + one_time_total - self._spec.annual_domain_cost
+
+
+class CustomerRecord:
+    """Read-only view of one customer stored in a CustomerTable.
+
+    Supports the dict-style access of the original customer dicts
+    (`customer['plan']`, `customer.get('plan')`).
+    """
+    __slots__ = ('_table', '_row')
+    
+    _FIELDS = ('month_joined', 'plan', 'upsells', 'one_time_fee', 'monthly_upsell',
+               'monthly_revenue', 'one_time_revenue')
+    
+    def __init__(self, table: 'CustomerTable', row: int):
+        self._table = table
+        self._row = row
+    
+    @property
+    def month_joined(self) -> int:
+        return int(self._table.month_joined[self._row])
+    
+    @property
+    def plan(self) -> str:
+        return self._table.spec.plan_names[self._table.plan_index[self._row]]
+    
+    @property
+    def upsells(self) -> CustomerUpsells:
+        # A read-only view: changing it must not rewrite the stored customer
+        quantities = self._table.quantities[self._row]
+        quantities.flags.writeable = False
+        return CustomerUpsells(quantities, self._table.spec)
+    
+    @property
+    def one_time_fee(self) -> float:
+        return self.upsells.calculate_one_time_fees()
+    
+    @property
+    def monthly_upsell(self) -> float:
+        return self.upsells.calculate_monthly_upsell_total()
+    
+    @property
+    def monthly_revenue(self) -> Dict[str, float]:
+        plan = self._table.spec.plans[self._table.plan_index[self._row]]
+        return {plan['name']: plan['price'], **self.upsells.get_monthly_revenue()}
+    
+    @property
+    def one_time_revenue(self) -> Dict[str, float]:
+        return self.upsells.get_one_time_revenue()
+    
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key) if key in self._FIELDS else default
+
+
+class CustomerTable:
+    """Struct-of-arrays store of simulated customers.
+
+    Each customer takes one plan index, one join month and one quantity per
+    addon, using the smallest integer dtypes the model allows, instead of a
+    dict holding a CustomerUpsells and two revenue dicts.
+    """
+    
+    def __init__(self, capacity: int = 1024, spec: ModelSpec = CURRENT_SPEC):
+        capacity = max(capacity, 1)
+        self.spec = spec
+        max_quantity = max(spec.addon_slots, default=1)
+        self.plan_index = np.zeros(capacity, dtype=np.min_scalar_type(max(spec.n_plans - 1, 0)))
+        self.month_joined = np.zeros(capacity, dtype=np.int32)
+        self.quantities = np.zeros((capacity, spec.n_addons), dtype=np.min_scalar_type(max_quantity))
+        self._size = 0
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    def __getitem__(self, row: int) -> CustomerRecord:
+        if row < 0:
+            row += self._size
+        if not 0 <= row < self._size:
+            raise IndexError("customer index out of range")
+        return CustomerRecord(self, row)
+    
+    def __iter__(self):
+        for row in range(self._size):
+            yield CustomerRecord(self, row)
+    
+    def _grow(self, needed: int) -> None:
+        capacity = len(self.month_joined)
+        if needed <= capacity:
+            return
+        capacity = max(needed, capacity * 2)
+        self.plan_index = np.resize(self.plan_index, capacity)
+        self.month_joined = np.resize(self.month_joined, capacity)
+        quantities = np.zeros((capacity, self.quantities.shape[1]), dtype=self.quantities.dtype)
+        quantities[:self._size] = self.quantities[:self._size]
+        self.quantities = quantities
+    
+    def append(self, month_joined: int, plan_index: int, upsells: CustomerUpsells) -> None:
+        """Store one customer"""
+        self._grow(self._size + 1)
+        row = self._size
+        self.plan_index[row] = plan_index
+        self.month_joined[row] = month_joined
+        self.quantities[row] = upsells._quantities
+        self._size += 1
+    
+    def clear(self) -> None:
+        """Forget every stored customer, keeping the allocated capacity"""
+        self._size = 0
+    
+    def nbytes(self) -> int:
+        """Bytes used by the stored customers (excluding spare capacity)"""
+        per_customer = (self.plan_index.itemsize + self.month_joined.itemsize
+                        + self.quantities.itemsize * self.quantities.shape[1])
+        return per_customer * self._size
+    
+    def memory_report(self) -> Dict[str, float]:
+        """Memory used by the table, in total and per customer"""
+        allocated = self.plan_index.nbytes + self.month_joined.nbytes + self.quantities.nbytes
+        return {
+            'customers': self._size,
+            'bytes_used': self.nbytes(),
+            'bytes_allocated': allocated,
+            'bytes_per_customer': self.nbytes() / self._size if self._size else 0.0
+        }
 
-def generate_customer_upsells() -> CustomerUpsells:
+def generate_customer_upsells(rng=random, spec: ModelSpec = CURRENT_SPEC) -> CustomerUpsells:
     """
     Generate a random set of upsells for a new customer based on probabilities.
+    `rng` is any object with the `random.Random` interface (the global
+    `random` module by default); `spec` is the model (the current one by default).
     Returns a CustomerUpsells object with the selected services.
     """
-    upsells = CustomerUpsells()
+    upsells = CustomerUpsells([0] * spec.n_addons, spec)
     
     # Generate upsells based on addon probabilities
-    for addon in ADDONS:
-        if addon.get('max_quantity', 1) > 1:
+    for name, slots, probability in spec.addon_draws:
+        if slots > 1:
             # For quantity-based addons (like extra pages)
-            max_qty = addon.get('max_quantity', 1)
-            for _ in range(max_qty):
-                if random.random() < addon['probability']:
-                    upsells.add_upsell(addon['name'], 1)
+            for _ in range(slots):
+                if rng.random() < probability:
+                    upsells.add_upsell(name, 1)
         else:
             # For simple yes/no addons
-            if random.random() < addon['probability']:
-                upsells.add_upsell(addon['name'])
+            if rng.random() < probability:
+                upsells.add_upsell(name)
     
     # Handle mutually exclusive addons (e.g., SEO services)
-    seo_services = [a for a in ADDONS if a['name'].startswith('seo_')]
-    if len(seo_services) > 1 and sum(upsells.get_quantity(s['name']) for s in seo_services) > 1:
-        # If multiple SEO services are selected, keep only one (randomly chosen)
-        selected_seo = random.choice(seo_services)
-        for seo in seo_services:
-            if seo['name'] != selected_seo['name']:
-                upsells._packages[seo['name']] = 0
+    for group in spec.exclusive_groups:
+        names = [spec.addon_names[i] for i in group]
+        if sum(upsells.get_quantity(name) for name in names) > 1:
+            # If multiple services are selected, keep only one (randomly chosen)
+            selected = rng.choice(names)
+            for name in names:
+                if name != selected:
+                    upsells.remove_upsell(name)
     
     return upsells
 
 def get_upsell_description(upsells: CustomerUpsells) -> str:
     """Generate a human-readable description of the customer's upsells"""
+    spec = upsells._spec
     descriptions = []
     
     # Add hosting plan if needed (if you track it in upsells)
     
     # Add active addons
-    for addon in ADDONS:
-        name = addon['name']
+    for i, name in enumerate(spec.addon_names):
         qty = upsells.get_quantity(name)
         if qty > 0:
-            price_desc = f"${addon['price'] * qty:.2f}"
-            if addon['type'] == 'recurring':
+            price_desc = f"${spec.addon_prices[i] * qty:.2f}"
+            if spec.recurring_mask[i]:
                 price_desc += "/mo"
-            descriptions.append(f"{addon['display_name']} x{qty} ({price_desc})")
+            descriptions.append(f"{spec.addon_display_names[i]} x{qty} ({price_desc})")
     
     return ", ".join(descriptions) if descriptions else "No additional services"
 
 # For backward compatibility
-def select_random_plan() -> Tuple[float, str]:
+def select_random_plan(spec: ModelSpec = CURRENT_SPEC) -> Tuple[float, str]:
     """
     Randomly select a plan based on probabilities.
     Returns a tuple of (monthly_price, plan_name)
     """
     rand = random.random()
-    cumulative_prob = 0.0
     
-    for plan in PLANS:
-        cumulative_prob += plan['probability']
+    for i, cumulative_prob in enumerate(spec.plan_cum_weights):
         if rand < cumulative_prob:
-            return plan['price'], plan['name'].capitalize()
+            return float(spec.plan_prices[i]), spec.plan_names[i].capitalize()
     
     # Fallback to first plan if no plan was selected (shouldn't happen if probabilities sum to 1.0)
-    return PLANS[0]['price'], PLANS[0]['name'].capitalize()
\ No newline at end of file
+    return spec.plans[0]['price'], spec.plans[0]['name'].capitalize()
\ No newline at end of file
@@ -0,0 +1,362 @@
+"""
+Vectorized Monte Carlo engine for the Revenue Calculator.
+
+Simulates many independent trials at once as NumPy arrays instead of looping
+the per-customer Python engine. Each customer is drawn with exactly the same
+rules as `RevenueCalculator._process_month` and `generate_customer_upsells`:
+one plan draw, one draw per addon quantity slot and a random pick among
+mutually exclusive services (e.g. SEO) when more than one was selected.
+
+The uniforms behind those draws can be sampled with a variance reduction
+strategy (see SAMPLING): antithetic pairs of trials, or Latin hypercube
+stratification of every draw across trials. Trials are drawn in chunks of at
+most MAX_UNIFORMS_PER_CHUNK uniforms, and the stratification covers the trials
+of one chunk (`MonteCarloEngine.stratified_trials`), so large runs are a
+sequence of independent Latin hypercubes. `simulate_scenarios` shares one set
+of uniforms between scenarios (common random numbers), so their differences
+are not swamped by noise.
+"""
+from typing import TYPE_CHECKING, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config import MONTHS_TO_CALCULATE
+from model_spec import ModelSpec, CURRENT_SPEC
+
+if TYPE_CHECKING:
+    from streaming_stats import TrialSummary
+    from trial_store import TrialStore
+
+__all__ = [
+    'MonteCarloEngine',
+    'MonteCarloResult',
+    'CustomerUniforms',
+    'SAMPLING',
+    'draw_uniforms',
+    'customer_choices',
+    'sample_features',
+    'simulate_scenarios',
+    'summarize_scenarios'
+]
+
+# Upper bound on uniforms drawn per chunk of trials (~32 MB of float64)
+MAX_UNIFORMS_PER_CHUNK = 4_000_000
+
+# How the uniforms of a batch of trials are drawn:
+# 'independent' - every trial independently
+# 'antithetic'  - trials in pairs, the second using 1 - u for every draw
+#                 (a pair is always drawn in one chunk)
+# 'stratified'  - Latin hypercube: every draw takes each of n equal strata
+#                 of [0, 1) exactly once across the n trials of a chunk
+SAMPLING = ('independent', 'antithetic', 'stratified')
+
+
+class MonteCarloResult:
+    """Per-trial monthly metrics with summary helpers"""
+
+    def __init__(self, columns: List[str], values: np.ndarray):
+        self.columns = list(columns)
+        self.values = values  # shape (trials, months, columns)
+
+    @property
+    def trials(self) -> int:
+        return self.values.shape[0]
+
+    @property
+    def months(self) -> int:
+        return self.values.shape[1]
+
+    def _frame(self, values: np.ndarray) -> pd.DataFrame:
+        df = pd.DataFrame(values, columns=self.columns)
+        df["Month"] = np.arange(1, self.months + 1)
+        return df
+
+    def mean(self) -> pd.DataFrame:
+        """Mean of every column per month"""
+        return self._frame(self.values.mean(axis=0))
+
+    def std(self, ddof: int = 1) -> pd.DataFrame:
+        """Standard deviation of every column per month"""
+        ddof = ddof if self.trials > ddof else 0
+        return self._frame(self.values.std(axis=0, ddof=ddof))
+
+    def percentile(self, q: float) -> pd.DataFrame:
+        """Per-month percentile (0-100) of every column"""
+        return self._frame(np.percentile(self.values, q, axis=0))
+
+    def percentiles(self, qs: Sequence[float] = (5, 50, 95)) -> Dict[float, pd.DataFrame]:
+        """Several per-month percentiles keyed by percentile"""
+        return {q: self.percentile(q) for q in qs}
+
+    def distribution(self, column: str) -> np.ndarray:
+        """All trial values of a column, shape (trials, months)"""
+        return self.values[:, :, self.columns.index(column)]
+
+    def save(self, path: str) -> None:
+        """Save every trial's raw values as an .npz file"""
+        np.savez(path, columns=np.array(self.columns, dtype=str), values=self.values)
+
+    @classmethod
+    def load(cls, path: str) -> 'MonteCarloResult':
+        """Load a result saved with `save`"""
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data['columns'].tolist(), data['values'])
+
+
+class MonteCarloEngine:
+    """Simulates many trials of the revenue model at once"""
+
+    def __init__(
+        self,
+        customers_per_month: int,
+        months: int = MONTHS_TO_CALCULATE,
+        seed: Optional[int] = None,
+        spec: ModelSpec = CURRENT_SPEC,
+        sampling: str = 'independent'
+    ):
+        if sampling not in SAMPLING:
+            raise ValueError(f"Unknown sampling '{sampling}', expected one of {SAMPLING}")
+        self.customers_per_month = customers_per_month
+        self.months = months
+        self.spec = spec
+        self.schema = spec.schema
+        self.sampling = sampling
+        self.rng = np.random.default_rng(seed)
+
+    def run(self, trials: int) -> MonteCarloResult:
+        """Simulate `trials` independent runs"""
+        features = np.empty((trials, self.months, self.schema.n_features))
+        for start, stop in self._chunks(trials):
+            features[start:stop] = self._sample_features(stop - start)
+        return MonteCarloResult(self.schema.columns, self.schema.evaluate(features))
+
+    def summarize(self, trials: int, relative_accuracy: float = 0.01,
+                  max_bins: int = 512) -> 'TrialSummary':
+        """Simulate `trials` runs into a streaming summary.
+
+        Trials are simulated in chunks and only their running moments and
+        quantile sketches are kept, so memory does not grow with `trials`.
+        The trials are the same as those of `run` with the same seed.
+        """
+        from streaming_stats import TrialSummary
+        summary = TrialSummary(self.schema.columns, self.months, relative_accuracy, max_bins)
+        for start, stop in self._chunks(trials):
+            summary.update(self.schema.evaluate(self._sample_features(stop - start)))
+        return summary
+
+    def run_to_store(self, trials: int, path: str, dtype=np.float64,
+                     metadata: Optional[Dict] = None) -> 'TrialStore':
+        """Simulate `trials` runs straight into an on-disk TrialStore at `path`.
+
+        Each chunk of trials is written to the memory-mapped store as soon as
+        it is simulated, so memory does not grow with `trials`. The trials are
+        the same as those of `run` with the same seed.
+        """
+        from trial_store import TrialStore
+        metadata = {
+            'model': self.spec.name,
+            'customers_per_month': self.customers_per_month,
+            'sampling': self.sampling,
+            **(metadata or {}),
+        }
+        store = TrialStore.create(path, self.schema.columns, self.months, trials, dtype, metadata)
+        for start, stop in self._chunks(trials):
+            store.write(start, self.schema.evaluate(self._sample_features(stop - start)))
+        store.close()
+        return store
+
+    def stratified_trials(self, trials: int) -> int:
+        """Trials stratified together by 'stratified' sampling in a run of `trials`.
+
+        The Latin hypercube covers one chunk of trials; when a run needs
+        several chunks this is less than `trials`, and each chunk is an
+        independent hypercube with strata 1 / (chunk size) wide.
+        """
+        return max((stop - start for start, stop in self._chunks(trials)), default=0)
+
+    def _chunks(self, trials: int) -> List[Tuple[int, int]]:
+        """(start, stop) of the chunks of trials drawn at once"""
+        per_trial = self.months * self.customers_per_month * (sum(self.spec.addon_slots) + 2)
+        chunk = max(1, MAX_UNIFORMS_PER_CHUNK // max(per_trial, 1))
+        if self.sampling == 'antithetic':
+            # Keep antithetic pairs within one chunk, even when a single
+            # trial already exceeds MAX_UNIFORMS_PER_CHUNK
+            chunk = max(2, chunk - chunk % 2)
+        return [(start, min(start + chunk, trials)) for start in range(0, trials, chunk)]
+
+    def _sample_features(self, trials: int) -> np.ndarray:
+        """Draw every customer of `trials` runs and aggregate them per month"""
+        shape = (trials, self.months, self.customers_per_month)
+        return sample_features(draw_uniforms(self.rng, shape, self.spec, self.sampling), self.spec)
+
+
+class CustomerUniforms(NamedTuple):
+    """The uniforms behind a batch of customers, shape (..., customers)"""
+    plan: Optional[np.ndarray]        # one plan draw per customer
+    addons: List[np.ndarray]          # per addon, one draw per quantity slot
+    groups: List[np.ndarray]          # per exclusive group, the tie-break draw
+
+    def head(self, customers: int) -> 'CustomerUniforms':
+        """The uniforms of the first `customers` customers of every month"""
+        return CustomerUniforms(
+            self.plan[..., :customers] if self.plan is not None else None,
+            [u[..., :customers, :] for u in self.addons],
+            [u[..., :customers] for u in self.groups]
+        )
+
+
+def _random(rng: np.random.Generator, shape: Tuple[int, ...], sampling: str) -> np.ndarray:
+    """Uniforms of `shape`, whose first axis is the trial, drawn with a sampling strategy"""
+    if sampling == 'antithetic':
+        half = rng.random(((shape[0] + 1) // 2,) + shape[1:])
+        return np.concatenate([half, 1.0 - half])[:shape[0]]
+    if sampling == 'stratified':
+        trials = shape[0]
+        strata = np.arange(trials).reshape((trials,) + (1,) * (len(shape) - 1))
+        strata = rng.permuted(np.broadcast_to(strata, shape), axis=0)
+        return (strata + rng.random(shape)) / trials
+    return rng.random(shape)
+
+
+def draw_uniforms(rng: np.random.Generator, shape: Tuple[int, ...],
+                  spec: ModelSpec = CURRENT_SPEC, sampling: str = 'independent') -> CustomerUniforms:
+    """Draw the uniforms of `shape` customers in the engine's draw order.
+
+    Only the model's structure (plans, quantity slots, exclusive groups)
+    determines what is drawn, so the same uniforms can be mapped onto models
+    with other prices and probabilities as common random numbers. The first
+    axis of `shape` is the trial, across which `sampling` applies.
+    """
+    plan = _random(rng, shape, sampling) if spec.n_plans else None
+    if not spec.n_addons:
+        return CustomerUniforms(plan, [], [])
+    addons = [_random(rng, shape + (slots,), sampling) for slots in spec.addon_slots]
+    groups = [_random(rng, shape, sampling) for _ in spec.exclusive_groups]
+    return CustomerUniforms(plan, addons, groups)
+
+
+def customer_choices(uniforms: CustomerUniforms,
+                     spec: ModelSpec = CURRENT_SPEC) -> Tuple[Optional[np.ndarray], np.ndarray]:
+    """Turn customer uniforms into every customer's plan and addon quantities.
+
+    Returns the plan indices, shape (..., customers) (None for models without
+    plans), and the addon quantities, shape (..., customers, n_addons).
+    """
+    shape = uniforms.plan.shape if uniforms.plan is not None else uniforms.addons[0].shape[:-1]
+    n_plans = spec.n_plans
+
+    # Plan selection follows random.choices: bisect on cumulative weights
+    plan_idx = None
+    if n_plans:
+        cum_weights = np.array(spec.plan_cum_weights, dtype=np.float64)
+        u = uniforms.plan * cum_weights[-1]
+        plan_idx = np.searchsorted(cum_weights, u, side='right')
+        plan_idx = np.minimum(plan_idx, n_plans - 1)
+
+    # Addon quantities: one Bernoulli draw per slot
+    quantities = np.empty(shape + (spec.n_addons,), dtype=np.int16)
+    for a, (prob, u) in enumerate(zip(spec.addon_probs, uniforms.addons)):
+        quantities[..., a] = (u < prob).sum(axis=-1)
+
+    # Mutually exclusive services: keep one randomly chosen service
+    for group, u in zip(spec.exclusive_groups, uniforms.groups):
+        group = list(group)
+        selected = quantities[..., group]
+        conflict = selected.sum(axis=-1) > 1
+        # An antithetic 1 - u can reach 1.0; keep it on the last service
+        choice = np.minimum((u * len(group)).astype(np.intp), len(group) - 1)
+        keep = choice[..., None] == np.arange(len(group))
+        quantities[..., group] = np.where(conflict[..., None], selected * keep, selected)
+    return plan_idx, quantities
+
+
+def sample_features(uniforms: CustomerUniforms, spec: ModelSpec = CURRENT_SPEC) -> np.ndarray:
+    """Turn customer uniforms into per-month cohort aggregates.
+
+    The last axis of the uniforms is the customer; it is summed away, giving
+    shape (..., n_features).
+    """
+    plan_idx, quantities = customer_choices(uniforms, spec)
+    shape = quantities.shape[:-1]
+    n_plans = spec.n_plans
+    features = np.zeros(shape[:-1] + (spec.schema.n_features,))
+    features[..., 0] = shape[-1]
+    if plan_idx is not None:
+        for p in range(n_plans):
+            features[..., 1 + p] = (plan_idx == p).sum(axis=-1)
+    if spec.n_addons:
+        features[..., 1 + n_plans:] = quantities.sum(axis=-2)
+    return features
+
+
+def simulate_scenarios(
+    rates: Dict[str, int],
+    trials: int,
+    months: int = MONTHS_TO_CALCULATE,
+    seed: Optional[int] = None,
+    spec: ModelSpec = CURRENT_SPEC,
+    sampling: str = 'independent'
+) -> Dict[str, MonteCarloResult]:
+    """Simulate several scenarios from common random numbers.
+
+    `rates` maps scenario labels to customers acquired per month. Uniforms are
+    drawn once for the largest scenario and every scenario uses those of its
+    first customers each month, so trial i of every scenario shares its draws
+    and differences between scenarios have far less noise than with
+    independent runs.
+    """
+    features = {label: np.empty((trials, months, spec.schema.n_features)) for label in rates}
+    for start, stop, chunk in _scenario_chunks(rates, trials, months, seed, spec, sampling):
+        for label, f in chunk.items():
+            features[label][start:stop] = f
+    return {
+        label: MonteCarloResult(spec.schema.columns, spec.schema.evaluate(f))
+        for label, f in features.items()
+    }
+
+
+def summarize_scenarios(
+    rates: Dict[str, int],
+    trials: int,
+    months: int = MONTHS_TO_CALCULATE,
+    seed: Optional[int] = None,
+    spec: ModelSpec = CURRENT_SPEC,
+    sampling: str = 'independent',
+    relative_accuracy: float = 0.01,
+    paired_columns: Sequence[str] = ()
+) -> Tuple[Dict[str, 'TrialSummary'], Dict[str, np.ndarray]]:
+    """Like `simulate_scenarios`, but keep only streaming statistics.
+
+    Returns a TrialSummary per scenario, and per scenario the last month's
+    `paired_columns` of every trial, shape (trials, len(paired_columns)).
+    Trial i of every scenario shares its draws, so those can be compared
+    trial by trial (see `variance_reduction.scenario_differences`).
+    """
+    from streaming_stats import TrialSummary
+    columns = spec.schema.columns
+    idx = [spec.schema.index(column) for column in paired_columns]
+    summaries = {label: TrialSummary(columns, months, relative_accuracy) for label in rates}
+    final = {label: np.empty((trials, len(idx))) for label in rates}
+    for start, stop, chunk in _scenario_chunks(rates, trials, months, seed, spec, sampling):
+        for label, f in chunk.items():
+            values = spec.schema.evaluate(f)
+            summaries[label].update(values)
+            final[label][start:stop] = values[:, -1, idx]
+    return summaries, final
+
+
+def _scenario_chunks(rates: Dict[str, int], trials: int, months: int, seed: Optional[int],
+                     spec: ModelSpec, sampling: str) -> Iterator[Tuple[int, int, Dict[str, np.ndarray]]]:
+    """Yield (start, stop, features per scenario) of every chunk of trials.
+
+    Uniforms are drawn once for the largest scenario and every scenario uses
+    those of its first customers each month.
+    """
+    if sampling not in SAMPLING:
+        raise ValueError(f"Unknown sampling '{sampling}', expected one of {SAMPLING}")
+    largest = max(rates.values())
+    engine = MonteCarloEngine(largest, months, seed=seed, spec=spec, sampling=sampling)
+    for start, stop in engine._chunks(trials):
+        uniforms = draw_uniforms(engine.rng, (stop - start, months, largest), spec, sampling)
+        yield start, stop, {label: sample_features(uniforms.head(rate), spec) for label, rate in rates.items()}
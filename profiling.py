@@ -0,0 +1,102 @@
+"""
+Per-stage timing instrumentation for the Revenue Calculator.
+
+A StageProfiler records wall time, CPU time and peak RSS for named stages
+(simulation, DataFrame construction, Excel export, each chart) plus arbitrary
+metadata such as the scenario and customer counts. Results are written as one
+JSON file that is also a Chrome trace (open it in chrome://tracing or
+https://ui.perfetto.dev).
+"""
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+__all__ = ['StageProfiler', 'peak_rss_bytes']
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """Peak resident set size of this process so far, if the platform reports it"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class StageProfiler:
+    """Collects per-stage wall time, CPU time and peak RSS"""
+
+    def __init__(self):
+        self.records: List[Dict[str, Any]] = []
+        self._origin = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str, **metadata: Any) -> Iterator[Dict[str, Any]]:
+        """Time a block; extra metadata can be added to the yielded record"""
+        record: Dict[str, Any] = {'name': name, 'pid': os.getpid(), **metadata}
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield record
+        finally:
+            record['start'] = wall_start - self._origin
+            record['wall_seconds'] = time.perf_counter() - wall_start
+            record['cpu_seconds'] = time.process_time() - cpu_start
+            record['peak_rss_bytes'] = peak_rss_bytes()
+            self.records.append(record)
+
+    def add(self, name: str, wall_seconds: float, cpu_seconds: Optional[float] = None,
+            start: Optional[float] = None, **metadata: Any) -> None:
+        """Add a record measured elsewhere (e.g. in a worker process)"""
+        self.records.append({
+            'name': name,
+            'start': start if start is not None else time.perf_counter() - self._origin - wall_seconds,
+            'wall_seconds': wall_seconds,
+            'cpu_seconds': cpu_seconds,
+            **metadata
+        })
+
+    @staticmethod
+    def month_hook(timings: List[float]) -> Callable[[int, float], None]:
+        """Hook for RevenueCalculator(month_hook=...) that collects month timings"""
+        def hook(month: int, seconds: float) -> None:
+            timings.append(seconds)
+        return hook
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Stage records plus the same data as Chrome trace events"""
+        events = []
+        for record in self.records:
+            args = {k: v for k, v in record.items()
+                    if k not in ('name', 'start', 'wall_seconds', 'pid', 'month_seconds')}
+            events.append({
+                'name': record['name'],
+                'ph': 'X',
+                'ts': record['start'] * 1e6,
+                'dur': record['wall_seconds'] * 1e6,
+                'pid': record.get('pid', os.getpid()),
+                'tid': record.get('pid', os.getpid()),
+                'args': args
+            })
+        return {
+            'stages': self.records,
+            'total_wall_seconds': time.perf_counter() - self._origin,
+            'peak_rss_bytes': peak_rss_bytes(),
+            'traceEvents': events
+        }
+
+    def write(self, path: str) -> None:
+        """Write the profile as JSON"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
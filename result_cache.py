@@ -0,0 +1,191 @@
+"""
+Content-addressed on-disk cache for scenario results.
+
+A result is keyed by a SHA-256 hash of everything that determines it: the
+model definition, the fees, the run parameters (customers per
+month, months, mode), the seed and the source of the simulation modules.
+Editing config.py or the simulation code therefore invalidates old entries
+automatically. Results are stored column by column in uncompressed .npz
+files, and the cache is trimmed to a size budget by evicting the least
+recently used entries.
+"""
+import hashlib
+import json
+import os
+import tempfile
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+from model_spec import CURRENT_SPEC, ModelSpec
+from results import ResultTable
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+__all__ = ['ResultCache', 'cache_key', 'cached_results', 'cached_calculate_revenue']
+
+# Bump when the on-disk layout changes
+CACHE_FORMAT_VERSION = 2
+
+# Modules whose source determines a result; any edit invalidates the cache
+SOURCE_MODULES = (
+    'config.py', 'models.py', 'model_spec.py', 'revenue_calculator.py',
+    'schema.py', 'expected_value.py', 'count_sampling.py', 'monte_carlo.py',
+    'scale_sampling.py'
+)
+
+_source_digest: Optional[str] = None
+
+
+def _sources_digest() -> str:
+    """Hash of the simulation source files (computed once per process)"""
+    global _source_digest
+    if _source_digest is None:
+        digest = hashlib.sha256()
+        root = os.path.dirname(os.path.abspath(__file__))
+        for name in SOURCE_MODULES:
+            digest.update(name.encode('utf-8'))
+            with open(os.path.join(root, name), 'rb') as f:
+                digest.update(f.read())
+        _source_digest = digest.hexdigest()
+    return _source_digest
+
+
+def cache_key(customers_per_month: int, months: int, mode: str, seed: Optional[int],
+              spec: ModelSpec = CURRENT_SPEC) -> str:
+    """SHA-256 key of a run: model configuration, fees, run parameters and seed"""
+    payload = {
+        'format': CACHE_FORMAT_VERSION,
+        'model': spec.definition(),
+        'revenue_streams': spec.revenue_streams,
+        'setup_fee': spec.setup_fee,
+        'annual_domain_cost': spec.annual_domain_cost,
+        'monthly_domain_cost': spec.monthly_domain_cost,
+        'customers_per_month': customers_per_month,
+        'months': months,
+        'mode': mode,
+        'seed': seed,
+        'sources': _sources_digest(),
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class ResultCache:
+    """Size-bounded LRU cache of raw ResultTables on disk"""
+
+    SUFFIX = '.npz'
+    DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+    def __init__(self, directory: str = os.path.join('output', 'cache'),
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        if max_bytes <= 0:
+            raise ValueError(f"max_bytes must be positive, got {max_bytes}")
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + self.SUFFIX)
+
+    def get(self, key: str) -> Optional[ResultTable]:
+        """Load a cached result, or None on a miss"""
+        path = self._path(key)
+        try:
+            results = ResultTable.from_npz(path)
+        except (FileNotFoundError, KeyError, ValueError, OSError):
+            # Missing or unreadable (e.g. truncated) entries count as misses
+            self.misses += 1
+            return None
+        # Mark the entry as recently used
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        self.hits += 1
+        return results
+
+    def put(self, key: str, results: ResultTable) -> None:
+        """Store a result column by column, then trim the cache to its budget"""
+        os.makedirs(self.directory, exist_ok=True)
+        # Write to a temporary file first so readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                results.to_npz(f)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self.evict()
+
+    def entries(self) -> List[Tuple[str, float, int]]:
+        """(path, last use, bytes) of every entry, least recently used first"""
+        if not os.path.isdir(self.directory):
+            return []
+        entries = []
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(self.SUFFIX):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                # Evicted by another process meanwhile
+                continue
+            entries.append((entry.path, stat.st_mtime, stat.st_size))
+        return sorted(entries, key=lambda e: e[1])
+
+    def size(self) -> int:
+        """Total bytes used by the cache"""
+        return sum(size for _, _, size in self.entries())
+
+    def evict(self) -> int:
+        """Remove least recently used entries until the cache fits; returns the count removed"""
+        entries = self.entries()
+        total = sum(size for _, _, size in entries)
+        removed = 0
+        for path, _, size in entries:
+            if total <= self.max_bytes:
+                break
+            total -= size
+            try:
+                os.unlink(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+    def clear(self) -> None:
+        """Remove every entry"""
+        for path, _, _ in self.entries():
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+
+def cached_results(calculator, cache: Optional[ResultCache]) -> ResultTable:
+    """`calculator.calculate_results()` through the cache.
+
+    Only reproducible runs are cached: seeded 'sample', 'counts' and 'scale'
+    runs and 'expected' runs (which draw no random numbers). A cache hit returns the
+    stored results without simulating, so `calculator.customers` stays empty;
+    runs that stream customers to a ledger are therefore never cached.
+    """
+    if (cache is None or calculator.ledger is not None
+            or (calculator.seed is None and calculator.mode != 'expected')):
+        return calculator.calculate_results()
+    seed = calculator.seed if calculator.mode != 'expected' else None
+    # 'scale' results depend on the uniforms' dtype but not on the memory cap
+    mode = calculator.mode if calculator.mode != 'scale' else f"scale-{calculator.scale_dtype}"
+    key = cache_key(calculator.customers_per_month, calculator.months, mode, seed, calculator.spec)
+    results = cache.get(key)
+    if results is None:
+        results = calculator.calculate_results()
+        cache.put(key, results)
+    return results
+
+
+def cached_calculate_revenue(calculator, cache: Optional[ResultCache]) -> 'pd.DataFrame':
+    """`calculator.calculate_revenue()` through the cache"""
+    return cached_results(calculator, cache).to_frame()
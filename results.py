@@ -0,0 +1,205 @@
+"""
+Columnar storage for per-month revenue results.
+
+A ResultBuilder preallocates one typed array per output column, with the
+columns fixed once from the model's ColumnSchema, and the engines write raw
+(unrounded) values into them month by month. The finished ResultTable rounds
+only when it is presented as a DataFrame, and can be exported to and reloaded
+from .npz (or Parquet/Arrow when pyarrow is installed) without going through
+per-month dicts.
+"""
+import csv
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, IO, List, Optional
+
+import numpy as np
+
+from schema import ColumnSchema
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+__all__ = ['RevenueMetrics', 'ResultBuilder', 'ResultTable']
+
+
+@dataclass
+class RevenueMetrics:
+    """Class to store revenue metrics for a given month"""
+    month: int
+    total_customers: int
+    new_customers: int
+    one_time_revenue: float
+    cumulative_one_time: float
+    base_hosting_revenue: float
+    monthly_upsell_revenue: float
+    total_monthly_revenue: float
+    cumulative_hosting: float
+    active_upsells: Dict[str, int]
+    package_revenue: Dict[str, float]
+
+    @property
+    def cumulative_revenue(self) -> float:
+        """Total revenue (one-time + recurring) up to and including this month"""
+        return self.cumulative_one_time + self.cumulative_hosting
+
+
+class ResultTable:
+    """Per-month results of one run, stored as one typed array per column"""
+
+    def __init__(self, columns: List[str], arrays: List[np.ndarray]):
+        if len(columns) != len(arrays):
+            raise ValueError(f"Got {len(arrays)} arrays for {len(columns)} columns")
+        self.columns = list(columns)
+        self.arrays = list(arrays)
+
+    @classmethod
+    def from_values(cls, schema: ColumnSchema, values: np.ndarray) -> 'ResultTable':
+        """Wrap a (months, columns) array evaluated from `schema`"""
+        counts = set(schema.count_columns)
+        arrays = [
+            np.rint(values[:, i]).astype(np.int64) if name in counts else values[:, i].copy()
+            for i, name in enumerate(schema.columns)
+        ]
+        return cls(schema.columns, arrays)
+
+    @classmethod
+    def from_frame(cls, df: 'pd.DataFrame') -> 'ResultTable':
+        """Wrap the columns of a DataFrame"""
+        return cls([str(c) for c in df.columns], [df[c].to_numpy() for c in df.columns])
+
+    @property
+    def months(self) -> int:
+        return len(self.arrays[0]) if self.arrays else 0
+
+    def __len__(self) -> int:
+        return self.months
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        return self.arrays[self.columns.index(column)]
+
+    def head(self, months: int) -> 'ResultTable':
+        """The first `months` months"""
+        return ResultTable(self.columns, [array[:months] for array in self.arrays])
+
+    def _presented(self, decimals: Optional[int]) -> List[np.ndarray]:
+        """Columns with floats rounded to `decimals` (None keeps raw values)"""
+        if decimals is None:
+            return list(self.arrays)
+        return [np.round(a, decimals) if a.dtype.kind == 'f' else a for a in self.arrays]
+
+    def to_frame(self, decimals: Optional[int] = 2) -> 'pd.DataFrame':
+        """Present the results as a DataFrame, rounding float columns to `decimals`"""
+        import pandas as pd
+        return pd.DataFrame(dict(zip(self.columns, self._presented(decimals))))
+
+    def to_csv(self, file: IO[str], decimals: Optional[int] = 2,
+               prefix: Optional[Dict[str, str]] = None, header: bool = True,
+               columns: Optional[List[str]] = None) -> None:
+        """Write the results as CSV without going through pandas.
+
+        `prefix` adds constant leading columns (e.g. the scenario label).
+        `columns` selects and orders the columns; names this table does not
+        have are written as empty fields.
+        """
+        prefix = prefix or {}
+        columns = self.columns if columns is None else columns
+        writer = csv.writer(file, lineterminator='\n')
+        if header:
+            writer.writerow(list(prefix) + columns)
+        lead = list(prefix.values())
+        presented = dict(zip(self.columns, self._presented(decimals)))
+        missing = [''] * self.months
+        for row in zip(*(presented[c].tolist() if c in presented else missing for c in columns)):
+            writer.writerow(lead + list(row))
+
+    def metrics(self, month: int) -> RevenueMetrics:
+        """Headline metrics of one month (1-based)"""
+        i = month - 1
+        if not 0 <= i < self.months:
+            raise ValueError(f"Month {month} is outside 1..{self.months}")
+        cumulative_one_time = float(self["One-Time Revenue (Cumulative)"][i])
+        previous_one_time = float(self["One-Time Revenue (Cumulative)"][i - 1]) if i else 0.0
+        upsells = {
+            name[len("Upsell: "):]: int(array[i])
+            for name, array in zip(self.columns, self.arrays) if name.startswith("Upsell: ")
+        }
+        fixed = {
+            "Month", "Total Customers", "New Customers", "One-Time Revenue (Cumulative)",
+            "Base Hosting Revenue", "Upsell Revenue", "Total Monthly Revenue",
+            "Total Revenue (Cumulative)"
+        }
+        packages = {
+            name: float(array[i])
+            for name, array in zip(self.columns, self.arrays)
+            if name not in fixed and not name.startswith("Upsell: ")
+        }
+        return RevenueMetrics(
+            month=int(self["Month"][i]),
+            total_customers=int(self["Total Customers"][i]),
+            new_customers=int(self["New Customers"][i]),
+            one_time_revenue=cumulative_one_time - previous_one_time,
+            cumulative_one_time=cumulative_one_time,
+            base_hosting_revenue=float(self["Base Hosting Revenue"][i]),
+            monthly_upsell_revenue=float(self["Upsell Revenue"][i]),
+            total_monthly_revenue=float(self["Total Monthly Revenue"][i]),
+            cumulative_hosting=float(self["Total Revenue (Cumulative)"][i]) - cumulative_one_time,
+            active_upsells=upsells,
+            package_revenue=packages
+        )
+
+    # Export / import
+
+    def to_npz(self, path, compressed: bool = False) -> None:
+        """Save the raw columns as an .npz file (a path or binary file object)"""
+        arrays = {f'c{i}': array for i, array in enumerate(self.arrays)}
+        save = np.savez_compressed if compressed else np.savez
+        save(path, columns=np.array(self.columns, dtype=str), **arrays)
+
+    @classmethod
+    def from_npz(cls, path: str) -> 'ResultTable':
+        """Load columns saved with `to_npz`"""
+        with np.load(path, allow_pickle=False) as data:
+            columns = data['columns'].tolist()
+            return cls(columns, [data[f'c{i}'] for i in range(len(columns))])
+
+    def to_arrow(self):
+        """The raw columns as a pyarrow Table (requires pyarrow)"""
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise ImportError("Arrow export requires pyarrow (pip install pyarrow)") from None
+        return pa.table(dict(zip(self.columns, self.arrays)))
+
+    def to_parquet(self, path: str) -> None:
+        """Save the raw columns as a Parquet file (requires pyarrow)"""
+        table = self.to_arrow()
+        import pyarrow.parquet as pq
+        pq.write_table(table, path)
+
+    @classmethod
+    def from_parquet(cls, path: str) -> 'ResultTable':
+        """Load a Parquet file written by `to_parquet`"""
+        import pandas as pd
+        return cls.from_frame(pd.read_parquet(path))
+
+
+class ResultBuilder:
+    """Preallocated typed columns filled one month at a time"""
+
+    def __init__(self, schema: ColumnSchema, months: int):
+        self.columns = list(schema.columns)
+        counts = set(schema.count_columns)
+        # Counts are integers; every other column holds raw float amounts
+        self.arrays = [
+            np.zeros(months, dtype=np.int64 if name in counts else np.float64)
+            for name in self.columns
+        ]
+        self.months_filled = 0
+
+    def column(self, name: str) -> np.ndarray:
+        """The array backing a column, for direct writes"""
+        return self.arrays[self.columns.index(name)]
+
+    def build(self) -> ResultTable:
+        """The months written so far as a ResultTable"""
+        return ResultTable(self.columns, self.arrays).head(self.months_filled)
@@ -1,170 +1,358 @@
 import random
-import pandas as pd
-from typing import Dict, List, Tuple
-from dataclasses import dataclass
+import time
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, Optional
 import numpy as np
 
 # Import from config and hidden_costs
-from config import (
-    SETUP_FEE,
-    MONTHS_TO_CALCULATE,
-    PLANS,
-    ADDONS,
-    CURRENT_MODEL,
-    REVENUE_STREAMS
-)
+from config import MONTHS_TO_CALCULATE
 
 from models import (
-    BASE_MONTHLY_HOSTING_FEE,
     generate_customer_upsells,
-    CustomerUpsells,
-    UPSELL_PACKAGES
+    CustomerTable
 )
 
-@dataclass
-class RevenueMetrics:
-    """Class to store revenue metrics for a given month"""
-    month: int
-    total_customers: int
-    new_customers: int
-    one_time_revenue: float
-    cumulative_one_time: float
-    base_hosting_revenue: float
-    monthly_upsell_revenue: float
-    total_monthly_revenue: float
-    cumulative_hosting: float
-    active_upsells: Dict[str, int]
-    package_revenue: Dict[str, float]
+from model_spec import ModelLike, get_spec
+from results import RevenueMetrics, ResultBuilder, ResultTable
+
+# pandas and the vectorized engines are imported only by the methods that
+# need them, so a plain sample run starts quickly
+if TYPE_CHECKING:
+    import pandas as pd
+    from monte_carlo import MonteCarloResult
+    from streaming_stats import TrialSummary
+    from ledger import LedgerSink
+    from trial_store import TrialStore
+
+# Early-stop predicate of `RevenueCalculator.iter_months`
+StopPredicate = Callable[[RevenueMetrics], bool]
+
+
+def revenue_reaches(amount: float) -> StopPredicate:
+    """Stop once the cumulative revenue (one-time + recurring) reaches `amount`"""
+    def stop(metrics: RevenueMetrics) -> bool:
+        return metrics.cumulative_revenue >= amount
+    return stop
+
+
+def break_even(initial_investment: float, monthly_cost: float = 0.0) -> StopPredicate:
+    """Stop once the cumulative revenue covers `initial_investment` plus
+    `monthly_cost` for every month so far"""
+    def stop(metrics: RevenueMetrics) -> bool:
+        return metrics.cumulative_revenue >= initial_investment + monthly_cost * metrics.month
+    return stop
+
 
 class RevenueCalculator:
-    """Handles all revenue calculation logic"""
+    """Handles all revenue calculation logic.
+
+    `model` selects the business model: a ModelSpec, a name in config.MODELS
+    or a model definition dict. By default the model selected in config.py
+    is used, so several models can be calculated in one process.
+    """
+    
+    # 'sample' draws one random path customer by customer; 'expected'
+    # computes the exact expected value of every column with no sampling;
+    # 'counts' draws each month's cohort as aggregate counts; 'scale' draws
+    # every customer in memory-capped chunks without keeping them
+    MODES = ('sample', 'expected', 'counts', 'scale')
     
-    def __init__(self, customers_per_month: int, months: int = MONTHS_TO_CALCULATE):
+    def __init__(self, customers_per_month: int, months: int = MONTHS_TO_CALCULATE,
+                 mode: str = 'sample', seed: Optional[int] = None,
+                 month_hook: Optional[Callable[[int, float], None]] = None,
+                 model: ModelLike = None, ledger: Optional['LedgerSink'] = None,
+                 memory_limit: Optional[int] = None, scale_dtype: str = 'float32'):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown mode '{mode}', expected one of {self.MODES}")
+        if ledger is not None and mode not in ('sample', 'scale'):
+            raise ValueError(f"A customer ledger requires mode 'sample' or 'scale', got '{mode}'")
+        self.spec = get_spec(model)
         self.customers_per_month = customers_per_month
         self.months = months
-        self.customer_cohorts = []
+        self.mode = mode
+        self.seed = seed
+        self.variance = None
+        # Working memory cap (bytes) and uniform dtype of the 'scale' mode
+        self.memory_limit = memory_limit
+        self.scale_dtype = scale_dtype
+        # Optional callback(month, seconds) invoked after each simulated month
+        self.month_hook = month_hook
+        # Seconds spent per stage of the last calculate_revenue call
+        self.timings: Dict[str, float] = {}
+        # Seeded runs draw from their own stream; unseeded runs keep using
+        # the global random state
+        self._random = random.Random(seed) if seed is not None else random
+        self.customers = CustomerTable(spec=self.spec)
+        # Optional sink streaming every customer out as it is simulated; the
+        # table then only holds the latest month's cohort
+        self.ledger = ledger
+        self.total_customers = 0
         self.cumulative_one_time = 0
         self.cumulative_hosting = 0
-        self.data = []
+        # Results of the last calculate_revenue call, unrounded
+        self.results: Optional[ResultTable] = None
 
-    def calculate_revenue(self) -> pd.DataFrame:
+        # Running totals over every customer acquired so far, so each month
+        # only has to absorb its new customers instead of rescanning cohorts
+        self.monthly_upsell_total = 0.0
+        self.revenue_by_stream = {stream: 0.0 for stream in self.spec.revenue_streams}
+        self.plan_revenues = {name: 0.0 for name in self.spec.plan_names}
+        self.customers_by_plan = {name: 0 for name in self.spec.plan_names}
+        self.package_counts = {name: 0 for name in self.spec.addon_names}
+
+        # Typed output columns, preallocated from the schema. Columns are
+        # written in the order the original per-month dict assigned them, so
+        # names shared by several sources keep the last value written.
+        self._builder = ResultBuilder(self.spec.schema, months)
+        column = self._builder.column
+        self._month_col = column("Month")
+        self._total_customers_col = column("Total Customers")
+        self._new_customers_col = column("New Customers")
+        self._cumulative_one_time_col = column("One-Time Revenue (Cumulative)")
+        self._base_hosting_col = column("Base Hosting Revenue")
+        self._upsell_col = column("Upsell Revenue")
+        self._total_monthly_col = column("Total Monthly Revenue")
+        self._cumulative_total_col = column("Total Revenue (Cumulative)")
+        self._package_cols = [
+            (name, column(f"Upsell: {display_name}"))
+            for name, display_name in zip(self.spec.addon_names, self.spec.addon_display_names)
+        ]
+        self._stream_cols = [(stream, column(stream)) for stream in self.revenue_by_stream]
+        self._plan_cols = [(name, column(name.capitalize())) for name in self.plan_revenues]
+
+    @property
+    def customer_cohorts(self) -> CustomerTable:
+        """Every customer acquired so far, as read-only record views (only the
+        latest month's cohort when customers are streamed to a ledger)"""
+        return self.customers
+
+    def calculate_revenue(self) -> 'pd.DataFrame':
         """Calculate revenue metrics for all months"""
+        results = self.calculate_results()
+        start = time.perf_counter()
+        df = results.to_frame()
+        self.timings['dataframe'] = time.perf_counter() - start
+        return df
+
+    def calculate_results(self) -> ResultTable:
+        """Calculate the raw (unrounded) results without building a DataFrame"""
+        start = time.perf_counter()
+        if self.mode == 'sample':
+            for _ in self._simulate_months():
+                pass
+            self.results = self._builder.build()
+        else:
+            self.results = self._calculate_vectorized()
+        self.timings = {'simulation': time.perf_counter() - start}
+        return self.results
+
+    def iter_months(self, stop: Optional[StopPredicate] = None) -> Iterator[RevenueMetrics]:
+        """Yield each month's metrics as soon as the month is computed.
+
+        Iteration ends after the first month for which `stop(metrics)` is
+        true (e.g. `revenue_reaches(100_000)` or `break_even(50_000)`), or
+        when the consumer stops early. `self.results` then holds the months
+        computed so far. The other modes are vectorized, so they compute every
+        month up front and yield them one by one.
+        """
+        table = None
+        months_done = 0
+        try:
+            if self.mode == 'sample':
+                # A view over the builder's columns, which fill month by month
+                table = ResultTable(self._builder.columns, self._builder.arrays)
+                months = self._simulate_months()
+            else:
+                table = self._calculate_vectorized()
+                months = iter(range(1, self.months + 1))
+            for month in months:
+                months_done = month
+                metrics = table.metrics(month)
+                yield metrics
+                if stop is not None and stop(metrics):
+                    break
+        finally:
+            if table is not None:
+                self.results = table.head(months_done)
+
+    def summarize_trials(self, trials: int, seed: Optional[int] = None,
+                         relative_accuracy: float = 0.01,
+                         sampling: str = 'independent') -> 'TrialSummary':
+        """Like `simulate_trials`, but keep only streaming statistics.
+
+        Returns a TrialSummary with per-month means, standard deviations and
+        percentile bands (within `relative_accuracy`) whose memory does not
+        grow with `trials`.
+        """
+        from monte_carlo import MonteCarloEngine
+        engine = MonteCarloEngine(self.customers_per_month, self.months, seed=seed, spec=self.spec,
+                                  sampling=sampling)
+        return engine.summarize(trials, relative_accuracy)
+
+    def store_trials(self, trials: int, path: str, seed: Optional[int] = None,
+                     sampling: str = 'independent') -> 'TrialStore':
+        """Like `simulate_trials`, but write every trial to an on-disk TrialStore.
+
+        The raw (trials, months, columns) values are memory-mapped from `path`
+        instead of held in RAM; reopen them later with `TrialStore.open(path)`.
+        """
+        from monte_carlo import MonteCarloEngine
+        engine = MonteCarloEngine(self.customers_per_month, self.months, seed=seed, spec=self.spec,
+                                  sampling=sampling)
+        return engine.run_to_store(trials, path, metadata={'seed': seed})
+
+    def _simulate_months(self) -> Iterator[int]:
+        """Simulate the months one at a time, yielding each month once it is stored"""
         for month in range(1, self.months + 1):
-            self._process_month(month)
-        return pd.DataFrame(self.data)
+            if self.month_hook is None:
+                self._process_month(month)
+            else:
+                month_start = time.perf_counter()
+                self._process_month(month)
+                self.month_hook(month, time.perf_counter() - month_start)
+            yield month
+
+    def _calculate_vectorized(self) -> ResultTable:
+        """Every month at once, for the modes other than 'sample'"""
+        if self.mode == 'expected':
+            return self._calculate_expected()
+        if self.mode == 'counts':
+            return self._calculate_counts()
+        return self._calculate_scale()
+
+    def _calculate_expected(self) -> ResultTable:
+        """Expected value of every column; the variance is kept in self.variance.
+
+        Count columns (customers, addon packages) are rounded to whole numbers
+        like in the other modes; `expected_revenue` gives the fractional means.
+        """
+        from expected_value import expected_revenue
+        expected, self.variance = expected_revenue(self.customers_per_month, self.months, spec=self.spec)
+        schema = self.spec.schema
+        return ResultTable.from_values(schema, expected[schema.columns].to_numpy(dtype=np.float64))
+
+    def _calculate_counts(self) -> ResultTable:
+        """Sample each month's cohort as counts; cost is independent of cohort size"""
+        from count_sampling import CohortCountSampler
+        sampler = CohortCountSampler(
+            self.customers_per_month, np.random.default_rng(self.seed), spec=self.spec
+        )
+        values = self.spec.schema.evaluate(sampler.sample((self.months,)))
+        return ResultTable.from_values(self.spec.schema, values)
+
+    def _calculate_scale(self) -> ResultTable:
+        """Draw every customer in chunks that fit `memory_limit`, keeping only the aggregates"""
+        from scale_sampling import DEFAULT_MEMORY_LIMIT, ChunkedCohortSampler
+        sampler = ChunkedCohortSampler(
+            self.customers_per_month, self.seed, spec=self.spec,
+            memory_limit=self.memory_limit or DEFAULT_MEMORY_LIMIT,
+            dtype=self.scale_dtype, ledger=self.ledger
+        )
+        values = self.spec.schema.evaluate(sampler.sample(self.months))
+        return ResultTable.from_values(self.spec.schema, values)
+
+    def simulate_trials(self, trials: int, seed: Optional[int] = None,
+                        sampling: str = 'independent') -> 'MonteCarloResult':
+        """Run many trials at once with the vectorized engine.
+
+        Returns a MonteCarloResult with the same columns as `calculate_revenue`,
+        exposing per-month means, standard deviations and distributions.
+        `sampling` is one of monte_carlo.SAMPLING; 'stratified' and
+        'antithetic' trials are not independent but give less noisy means.
+        """
+        from monte_carlo import MonteCarloEngine
+        engine = MonteCarloEngine(self.customers_per_month, self.months, seed=seed, spec=self.spec,
+                                  sampling=sampling)
+        return engine.run(trials)
 
     def _process_month(self, month: int) -> None:
         """Process a single month's revenue calculations"""
         # Generate new customers and their upsells
-        new_customers = []
+        spec = self.spec
+        if self.ledger is not None:
+            self.customers.clear()
+        start_row = len(self.customers)
+        new_one_time_revenue = 0.0
+        one_time_by_stream = []
         for _ in range(self.customers_per_month):
             # Select a random plan for the customer
-            plan = random.choices(
-                PLANS,
-                weights=[p.get('probability', 1.0) for p in PLANS],
+            plan_index = self._random.choices(
+                range(spec.n_plans),
+                cum_weights=spec.plan_cum_weights,
                 k=1
             )[0]
+            plan = spec.plans[plan_index]
             
             # Generate upsells for the customer
-            upsells = generate_customer_upsells()
+            upsells = generate_customer_upsells(self._random, spec)
+            self.customers.append(month, plan_index, upsells)
             
-            # Calculate plan-specific revenue
-            plan_monthly_revenue = {}
-            plan_one_time_revenue = {}
+            # Calculate one-time revenue (setup fees + extra pages for new customers)
+            new_one_time_revenue += upsells.calculate_one_time_fees()
+            one_time_by_stream.append(upsells.get_one_time_revenue())
             
-            # Add the plan's monthly fee
-            plan_monthly_revenue[plan['name']] = plan['price']
+            # Absorb the new customer into the running totals
+            self.monthly_upsell_total += upsells.calculate_monthly_upsell_total()
+            self.customers_by_plan[plan['name']] = self.customers_by_plan.get(plan['name'], 0) + 1
             
-            # Get all revenue from upsells
-            monthly_revenue = upsells.get_monthly_revenue()
-            one_time_revenue = upsells.get_one_time_revenue()
-            
-            # Add the customer with plan information
-            new_customers.append({
-                'month_joined': month,
-                'plan': plan['name'],
-                'upsells': upsells,
-                'one_time_fee': upsells.calculate_one_time_fees(),
-                'monthly_upsell': upsells.calculate_monthly_upsell_total(),
-                'monthly_revenue': {**plan_monthly_revenue, **monthly_revenue},
-                'one_time_revenue': one_time_revenue
-            })
+            # Add monthly revenue by stream (the plan's fee is keyed by plan name)
+            monthly_revenue = {plan['name']: plan['price'], **upsells.get_monthly_revenue()}
+            for stream, amount in monthly_revenue.items():
+                if stream in self.revenue_by_stream:
+                    self.revenue_by_stream[stream] += amount
+                
+                # If this is a plan's monthly fee, add it to the plan's revenue
+                if stream in self.plan_revenues:
+                    self.plan_revenues[stream] += amount
         
-        # Add new customers to cohorts
-        self.customer_cohorts.extend(new_customers)
-        total_customers = len(self.customer_cohorts)
+        # Count active packages
+        new_rows = slice(start_row, len(self.customers))
+        new_quantities = self.customers.quantities[new_rows].sum(axis=0)
+        for name, qty in zip(spec.addon_names, new_quantities.tolist()):
+            self.package_counts[name] += qty
+        if self.ledger is not None:
+            self.ledger.write(self.customers.month_joined[new_rows], self.customers.plan_index[new_rows],
+                              self.customers.quantities[new_rows])
         
-        # Calculate one-time revenue (setup fees + extra pages for new customers)
-        new_one_time_revenue = sum(c['one_time_fee'] for c in new_customers)
+        self.total_customers += new_rows.stop - start_row
+        total_customers = self.total_customers
         self.cumulative_one_time += new_one_time_revenue
         
         # Calculate monthly recurring revenue (base hosting + monthly upsells)
-        base_hosting_revenue = total_customers * BASE_MONTHLY_HOSTING_FEE
-        monthly_upsell_revenue = sum(c['monthly_upsell'] for c in self.customer_cohorts)
+        base_hosting_revenue = total_customers * spec.base_monthly_fee
+        monthly_upsell_revenue = self.monthly_upsell_total
         
         total_monthly_revenue = base_hosting_revenue + monthly_upsell_revenue
         self.cumulative_hosting += total_monthly_revenue
         
-        # Initialize revenue tracking
-        revenue_by_stream = {stream: 0.0 for stream in REVENUE_STREAMS}
-        plan_revenues = {plan['name']: 0.0 for plan in PLANS}
-        
-        # Track customers by plan
-        customers_by_plan = {plan['name']: 0 for plan in PLANS}
-        
-        # Aggregate revenue across all customers
-        for customer in self.customer_cohorts:
-            # Count customers by plan
-            customer_plan = customer.get('plan', PLANS[0]['name'])
-            customers_by_plan[customer_plan] = customers_by_plan.get(customer_plan, 0) + 1
-            
-            # Add monthly revenue by stream
-            for stream, amount in customer['monthly_revenue'].items():
+        # One-time revenue only counts in the month the customer joined
+        revenue_by_stream = dict(self.revenue_by_stream)
+        for one_time_revenue in one_time_by_stream:
+            for stream, amount in one_time_revenue.items():
                 if stream in revenue_by_stream:
                     revenue_by_stream[stream] += amount
-                
-                # If this is a plan's monthly fee, add it to the plan's revenue
-                if stream in plan_revenues:
-                    plan_revenues[stream] += amount
-            
-            # Add one-time revenue for new customers
-            if customer['month_joined'] == month:
-                for stream, amount in customer['one_time_revenue'].items():
-                    if stream in revenue_by_stream:
-                        revenue_by_stream[stream] += amount
         
-        # Count active packages across all customers
-        package_counts = {}
-        for name in UPSELL_PACKAGES:
-            count = sum(c['upsells'].get_quantity(name) for c in self.customer_cohorts)
-            package_counts[f"Upsell: {UPSELL_PACKAGES[name].name}"] = count
-        
-        # Store monthly data
-        month_data = {
-            "Month": month,
-            "Total Customers": total_customers,
-            "New Customers": len(new_customers),
-            "One-Time Revenue (Cumulative)": round(self.cumulative_one_time, 2),
-            "Base Hosting Revenue": round(base_hosting_revenue, 2),
-            "Upsell Revenue": round(monthly_upsell_revenue, 2),
-            "Total Monthly Revenue": round(total_monthly_revenue, 2),
-            "Total Revenue (Cumulative)": round(self.cumulative_one_time + self.cumulative_hosting, 2),
-        }
+        # Store monthly data as raw values; rounding happens at presentation
+        i = month - 1
+        self._month_col[i] = month
+        self._total_customers_col[i] = total_customers
+        self._new_customers_col[i] = self.customers_per_month
+        self._cumulative_one_time_col[i] = self.cumulative_one_time
+        self._base_hosting_col[i] = base_hosting_revenue
+        self._upsell_col[i] = monthly_upsell_revenue
+        self._total_monthly_col[i] = total_monthly_revenue
+        self._cumulative_total_col[i] = self.cumulative_one_time + self.cumulative_hosting
         
         # Add package counts
-        month_data.update(package_counts)
+        for name, col in self._package_cols:
+            col[i] = self.package_counts[name]
         
         # Add revenue by stream (including plan-specific revenues)
-        for stream, amount in revenue_by_stream.items():
-            month_data[stream] = round(amount, 2)
+        for stream, col in self._stream_cols:
+            col[i] = revenue_by_stream[stream]
             
-        # Add plan-specific revenues (capitalized to match the expected column names)
-        for plan_name, amount in plan_revenues.items():
-            month_data[plan_name.capitalize()] = round(amount, 2)
-                
-        # Ensure all plan columns exist in the output, even if zero
-        for plan in PLANS:
-            if plan['name'] not in month_data:
-                month_data[plan['name']] = 0.0
+        # Add plan-specific revenues (capitalized to match the expected column names);
+        # lowercase plan columns that nothing writes stay at zero
+        for plan_name, col in self._plan_cols:
+            col[i] = self.plan_revenues[plan_name]
         
-        self.data.append(month_data)
+        self._builder.months_filled = month
@@ -0,0 +1,165 @@
+"""
+Chunked, memory-capped sampling of very large cohorts.
+
+The 'scale' mode of RevenueCalculator draws every customer individually, like
+'sample' mode, but never keeps them: each month's cohort is drawn a chunk of
+customers at a time into reused buffers, turned into plan and addon choices
+with the vectorized engine's rules (`monte_carlo.customer_choices`), and only
+the month's aggregates are kept (or streamed to a ledger). Memory therefore
+depends on the chunk size, which is derived from a memory cap, not on the
+number of customers.
+
+Precision: the per-customer uniforms are float32 by default. NumPy draws
+float32 uniforms on a grid of 2^-24, so every plan and addon probability is
+effectively rounded up to that grid, a bias of at most 2^-24 (6e-8) per
+draw; `float32_probability_bias` gives the exact bias of a model. Choices
+are small integers and the monthly aggregates are exact int64 counts, and
+revenue is computed from them in float64, so no rounding accumulates over
+customers or months. `dtype=np.float64` removes the grid bias at twice the
+memory per customer.
+
+Every block of BLOCK_CUSTOMERS customers draws from its own stream derived
+from the seed, the month and the block index, so results do not depend on
+the chunk size, and hence on the memory cap.
+"""
+from math import ceil
+from typing import TYPE_CHECKING, Any, Optional
+
+import numpy as np
+
+from model_spec import ModelSpec, CURRENT_SPEC
+from monte_carlo import CustomerUniforms, customer_choices
+from seeding import new_master_seed
+
+if TYPE_CHECKING:
+    from ledger import LedgerSink
+
+__all__ = ['ChunkedCohortSampler', 'float32_probability_bias', 'SCALE_DTYPES']
+
+# Customers per random stream; chunks are whole numbers of blocks
+BLOCK_CUSTOMERS = 4096
+
+# Default cap on the sampler's working memory
+DEFAULT_MEMORY_LIMIT = 256 * 2**20
+
+# Dtypes of the per-customer uniforms
+SCALE_DTYPES = ('float32', 'float64')
+
+# Resolution of NumPy's float32 uniforms
+FLOAT32_UNIFORM_STEP = 2.0 ** -24
+
+
+def float32_probability_bias(spec: ModelSpec = CURRENT_SPEC) -> float:
+    """Largest difference between a model's probabilities and the chance that
+    a float32 uniform selects them"""
+    grid = 1.0 / FLOAT32_UNIFORM_STEP
+    probabilities = list(spec.addon_probs)
+    if spec.n_plans:
+        cum_weights = np.array(spec.plan_cum_weights, dtype=np.float64)
+        probabilities += list(cum_weights / cum_weights[-1])
+    # P(u < p) for u uniform on the grid k * 2^-24
+    return max((abs(np.ceil(p * grid) / grid - p) for p in probabilities), default=0.0)
+
+
+class ChunkedCohortSampler:
+    """Draws per-month cohort aggregates a chunk of customers at a time.
+
+    `memory_limit` caps the bytes of the buffers and temporaries of one
+    chunk; a ValueError is raised when not even one block of customers fits.
+    Customers are optionally written to `ledger` as they are drawn.
+    """
+
+    def __init__(
+        self,
+        customers_per_month: int,
+        seed: Optional[int] = None,
+        spec: ModelSpec = CURRENT_SPEC,
+        memory_limit: int = DEFAULT_MEMORY_LIMIT,
+        dtype: Any = np.float32,
+        ledger: Optional['LedgerSink'] = None
+    ):
+        self.dtype = np.dtype(dtype)
+        if self.dtype.name not in SCALE_DTYPES:
+            raise ValueError(f"Unsupported dtype '{self.dtype.name}', expected one of {SCALE_DTYPES}")
+        self.customers_per_month = customers_per_month
+        self.seed = seed if seed is not None else new_master_seed()
+        self.spec = spec
+        self.memory_limit = memory_limit
+        self.ledger = ledger
+
+        block_bytes = BLOCK_CUSTOMERS * self.bytes_per_customer
+        if memory_limit < block_bytes:
+            raise ValueError(
+                f"memory_limit of {memory_limit:,} bytes is below the minimum of {block_bytes:,} "
+                f"({BLOCK_CUSTOMERS} customers of {self.bytes_per_customer} bytes)"
+            )
+        blocks = min(memory_limit // block_bytes, max(ceil(customers_per_month / BLOCK_CUSTOMERS), 1))
+        self.chunk_customers = int(blocks) * BLOCK_CUSTOMERS
+
+    @property
+    def bytes_per_customer(self) -> int:
+        """Peak working memory per customer of a chunk"""
+        spec = self.spec
+        slots = sum(spec.addon_slots)
+        widest = max(spec.addon_slots, default=0)
+        groups = len(spec.exclusive_groups)
+        # Uniform buffers
+        uniforms = self.dtype.itemsize * (int(spec.n_plans > 0) + slots + groups)
+        # Plan choice: scaled uniform and indices (float64 and intp)
+        plan = 24 if spec.n_plans else 0
+        # Quantities (int16), the widest addon's comparison and its sum, the
+        # exclusive groups' copies and tie-breaks
+        addons = 2 * spec.n_addons + widest + 8
+        exclusive = max((12 * len(g) + 10 for g in spec.exclusive_groups), default=0)
+        # Ledger month column and the aggregation temporaries
+        return uniforms + plan + addons + exclusive + 16
+
+    def working_set_bytes(self) -> int:
+        """Peak working memory of one chunk"""
+        return self.chunk_customers * self.bytes_per_customer
+
+    def sample(self, months: int) -> np.ndarray:
+        """Cohort aggregates of months 1..months, shape (months, n_features)"""
+        spec = self.spec
+        n = self.customers_per_month
+        chunk = self.chunk_customers
+        # Reused for every chunk of every month
+        plan = np.empty(chunk, dtype=self.dtype) if spec.n_plans else None
+        addons = [np.empty((chunk, slots), dtype=self.dtype) for slots in spec.addon_slots]
+        groups = [np.empty(chunk, dtype=self.dtype) for _ in spec.exclusive_groups]
+
+        counts = np.zeros((months, spec.schema.n_features), dtype=np.int64)
+        counts[:, 0] = n
+        for month in range(1, months + 1):
+            for start in range(0, n, chunk):
+                size = min(chunk, n - start)
+                self._draw(month, start, size, plan, addons, groups)
+                uniforms = CustomerUniforms(
+                    plan[:size] if plan is not None else None,
+                    [u[:size] for u in addons],
+                    [u[:size] for u in groups]
+                )
+                plan_idx, quantities = customer_choices(uniforms, spec)
+                if plan_idx is not None:
+                    counts[month - 1, 1:1 + spec.n_plans] += np.bincount(plan_idx, minlength=spec.n_plans)
+                counts[month - 1, 1 + spec.n_plans:] += quantities.sum(axis=0, dtype=np.int64)
+                if self.ledger is not None:
+                    self.ledger.write(np.full(size, month, dtype=np.int32),
+                                      plan_idx if plan_idx is not None else np.zeros(size, dtype=np.intp),
+                                      quantities)
+        return counts.astype(np.float64)
+
+    def _draw(self, month: int, start: int, size: int, plan: Optional[np.ndarray],
+              addons: list, groups: list) -> None:
+        """Fill the buffers with the uniforms of customers [start, start + size) of a month"""
+        for offset in range(0, size, BLOCK_CUSTOMERS):
+            block = (start + offset) // BLOCK_CUSTOMERS
+            rows = slice(offset, min(offset + BLOCK_CUSTOMERS, size))
+            rng = np.random.default_rng(np.random.SeedSequence(self.seed, spawn_key=(month, block)))
+            # Same draw order as monte_carlo.draw_uniforms
+            if plan is not None:
+                rng.random(dtype=self.dtype, out=plan[rows])
+            for u in addons:
+                rng.random(dtype=self.dtype, out=u[rows])
+            for u in groups:
+                rng.random(dtype=self.dtype, out=u[rows])
@@ -0,0 +1,165 @@
+"""
+Column schema shared by the vectorized revenue engines.
+
+Every column `RevenueCalculator._process_month` emits is a linear function of
+per-cohort aggregates: how many customers joined, how many picked each plan and
+how many units of each addon they bought. A column can depend on the cohort that
+joined this month (NEW), on every customer joined so far (ACTIVE), or on every
+customer weighted by the number of months they have been paying (GROWTH, used
+by the cumulative totals). The schema stores one weight matrix per view so the
+engines only need to produce per-month cohort aggregates.
+"""
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, List
+
+import numpy as np
+
+from model_spec import ModelSpec, CURRENT_SPEC
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Views over the cohort aggregates
+NEW, ACTIVE, GROWTH = 0, 1, 2
+
+__all__ = [
+    'NEW',
+    'ACTIVE',
+    'GROWTH',
+    'ColumnSchema',
+    'build_column_schema',
+    'DEFAULT_SCHEMA'
+]
+
+@dataclass(frozen=True)
+class ColumnSchema:
+    """Output columns and the weights that derive them from cohort aggregates.
+
+    Feature layout: index 0 is the customer count, followed by one count per
+    plan and one total quantity per addon.
+    """
+    columns: List[str]
+    weights: np.ndarray  # shape (3, n_features, n_columns)
+    n_plans: int
+    n_addons: int
+
+    @property
+    def n_features(self) -> int:
+        return 1 + self.n_plans + self.n_addons
+
+    def index(self, column: str) -> int:
+        """Position of a column in the output"""
+        return self.columns.index(column)
+
+    @property
+    def count_columns(self) -> List[str]:
+        """Columns that hold customer or package counts"""
+        fixed = ("Month", "Total Customers", "New Customers")
+        return [c for c in self.columns if c in fixed or c.startswith("Upsell: ")]
+
+    def to_frame(self, values: np.ndarray, decimals: int = 2) -> 'pd.DataFrame':
+        """Present one run's (months, columns) values like `_process_month` does"""
+        import pandas as pd
+        df = pd.DataFrame(values, columns=self.columns).round(decimals)
+        for column in self.count_columns:
+            df[column] = df[column].round().astype(int)
+        return df
+
+    def evaluate(self, new_features: np.ndarray) -> np.ndarray:
+        """Turn per-month cohort aggregates into output columns.
+
+        `new_features` has shape (..., months, n_features) and holds the
+        aggregates of the customers that joined in each month. Returns an
+        array of shape (..., months, n_columns).
+        """
+        new_features = np.asarray(new_features, dtype=np.float64)
+        active = np.cumsum(new_features, axis=-2)
+        growth = np.cumsum(active, axis=-2)
+        values = (
+            new_features @ self.weights[NEW]
+            + active @ self.weights[ACTIVE]
+            + growth @ self.weights[GROWTH]
+        )
+        months = new_features.shape[-2]
+        values[..., self.index("Month")] = np.arange(1, months + 1)
+        return values
+
+
+def build_column_schema(spec: 'ModelSpec') -> ColumnSchema:
+    """Build the column schema, mirroring the key order of `_process_month`"""
+    n_plans, n_addons = spec.n_plans, spec.n_addons
+    n_features = 1 + n_plans + n_addons
+    count = 0
+    plan_feature = {name: 1 + i for i, name in enumerate(spec.plan_names)}
+    addon_offset = 1 + n_plans
+
+    def column() -> np.ndarray:
+        return np.zeros((3, n_features))
+
+    # Per-customer building blocks
+    one_time_fee = np.zeros(n_features)
+    one_time_fee[count] = spec.setup_fee - spec.annual_domain_cost
+    one_time_fee[addon_offset:] = np.where(spec.onetime_mask, spec.addon_prices, 0.0)
+    monthly_upsell = np.zeros(n_features)
+    monthly_upsell[count] = -spec.monthly_domain_cost
+    monthly_upsell[addon_offset:] = np.where(spec.recurring_mask, spec.addon_prices, 0.0)
+    base_hosting = np.zeros(n_features)
+    base_hosting[count] = spec.base_monthly_fee
+
+    # Column definitions are inserted in the same order as the month dict
+    # so overwritten keys keep their original position.
+    cols: Dict[str, np.ndarray] = {}
+    cols["Month"] = column()
+    cols["Total Customers"] = column()
+    cols["Total Customers"][ACTIVE, count] = 1
+    cols["New Customers"] = column()
+    cols["New Customers"][NEW, count] = 1
+    cols["One-Time Revenue (Cumulative)"] = column()
+    cols["One-Time Revenue (Cumulative)"][ACTIVE] = one_time_fee
+    cols["Base Hosting Revenue"] = column()
+    cols["Base Hosting Revenue"][ACTIVE] = base_hosting
+    cols["Upsell Revenue"] = column()
+    cols["Upsell Revenue"][ACTIVE] = monthly_upsell
+    cols["Total Monthly Revenue"] = column()
+    cols["Total Monthly Revenue"][ACTIVE] = base_hosting + monthly_upsell
+    cols["Total Revenue (Cumulative)"] = column()
+    cols["Total Revenue (Cumulative)"][ACTIVE] = one_time_fee
+    cols["Total Revenue (Cumulative)"][GROWTH] = base_hosting + monthly_upsell
+
+    # Active package counts
+    for i, display_name in enumerate(spec.addon_display_names):
+        weights = column()
+        weights[ACTIVE, addon_offset + i] = 1
+        cols[f"Upsell: {display_name}"] = weights
+
+    # Revenue by stream: plans are keyed by name in each customer's monthly
+    # revenue, addons by display name; one-time addons only count when new.
+    for stream in spec.revenue_streams:
+        weights = column()
+        if stream in plan_feature:
+            weights[ACTIVE, plan_feature[stream]] += spec.plan_prices[plan_feature[stream] - 1]
+        for i, display_name in enumerate(spec.addon_display_names):
+            if display_name == stream:
+                view = ACTIVE if spec.recurring_mask[i] else NEW
+                weights[view, addon_offset + i] += spec.addon_prices[i]
+        cols[stream] = weights
+
+    # Plan-specific revenues (capitalized) and placeholder plan columns
+    for i, name in enumerate(spec.plan_names):
+        weights = column()
+        weights[ACTIVE, 1 + i] = spec.plan_prices[i]
+        cols[name.capitalize()] = weights
+    for name in spec.plan_names:
+        if name not in cols:
+            cols[name] = column()
+
+    names = list(cols)
+    return ColumnSchema(
+        columns=names,
+        weights=np.stack([cols[name] for name in names], axis=-1),
+        n_plans=n_plans,
+        n_addons=n_addons
+    )
+
+# Schema for the current model
+DEFAULT_SCHEMA = CURRENT_SPEC.schema
@@ -0,0 +1,31 @@
+"""
+Deterministic seed derivation for the Revenue Calculator.
+
+Every independent random stream (a scenario, a model, a shard of trials) gets
+its own seed derived from one master seed and a stable key, so results do not
+depend on how many workers run the streams or in which order.
+"""
+import zlib
+from typing import Union
+
+import numpy as np
+
+__all__ = ['derive_seed', 'new_master_seed']
+
+
+def _key_part(key: Union[int, str]) -> int:
+    # Strings are hashed with a stable checksum (hash() is salted per process)
+    if isinstance(key, str):
+        return zlib.crc32(key.encode('utf-8'))
+    return int(key)
+
+
+def derive_seed(master_seed: int, *keys: Union[int, str]) -> int:
+    """Derive an independent 64-bit seed from a master seed and stream keys"""
+    sequence = np.random.SeedSequence(master_seed, spawn_key=tuple(_key_part(k) for k in keys))
+    return int(sequence.generate_state(1, dtype=np.uint64)[0])
+
+
+def new_master_seed() -> int:
+    """Draw a fresh master seed from OS entropy"""
+    return int(np.random.SeedSequence().generate_state(1, dtype=np.uint64)[0])
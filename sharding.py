@@ -0,0 +1,253 @@
+"""
+Sharded Monte Carlo runs with mergeable partial results.
+
+A large risk run (models x scenarios x trials) is split into shards: shard i
+of n covers trials [i * trials // n, (i + 1) * trials // n) of every model and
+scenario, and is seeded from the master seed, the model, the scenario and the
+shard index only. Shards can therefore run on any machine, in any order, and
+each writes one compact partial per model and scenario: a TrialSummary (count,
+mean and sum of squared deviations, plus quantile sketches per month and
+column, see `streaming_stats.py`).
+
+`merge` combines any set of partials in shard order, so the merged statistics
+do not depend on where or in which order the shards ran, and turns them into
+the DataFrames ExcelGenerator and ChartGenerator consume. A local process pool
+stands in for the cluster (see tests/test_sharding.py).
+
+"The same results as a single-process run" means the same shard plan run in
+one process (`--workers 1`): merged statistics are then bit for bit the same.
+They are not the trials of one `MonteCarloEngine` seeded with the master
+seed, since every shard draws from its own derived stream.
+
+Usage:
+    python sharding.py run --seed 1 --trials 100000 --shards 16 --shard 0 1 2   # on one machine
+    python sharding.py run --seed 1 --trials 100000 --shards 16 --workers 4     # every shard locally
+    python sharding.py merge output/shards                                      # reports
+"""
+import argparse
+import os
+import sys
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from config import MONTHS_TO_CALCULATE, MODELS, get_scenarios, scenario_slug
+from model_spec import get_spec
+from monte_carlo import MonteCarloEngine
+from seeding import derive_seed
+from streaming_stats import TrialSummary
+
+__all__ = [
+    'ShardJob',
+    'plan_shards',
+    'run_shard',
+    'run_shards',
+    'load_partials',
+    'merge_partials',
+    'report_frames'
+]
+
+DEFAULT_SHARD_DIR = os.path.join('output', 'shards')
+
+
+@dataclass(frozen=True)
+class ShardJob:
+    """One shard of trials of one model and scenario"""
+    model: str
+    scenario: str
+    customers_per_month: int
+    months: int
+    trials: int         # trials of the whole run
+    shards: int         # shards of the whole run
+    shard: int
+    master_seed: int
+
+    @property
+    def trial_range(self) -> Tuple[int, int]:
+        """First and one-past-last trial of this shard"""
+        return (self.shard * self.trials // self.shards,
+                (self.shard + 1) * self.trials // self.shards)
+
+    @property
+    def seed(self) -> int:
+        return derive_seed(self.master_seed, self.model, self.scenario, 'shard', self.shard)
+
+    @property
+    def filename(self) -> str:
+        return f"{self.model}__{scenario_slug(self.scenario)}__shard{self.shard:05d}-of-{self.shards:05d}.npz"
+
+
+def plan_shards(master_seed: int, trials: int, shards: int, models: Sequence[str],
+                scenarios: Dict[str, int], months: int = MONTHS_TO_CALCULATE,
+                only: Optional[Iterable[int]] = None) -> List[ShardJob]:
+    """Every job of a run, or only those of the shards in `only`"""
+    if not 1 <= shards <= trials:
+        raise ValueError(f"shards must be between 1 and the trial count {trials}, got {shards}")
+    selected = range(shards) if only is None else sorted(set(only))
+    for shard in selected:
+        if not 0 <= shard < shards:
+            raise ValueError(f"Shard {shard} is outside 0..{shards - 1}")
+    return [
+        ShardJob(model, label, rate, months, trials, shards, shard, master_seed)
+        for shard in selected
+        for model in models
+        for label, rate in scenarios.items()
+    ]
+
+
+def run_shard(job: ShardJob, output_dir: str = DEFAULT_SHARD_DIR) -> str:
+    """Simulate one shard and save its partial summary; returns the file path"""
+    start, stop = job.trial_range
+    engine = MonteCarloEngine(job.customers_per_month, job.months, seed=job.seed,
+                              spec=get_spec(job.model))
+    summary = engine.summarize(stop - start)
+    summary.metadata = {
+        'model': job.model,
+        'scenario': job.scenario,
+        'customers_per_month': job.customers_per_month,
+        'trials': job.trials,
+        'shards': job.shards,
+        'shard': job.shard,
+        'trial_range': [start, stop],
+        'master_seed': job.master_seed,
+    }
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, job.filename)
+    # Write next to the target first so a partial never appears half-written
+    tmp_path = os.path.splitext(path)[0] + '.tmp.npz'
+    summary.save(tmp_path)
+    os.replace(tmp_path, path)
+    return path
+
+
+def run_shards(jobs: List[ShardJob], output_dir: str = DEFAULT_SHARD_DIR,
+               workers: int = 1) -> List[str]:
+    """Run jobs serially or in a local process pool; returns the partial paths in job order"""
+    if workers > 1 and len(jobs) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(run_shard, jobs, [output_dir] * len(jobs)))
+    return [run_shard(job, output_dir) for job in jobs]
+
+
+def load_partials(paths: Iterable[str]) -> List[TrialSummary]:
+    """Load partial summaries from files and directories of files"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(
+                os.path.join(path, name) for name in sorted(os.listdir(path))
+                if name.endswith('.npz') and not name.endswith('.tmp.npz')
+            )
+        else:
+            files.append(path)
+    return [TrialSummary.load(path) for path in files]
+
+
+def merge_partials(partials: List[TrialSummary]) -> Dict[str, Dict[str, TrialSummary]]:
+    """Merge partials per model and scenario, in shard order.
+
+    Partials of one model and scenario must come from the same run (master
+    seed, trial and shard counts); a shard may only appear once. Any subset
+    of a run's shards can be merged.
+    """
+    groups: Dict[Tuple[str, str], List[TrialSummary]] = {}
+    for partial in partials:
+        meta = partial.metadata
+        groups.setdefault((meta['model'], meta['scenario']), []).append(partial)
+
+    # Scenarios are reported by increasing acquisition rate, whatever the file order
+    def order(key: Tuple[str, str]) -> Tuple[str, int, str]:
+        return key[0], groups[key][0].metadata['customers_per_month'], key[1]
+
+    merged: Dict[str, Dict[str, TrialSummary]] = {}
+    for model, scenario in sorted(groups, key=order):
+        group = groups[(model, scenario)]
+        run = {(p.metadata['master_seed'], p.metadata['trials'], p.metadata['shards']) for p in group}
+        if len(run) > 1:
+            raise ValueError(f"Partials of {model}/{scenario} come from different runs: {sorted(run)}")
+        group.sort(key=lambda p: p.metadata['shard'])
+        shards = [p.metadata['shard'] for p in group]
+        if len(set(shards)) != len(shards):
+            raise ValueError(f"Duplicate shards of {model}/{scenario}: {shards}")
+
+        first = group[0]
+        summary = TrialSummary(first.columns, first.months, first.sketch.relative_accuracy,
+                               first.sketch.max_bins)
+        for partial in group:
+            summary.merge(partial)
+        meta = dict(first.metadata)
+        del meta['shard'], meta['trial_range']
+        summary.metadata = {**meta, 'merged_shards': shards}
+        merged.setdefault(model, {})[scenario] = summary
+    return merged
+
+
+def report_frames(summaries: Dict[str, TrialSummary]) -> Dict[str, pd.DataFrame]:
+    """Per-month means of every scenario, presented like `RevenueCalculator.calculate_revenue`"""
+    return {label: summary.mean().round(2) for label, summary in summaries.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sharded Monte Carlo runs")
+    subparsers = parser.add_subparsers(dest="command", metavar="COMMAND", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Simulate shards and write their partial results")
+    run_parser.add_argument("--seed", type=int, required=True,
+                            help="Master seed shared by every shard of the run")
+    run_parser.add_argument("--trials", type=int, required=True, help="Trials of the whole run")
+    run_parser.add_argument("--shards", type=int, required=True, help="Number of shards of the whole run")
+    run_parser.add_argument("--shard", type=int, nargs='+', default=None, metavar="INDEX",
+                            help="Shards to run here (default: all)")
+    run_parser.add_argument("--model", nargs='+', choices=list(MODELS), default=list(MODELS),
+                            metavar="MODEL", help=f"Models to run (default: all of {list(MODELS)})")
+    run_parser.add_argument("--customers", type=int, nargs='+', metavar="N", default=None,
+                            help="Customers acquired per month, one scenario each (default: config.SCENARIOS)")
+    run_parser.add_argument("--months", type=int, default=MONTHS_TO_CALCULATE,
+                            help=f"Months to simulate (default: {MONTHS_TO_CALCULATE})")
+    run_parser.add_argument("--workers", type=int, default=1, help="Local worker processes (default: 1)")
+    run_parser.add_argument("--output-dir", default=DEFAULT_SHARD_DIR,
+                            help=f"Directory of the partial results (default: {DEFAULT_SHARD_DIR})")
+
+    merge_parser = subparsers.add_parser("merge", help="Merge partial results into reports")
+    merge_parser.add_argument("paths", nargs='*', default=[DEFAULT_SHARD_DIR], metavar="PATH",
+                              help=f"Partial files or directories (default: {DEFAULT_SHARD_DIR})")
+    merge_parser.add_argument("--no-excel", action="store_true", help="Skip the Excel reports")
+    merge_parser.add_argument("--no-charts", action="store_true", help="Skip the charts")
+    merge_parser.add_argument("--preview", action="store_true", help="Render quick low-resolution PNG charts")
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        try:
+            jobs = plan_shards(args.seed, args.trials, args.shards, args.model,
+                               get_scenarios(args.customers), args.months, args.shard)
+        except ValueError as e:
+            parser.error(str(e))
+        for path in run_shards(jobs, args.output_dir, args.workers):
+            print(f"Saved partial: {path}")
+        return
+
+    merged = merge_partials(load_partials(args.paths))
+    if not merged:
+        print("No partial results found", file=sys.stderr)
+        sys.exit(1)
+    from excel import ExcelGenerator
+    from generate_charts import ChartGenerator
+    for model, summaries in merged.items():
+        for label, summary in summaries.items():
+            meta = summary.metadata
+            print(f"{model}: {label}: {summary.trials:,} of {meta['trials']:,} trials "
+                  f"from {len(meta['merged_shards'])} of {meta['shards']} shards")
+        dfs = report_frames(summaries)
+        if not args.no_excel:
+            ExcelGenerator(f"monte_carlo_{model}.xlsx").generate_excel(dfs, summaries)
+        if not args.no_charts:
+            chart_generator = ChartGenerator(output_dir=os.path.join('output', 'monte_carlo', model),
+                                             preview=args.preview, spec=get_spec(model))
+            chart_generator.generate_revenue_charts(dfs)
+            chart_generator.generate_fan_charts(summaries)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,371 @@
+"""
+Goal-seek solver over the acquisition rate and the horizon.
+
+Answers planning questions such as "how many customers per month do we need
+to reach $20,000 monthly revenue by month 24" or "in which month does the
+cumulative revenue cover a $50,000 investment plus $500 a month" without
+adding guesses to config.SCENARIOS and rerunning the pipeline.
+
+The minimum customers per month is found by doubling an upper bound and
+bisecting it, so a query takes O(log n) evaluations. That needs the goal's
+column to never decrease as customers are added, which holds when no
+customer can contribute a negative amount to it (`monotone_columns`); goals
+on other columns, e.g. 'Upsell Revenue' with the domain cost netted in, are
+rejected. A goal counts as met by a month once it is met in that month or
+any earlier one, so the break-even month is the first month that meets it
+in one evaluation of the whole horizon.
+
+Every evaluation is either
+  - exact (trials=0): the closed-form expected value of `expected_value.py`;
+    with a `confidence` level, the chance of meeting the goal in a month is
+    estimated from a normal approximation of the closed-form variance of
+    that month (months are not combined, so it is not the chance of having
+    met it in or before that month);
+  - sampled (trials > 0): vectorized Monte Carlo trials. Each block of
+    customers and trials draws from its own stream, customer by customer,
+    so every evaluation reuses the same uniforms: a rate uses exactly the
+    draws of the first customers of any larger rate, each trial's revenue
+    grows with the rate and the search stays monotone. The reported
+    probability is the share of trials that met the goal in or before the
+    month, with its standard error.
+
+Usage:
+    python solver.py customers --target 20000 --by-month 24
+    python solver.py customers --break-even 50000 --monthly-cost 500 --by-month 24 --trials 2000 --confidence 0.9
+    python solver.py break-even --investment 50000 --monthly-cost 500 --customers 4
+"""
+import argparse
+from dataclasses import dataclass
+from statistics import NormalDist
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from config import MONTHS_TO_CALCULATE, MODELS
+from expected_value import expected_revenue
+from model_spec import ModelLike, get_spec
+from monte_carlo import CustomerUniforms, sample_features
+from seeding import derive_seed, new_master_seed
+
+__all__ = ['Goal', 'revenue_goal', 'break_even_goal', 'Solution', 'GoalSolver', 'monotone_columns']
+
+# Search limits
+MAX_CUSTOMERS = 100_000
+MAX_MONTHS = 120
+
+# Customers and trials per random stream of the sampled evaluations
+STREAM_CUSTOMERS = 64
+STREAM_TRIALS = 64
+
+
+class Goal(NamedTuple):
+    """Reached once `column` >= amount + per_month * month"""
+    column: str
+    amount: float
+    per_month: float = 0.0
+
+    def thresholds(self, months: int) -> np.ndarray:
+        """The amount to reach in every month 1..months"""
+        return self.amount + self.per_month * np.arange(1, months + 1, dtype=np.float64)
+
+    def describe(self) -> str:
+        if self.per_month:
+            return f"{self.column} >= {self.amount:,.2f} + {self.per_month:,.2f}/month"
+        return f"{self.column} >= {self.amount:,.2f}"
+
+
+def revenue_goal(amount: float, column: str = 'Total Monthly Revenue') -> Goal:
+    """Goal of reaching `amount` in a revenue column (monthly revenue by default)"""
+    return Goal(column, float(amount))
+
+
+def break_even_goal(initial_investment: float, monthly_cost: float = 0.0) -> Goal:
+    """Goal of the cumulative revenue covering `initial_investment` plus
+    `monthly_cost` for every month so far, like `revenue_calculator.break_even`"""
+    return Goal('Total Revenue (Cumulative)', float(initial_investment), float(monthly_cost))
+
+
+def monotone_columns(spec: ModelLike = None) -> List[str]:
+    """Columns that never decrease as customers are added.
+
+    Every column is linear in the customers' features (see `schema.py`), so
+    it is monotone when no possible customer (any plan, any addon quantities)
+    contributes a negative amount through any of the column's weights.
+    """
+    spec = get_spec(spec)
+    schema = spec.schema
+    addons = slice(1 + spec.n_plans, None)
+    slots = np.array(spec.addon_slots, dtype=np.float64)
+    lowest = np.zeros(len(schema.columns))
+    for weights in schema.weights:
+        # The smallest contribution of one customer through these weights
+        low = weights[0].copy()
+        if spec.n_plans:
+            low += weights[1:1 + spec.n_plans].min(axis=0)
+        low += slots @ np.minimum(weights[addons], 0.0)
+        lowest = np.minimum(lowest, low)
+    return [c for c, low in zip(schema.columns, lowest) if c != "Month" and low >= 0]
+
+
+@dataclass(frozen=True)
+class Solution:
+    """Outcome of a query; `customers_per_month` or `month` is None when the
+    goal cannot be met within the search limits"""
+    goal: Goal
+    customers_per_month: Optional[int]
+    month: Optional[int]            # first month the goal is met
+    expected: Optional[float]       # expected value of the goal's column that month
+    # Chance of meeting the goal: in that month ('normal'), or in or before
+    # it (share of trials, 'monte carlo')
+    probability: Optional[float]
+    std_error: Optional[float]      # standard error of `probability` (sampled runs)
+    method: str                     # 'expected', 'normal' or 'monte carlo'
+    evaluations: int
+
+
+class GoalSolver:
+    """Finds the minimum acquisition rate or the first month that meets a goal.
+
+    With `trials=0` goals are met in expectation, or with probability of at
+    least `confidence` under a normal approximation. With `trials > 0` every
+    evaluation simulates that many trials from `seed`; goals are then met by
+    the mean over trials, or by at least a `confidence` share of the trials.
+    """
+
+    def __init__(self, model: ModelLike = None, trials: int = 0,
+                 confidence: Optional[float] = None, seed: Optional[int] = None):
+        if trials < 0:
+            raise ValueError(f"trials must not be negative, got {trials}")
+        if confidence is not None and not 0 < confidence < 1:
+            raise ValueError(f"confidence must be between 0 and 1, got {confidence}")
+        self.spec = get_spec(model)
+        self.trials = trials
+        self.confidence = confidence
+        self.seed = seed if seed is not None else new_master_seed()
+        self.evaluations = 0
+        self._cache: Dict[Tuple[Goal, int, int], Tuple[np.ndarray, Optional[np.ndarray]]] = {}
+
+    @property
+    def method(self) -> str:
+        if self.trials:
+            return 'monte carlo'
+        return 'normal' if self.confidence is not None else 'expected'
+
+    def _check(self, goal: Goal) -> int:
+        columns = self.spec.schema.columns
+        if goal.column not in columns or goal.column == "Month":
+            raise ValueError(f"Unknown column '{goal.column}', expected one of {columns[1:]}")
+        return self.spec.schema.index(goal.column)
+
+    # Evaluation
+
+    def evaluate(self, goal: Goal, customers_per_month: int,
+                 months: int) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """Expected value of the goal's column in every month, and the chance
+        of meeting the goal (None for plain expected values): in each month
+        under the normal approximation, in or before each month for sampled
+        runs.
+        """
+        column = self._check(goal)
+        key = (goal, customers_per_month, months)
+        if key not in self._cache:
+            self.evaluations += 1
+            if self.trials:
+                values = self._simulate(column, customers_per_month, months)
+                met = values >= goal.thresholds(months)
+                # Share of trials that met the goal in or before every month
+                self._cache[key] = values.mean(axis=0), np.logical_or.accumulate(met, axis=1).mean(axis=0)
+            else:
+                mean, variance = expected_revenue(customers_per_month, months, self.spec)
+                self._cache[key] = self._normal(goal, mean[goal.column].to_numpy(np.float64),
+                                                variance[goal.column].to_numpy(np.float64))
+        return self._cache[key]
+
+    def _normal(self, goal: Goal, mean: np.ndarray,
+                variance: np.ndarray) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        if self.confidence is None:
+            return mean, None
+        thresholds = goal.thresholds(len(mean))
+        std = np.sqrt(variance)
+        probability = np.where(mean >= thresholds, 1.0, 0.0)
+        varying = std > 0
+        normal = NormalDist()
+        probability[varying] = [
+            1.0 - normal.cdf(z) for z in (thresholds[varying] - mean[varying]) / std[varying]
+        ]
+        return mean, probability
+
+    def _simulate(self, column: int, customers: int, months: int) -> np.ndarray:
+        """One column of `trials` Monte Carlo runs, shape (trials, months).
+
+        Block (t, b) of STREAM_TRIALS trials and STREAM_CUSTOMERS customers
+        per month draws from its own stream, customer by customer, so the
+        first customers' draws are the same whatever `customers` is.
+        Streams are regenerated per evaluation rather than kept, so memory
+        stays at one block.
+        """
+        spec = self.spec
+        slots = list(spec.addon_slots)
+        # Uniforms per customer and month: plan, addon slots, exclusive-group tie-breaks
+        plan = 1 if spec.n_plans else 0
+        offsets = np.cumsum([plan] + slots).tolist()
+        width = offsets[-1] + len(spec.exclusive_groups)
+        values = np.empty((self.trials, months))
+        for t, start in enumerate(range(0, self.trials, STREAM_TRIALS)):
+            stop = min(start + STREAM_TRIALS, self.trials)
+            features = np.zeros((stop - start, months, spec.schema.n_features))
+            for b, first in enumerate(range(0, customers, STREAM_CUSTOMERS)):
+                size = min(STREAM_CUSTOMERS, customers - first)
+                rng = np.random.default_rng(derive_seed(self.seed, 'solver', months, t, b))
+                # Customer-major, so fewer customers draw a prefix of the same stream
+                u = np.moveaxis(rng.random((size, stop - start, months, width)), 0, 2)
+                uniforms = CustomerUniforms(
+                    u[..., 0] if plan else None,
+                    [u[..., offsets[a]:offsets[a + 1]] for a in range(len(slots))],
+                    [u[..., offsets[-1] + g] for g in range(len(spec.exclusive_groups))]
+                )
+                features += sample_features(uniforms, spec)
+            values[start:stop] = spec.schema.evaluate(features)[:, :, column]
+        return values
+
+    def _first_month(self, goal: Goal, mean: np.ndarray,
+                     probability: Optional[np.ndarray]) -> Optional[int]:
+        if self.confidence is not None:
+            met = probability >= self.confidence
+        else:
+            met = np.logical_or.accumulate(mean >= goal.thresholds(len(mean)))
+        return int(np.argmax(met)) + 1 if met.any() else None
+
+    def _solution(self, goal: Goal, customers: Optional[int], month: Optional[int],
+                  mean: Optional[np.ndarray], probability: Optional[np.ndarray],
+                  evaluations: int) -> Solution:
+        expected = p = std_error = None
+        if month is not None and mean is not None:
+            expected = float(mean[month - 1])
+            if probability is not None:
+                p = float(probability[month - 1])
+                if self.trials:
+                    std_error = float(np.sqrt(p * (1 - p) / self.trials))
+        return Solution(goal, customers, month, expected, p, std_error, self.method, evaluations)
+
+    # Queries
+
+    def break_even_month(self, goal: Goal, customers_per_month: int,
+                         max_months: int = MAX_MONTHS) -> Solution:
+        """The first month (up to `max_months`) that meets `goal`"""
+        if customers_per_month < 1:
+            raise ValueError(f"customers_per_month must be at least 1, got {customers_per_month}")
+        start = self.evaluations
+        mean, probability = self.evaluate(goal, customers_per_month, max_months)
+        month = self._first_month(goal, mean, probability)
+        return self._solution(goal, customers_per_month, month, mean, probability,
+                              self.evaluations - start)
+
+    def min_customers(self, goal: Goal, by_month: int = MONTHS_TO_CALCULATE,
+                      max_customers: int = MAX_CUSTOMERS) -> Solution:
+        """The fewest customers per month (up to `max_customers`) that meet
+        `goal` in or before month `by_month`"""
+        if by_month < 1:
+            raise ValueError(f"by_month must be at least 1, got {by_month}")
+        self._check(goal)
+        monotone = monotone_columns(self.spec)
+        if goal.column not in monotone:
+            raise ValueError(
+                f"Column '{goal.column}' can decrease as customers are added, so its minimum "
+                f"acquisition rate cannot be searched; expected one of {monotone}"
+            )
+        start = self.evaluations
+
+        def met(n: int) -> bool:
+            return self._first_month(goal, *self.evaluate(goal, n, by_month)) is not None
+
+        # Double an upper bound until it meets the goal, then bisect (low, high];
+        # sampled evaluations share their draws, so the search stays monotone
+        low, high = 0, 1
+        while not met(high):
+            if high >= max_customers:
+                return self._solution(goal, None, None, None, None, self.evaluations - start)
+            low, high = high, min(2 * high, max_customers)
+        while high - low > 1:
+            middle = (low + high) // 2
+            if met(middle):
+                high = middle
+            else:
+                low = middle
+        mean, probability = self.evaluate(goal, high, by_month)
+        return self._solution(goal, high, self._first_month(goal, mean, probability),
+                              mean, probability, self.evaluations - start)
+
+
+def _print_solution(solution: Solution, by_month: Optional[int] = None) -> None:
+    print(f"Goal: {solution.goal.describe()} ({solution.method}, {solution.evaluations} evaluations)")
+    if solution.customers_per_month is None or solution.month is None:
+        limit = f" by month {by_month}" if by_month else ""
+        print(f"Not reachable{limit} within the search limits")
+        return
+    print(f"Customers per month: {solution.customers_per_month}")
+    print(f"First month met:     {solution.month}")
+    print(f"Expected value:      {solution.expected:,.2f}")
+    if solution.probability is not None:
+        error = f" ± {solution.std_error:.1%}" if solution.std_error is not None else ""
+        # The normal approximation does not combine months
+        when = "in" if solution.method == 'normal' else "by"
+        print(f"Probability met:     {solution.probability:.1%}{error} ({when} month {solution.month})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Goal-seek solver over customers per month and months")
+    subparsers = parser.add_subparsers(dest="command", metavar="COMMAND", required=True)
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--model", choices=list(MODELS), default=None,
+                        help="Business model (default: the one selected in config.py)")
+    common.add_argument("--trials", type=int, default=0,
+                        help="Monte Carlo trials per evaluation (default: 0, exact expected values)")
+    common.add_argument("--confidence", type=float, default=None,
+                        help="Required chance of meeting the goal, e.g. 0.9 (default: met in expectation)")
+    common.add_argument("--seed", type=int, default=None, help="Seed of the Monte Carlo trials")
+    common.add_argument("--monthly-cost", type=float, default=0.0,
+                        help="Running cost per month added to a break-even amount (default: 0)")
+
+    customers_parser = subparsers.add_parser(
+        "customers", parents=[common], help="Minimum customers per month that meet a goal by a month")
+    goal = customers_parser.add_mutually_exclusive_group(required=True)
+    goal.add_argument("--target", type=float, help="Amount to reach in --metric")
+    goal.add_argument("--break-even", type=float, metavar="INVESTMENT",
+                      help="Initial investment the cumulative revenue must cover")
+    customers_parser.add_argument("--metric", default='Total Monthly Revenue',
+                                  help="Column of --target (default: 'Total Monthly Revenue')")
+    customers_parser.add_argument("--by-month", type=int, default=MONTHS_TO_CALCULATE,
+                                  help=f"Month by which the goal must be met (default: {MONTHS_TO_CALCULATE})")
+    customers_parser.add_argument("--max-customers", type=int, default=MAX_CUSTOMERS,
+                                  help=f"Search limit (default: {MAX_CUSTOMERS:,})")
+
+    month_parser = subparsers.add_parser(
+        "break-even", parents=[common], help="First month the cumulative revenue covers the costs")
+    month_parser.add_argument("--investment", type=float, required=True, help="Initial investment")
+    month_parser.add_argument("--customers", type=int, required=True, help="Customers acquired per month")
+    month_parser.add_argument("--max-months", type=int, default=MAX_MONTHS,
+                              help=f"Search limit (default: {MAX_MONTHS})")
+    args = parser.parse_args(argv)
+
+    try:
+        solver = GoalSolver(args.model, args.trials, args.confidence, args.seed)
+        if args.command == 'customers':
+            if args.target is not None:
+                query = revenue_goal(args.target, args.metric)
+            else:
+                query = break_even_goal(args.break_even, args.monthly_cost)
+            solution = solver.min_customers(query, args.by_month, args.max_customers)
+            by_month = args.by_month
+        else:
+            query = break_even_goal(args.investment, args.monthly_cost)
+            solution = solver.break_even_month(query, args.customers, args.max_months)
+            by_month = None
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"Model: {solver.spec.name or 'custom'}" + (f", {args.trials} trials, seed {solver.seed}" if args.trials else ""))
+    _print_solution(solution, by_month)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+"""
+Bounded-memory statistics over Monte Carlo trials.
+
+Keeping every trial's monthly table costs trials x months x columns values.
+A TrialSummary is fed one batch of trials at a time instead and keeps, per
+(month, column) cell:
+
+- the running mean and variance (Welford's algorithm, with the pairwise update
+  of Chan et al. to absorb whole batches), and
+- a quantile sketch with logarithmically spaced bins (as in DDSketch): every
+  value is counted in the bin (gamma^(k-1), gamma^k] of its magnitude, so any
+  quantile is estimated within `relative_accuracy` of a true sample value.
+  Each cell keeps a window of at most `max_bins` bins below its largest value;
+  values further down collapse into the lowest bin.
+
+Memory is fixed by the number of cells and bins, not by the trial count, and
+two summaries built from disjoint trials merge exactly (e.g. across worker
+processes or machines, see `sharding.py`).
+"""
+import json
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+__all__ = [
+    'RunningMoments',
+    'QuantileSketch',
+    'TrialSummary',
+    'DEFAULT_BANDS'
+]
+
+# Percentiles reported as risk bands
+DEFAULT_BANDS = (5, 50, 95)
+
+# Top key of a cell that has not seen a value yet
+_EMPTY = np.iinfo(np.int64).min // 4
+
+
+class RunningMoments:
+    """Online mean and variance of every cell of an array-valued stream"""
+
+    def __init__(self, shape: Tuple[int, ...]):
+        self.count = 0
+        self.mean = np.zeros(shape)
+        self.m2 = np.zeros(shape)  # sum of squared deviations from the mean
+
+    def update(self, batch: np.ndarray) -> None:
+        """Absorb a batch of observations, shape (n, *shape)"""
+        n = batch.shape[0]
+        if not n:
+            return
+        batch_mean = batch.mean(axis=0)
+        self._combine(n, batch_mean, ((batch - batch_mean) ** 2).sum(axis=0))
+
+    def merge(self, other: 'RunningMoments') -> None:
+        """Absorb the observations of another accumulator"""
+        if other.count:
+            self._combine(other.count, other.mean, other.m2)
+
+    def _combine(self, n: int, mean: np.ndarray, m2: np.ndarray) -> None:
+        total = self.count + n
+        delta = mean - self.mean
+        self.mean = self.mean + delta * (n / total)
+        self.m2 = self.m2 + m2 + delta ** 2 * (self.count * n / total)
+        self.count = total
+
+    def variance(self, ddof: int = 1) -> np.ndarray:
+        ddof = ddof if self.count > ddof else 0
+        if not self.count:
+            return np.full_like(self.m2, np.nan)
+        return self.m2 / (self.count - ddof)
+
+
+class _LogStore:
+    """Log-binned counts of one sign: a window of `max_bins` keys per cell"""
+
+    def __init__(self, cells: int, max_bins: int):
+        self.max_bins = max_bins
+        # Counts up to 2**32 - 1 per bin
+        self.counts = np.zeros((cells, max_bins), dtype=np.uint32)
+        # Key of each cell's highest bin
+        self.top = np.full(cells, _EMPTY, dtype=np.int64)
+
+    def copy(self) -> '_LogStore':
+        store = _LogStore.__new__(_LogStore)
+        store.max_bins = self.max_bins
+        store.counts = self.counts.copy()
+        store.top = self.top.copy()
+        return store
+
+    def raise_top(self, new_top: np.ndarray) -> None:
+        """Move the cells' windows up to `new_top`; bins falling below collapse into bin 0"""
+        shift = new_top - self.top
+        rows = np.nonzero(shift > 0)[0]
+        if not len(rows):
+            return
+        s = np.minimum(shift[rows], self.max_bins)[:, None]
+        bins = np.arange(self.max_bins)[None, :]
+        old = self.counts[rows]
+        source = bins + s
+        moved = np.take_along_axis(old, np.minimum(source, self.max_bins - 1), axis=1)
+        moved[source >= self.max_bins] = 0
+        moved[:, 0] = (old * (bins <= s)).sum(axis=1)
+        self.counts[rows] = moved
+        self.top[rows] = new_top[rows]
+
+    def add(self, keys: np.ndarray, valid: np.ndarray) -> None:
+        """Count the keys (n, cells) where `valid` is true"""
+        cells = self.counts.shape[0]
+        batch_top = np.where(valid, keys, _EMPTY).max(axis=0)
+        self.raise_top(np.maximum(self.top, batch_top))
+        low = self.top - (self.max_bins - 1)
+        bins = np.clip(keys - low, 0, self.max_bins - 1)
+        flat = (np.arange(cells) * self.max_bins + bins)[valid]
+        counts = np.bincount(flat, minlength=cells * self.max_bins)
+        self.counts += counts.reshape(cells, self.max_bins).astype(np.uint32)
+
+    def merge(self, other: '_LogStore') -> None:
+        top = np.maximum(self.top, other.top)
+        self.raise_top(top)
+        other = other.copy()
+        other.raise_top(top)
+        self.counts += other.counts
+
+
+class QuantileSketch:
+    """Mergeable relative-error quantile sketch for every cell of an array-valued stream"""
+
+    def __init__(self, shape: Tuple[int, ...], relative_accuracy: float = 0.01,
+                 max_bins: int = 512):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError(f"relative_accuracy must be in (0, 1), got {relative_accuracy}")
+        if max_bins < 2:
+            raise ValueError(f"max_bins must be at least 2, got {max_bins}")
+        self.shape = tuple(shape)
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = np.log(self.gamma)
+        cells = int(np.prod(self.shape))
+        self.count = 0
+        self.positive = _LogStore(cells, max_bins)
+        # Only allocated once a negative value is seen
+        self.negative: Optional[_LogStore] = None
+        self.zeros = np.zeros(cells, dtype=np.int64)
+        self.min = np.full(cells, np.inf)
+        self.max = np.full(cells, -np.inf)
+
+    @property
+    def nbytes(self) -> int:
+        stores = [self.positive] + ([self.negative] if self.negative is not None else [])
+        return sum(s.counts.nbytes + s.top.nbytes for s in stores) + 3 * self.zeros.nbytes
+
+    def _keys(self, magnitudes: np.ndarray) -> np.ndarray:
+        with np.errstate(divide='ignore'):
+            keys = np.ceil(np.log(magnitudes) / self._log_gamma)
+        return np.nan_to_num(keys, neginf=_EMPTY).astype(np.int64)
+
+    def _value(self, keys: np.ndarray) -> np.ndarray:
+        # Midpoint of the bin (gamma^(k-1), gamma^k] in relative terms
+        return 2 * np.exp(keys * self._log_gamma) / (self.gamma + 1)
+
+    def update(self, batch: np.ndarray) -> None:
+        """Absorb a batch of observations, shape (n, *shape)"""
+        n = batch.shape[0]
+        if not n:
+            return
+        values = batch.reshape(n, -1)
+        self.count += n
+        self.min = np.minimum(self.min, values.min(axis=0))
+        self.max = np.maximum(self.max, values.max(axis=0))
+        self.zeros += (values == 0).sum(axis=0)
+        keys = self._keys(np.abs(values))
+        self.positive.add(keys, values > 0)
+        negative = values < 0
+        if negative.any():
+            if self.negative is None:
+                self.negative = _LogStore(len(self.zeros), self.max_bins)
+            self.negative.add(keys, negative)
+
+    def merge(self, other: 'QuantileSketch') -> None:
+        """Absorb another sketch of the same shape and accuracy"""
+        if (other.shape, other.relative_accuracy, other.max_bins) != (
+                self.shape, self.relative_accuracy, self.max_bins):
+            raise ValueError("Only sketches with the same shape, accuracy and bins can be merged")
+        self.count += other.count
+        self.min = np.minimum(self.min, other.min)
+        self.max = np.maximum(self.max, other.max)
+        self.zeros += other.zeros
+        self.positive.merge(other.positive)
+        if other.negative is not None:
+            if self.negative is None:
+                self.negative = _LogStore(len(self.zeros), self.max_bins)
+            self.negative.merge(other.negative)
+
+    def quantile(self, q: float) -> np.ndarray:
+        """Estimated percentile `q` (0-100) of every cell"""
+        if not 0 <= q <= 100:
+            raise ValueError(f"Percentile must be in [0, 100], got {q}")
+        if not self.count:
+            return np.full(self.shape, np.nan)
+        bins = self.max_bins
+        # Bins in value order: negatives from the largest magnitude down,
+        # then zeros, then positives from the smallest magnitude up
+        parts = [self.zeros[:, None], self.positive.counts]
+        if self.negative is not None:
+            parts.insert(0, self.negative.counts[:, ::-1])
+        ordered = np.concatenate(parts, axis=1, dtype=np.int64)
+        rank = q / 100 * (self.count - 1)
+        index = (np.cumsum(ordered, axis=1) > rank).argmax(axis=1)
+
+        offset = bins if self.negative is not None else 0
+        values = np.zeros(len(self.zeros))
+        pos = index > offset
+        pos_keys = self.positive.top - (bins - 1) + (index - offset - 1)
+        values[pos] = self._value(pos_keys[pos])
+        if self.negative is not None:
+            neg = index < offset
+            neg_keys = self.negative.top - index
+            values[neg] = -self._value(neg_keys[neg])
+        # The exact extremes bound every estimate
+        return np.clip(values, self.min, self.max).reshape(self.shape)
+
+
+class TrialSummary:
+    """Per-month mean, variance and quantile bands of Monte Carlo trials in fixed memory"""
+
+    def __init__(self, columns: List[str], months: int, relative_accuracy: float = 0.01,
+                 max_bins: int = 512):
+        self.columns = list(columns)
+        self.months = months
+        shape = (months, len(self.columns))
+        self.moments = RunningMoments(shape)
+        self.sketch = QuantileSketch(shape, relative_accuracy, max_bins)
+        # Free-form description saved along with the statistics
+        self.metadata: Dict[str, Any] = {}
+
+    @property
+    def trials(self) -> int:
+        return self.moments.count
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the summary, independent of the trial count"""
+        return self.moments.mean.nbytes + self.moments.m2.nbytes + self.sketch.nbytes
+
+    def update(self, values: np.ndarray) -> None:
+        """Absorb a batch of trials, shape (trials, months, columns)"""
+        self.moments.update(values)
+        self.sketch.update(values)
+
+    def merge(self, other: 'TrialSummary') -> 'TrialSummary':
+        """Absorb the trials of another summary of the same columns"""
+        if other.columns != self.columns or other.months != self.months:
+            raise ValueError("Only summaries with the same columns and months can be merged")
+        self.moments.merge(other.moments)
+        self.sketch.merge(other.sketch)
+        return self
+
+    def _frame(self, values: np.ndarray) -> pd.DataFrame:
+        df = pd.DataFrame(values, columns=self.columns)
+        df["Month"] = np.arange(1, self.months + 1)
+        return df
+
+    def mean(self) -> pd.DataFrame:
+        """Mean of every column per month"""
+        return self._frame(self.moments.mean)
+
+    def std(self, ddof: int = 1) -> pd.DataFrame:
+        """Standard deviation of every column per month"""
+        return self._frame(np.sqrt(self.moments.variance(ddof)))
+
+    def percentile(self, q: float) -> pd.DataFrame:
+        """Estimated per-month percentile (0-100) of every column"""
+        return self._frame(self.sketch.quantile(q))
+
+    def percentiles(self, qs: Sequence[float] = DEFAULT_BANDS) -> Dict[float, pd.DataFrame]:
+        """Several per-month percentiles keyed by percentile"""
+        return {q: self.percentile(q) for q in qs}
+
+    def band_frame(self, qs: Sequence[float] = DEFAULT_BANDS) -> pd.DataFrame:
+        """One row per month with the mean and percentiles of every column"""
+        data = {"Month": np.arange(1, self.months + 1)}
+        mean = self.moments.mean
+        bands = {q: self.sketch.quantile(q) for q in qs}
+        for i, column in enumerate(self.columns):
+            if column == "Month":
+                continue
+            data[f"{column} (Mean)"] = np.round(mean[:, i], 2)
+            for q, values in bands.items():
+                data[f"{column} (P{q:g})"] = np.round(values[:, i], 2)
+        return pd.DataFrame(data)
+
+    def save(self, path: str) -> None:
+        """Save the statistics and metadata as a compressed .npz file"""
+        sketch = self.sketch
+        arrays = {
+            'count': np.array([self.moments.count, sketch.count]),
+            'mean': self.moments.mean,
+            'm2': self.moments.m2,
+            'positive_counts': sketch.positive.counts,
+            'positive_top': sketch.positive.top,
+            'zeros': sketch.zeros,
+            'min': sketch.min,
+            'max': sketch.max,
+        }
+        if sketch.negative is not None:
+            arrays['negative_counts'] = sketch.negative.counts
+            arrays['negative_top'] = sketch.negative.top
+        header = {
+            'columns': self.columns,
+            'months': self.months,
+            'relative_accuracy': sketch.relative_accuracy,
+            'max_bins': sketch.max_bins,
+            'metadata': self.metadata,
+        }
+        np.savez_compressed(path, header=np.array(json.dumps(header)), **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> 'TrialSummary':
+        """Load a summary saved with `save`"""
+        with np.load(path, allow_pickle=False) as data:
+            header = json.loads(str(data['header']))
+            summary = cls(header['columns'], header['months'], header['relative_accuracy'],
+                          header['max_bins'])
+            summary.metadata = header['metadata']
+            summary.moments.count, summary.sketch.count = (int(n) for n in data['count'])
+            summary.moments.mean = data['mean']
+            summary.moments.m2 = data['m2']
+            sketch = summary.sketch
+            sketch.positive.counts = data['positive_counts']
+            sketch.positive.top = data['positive_top']
+            sketch.zeros = data['zeros']
+            sketch.min = data['min']
+            sketch.max = data['max']
+            if 'negative_counts' in data:
+                sketch.negative = _LogStore(len(sketch.zeros), sketch.max_bins)
+                sketch.negative.counts = data['negative_counts']
+                sketch.negative.top = data['negative_top']
+        return summary
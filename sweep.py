@@ -0,0 +1,320 @@
+"""
+Parameter sweeps over prices, fees and probabilities.
+
+A sweep evaluates a whole grid of model variants (e.g. SETUP_FEE from 1500 to
+3000 against the premium plan's probability) without editing config.py and
+rerunning the pipeline per point. Parameters are named like
+
+    setup_fee, annual_domain_cost, monthly_domain_cost
+    plan.<name>.price, plan.<name>.probability
+    addon.<name>.price, addon.<name>.probability
+
+Every output column is linear in the cohort aggregates (see `schema.py`), so
+prices and fees only change the column weights. Grid points are grouped by
+their probabilities: each group's aggregates are computed once and every price
+variant is evaluated from them in one batched product.
+
+With `trials=0` each point gets its exact expected value and standard
+deviation (no sampling noise at all). With `trials > 0` every point is
+simulated from the same customer uniforms (common random numbers), so
+differences between points reflect the parameters rather than the noise. The
+trials are drawn in chunks of at most MAX_UNIFORMS_PER_CHUNK uniforms, replayed
+from one seed for every group of points, so memory does not grow with
+`trials`.
+"""
+from itertools import product
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config import MONTHS_TO_CALCULATE
+from expected_value import customer_moments
+from model_spec import ModelLike, ModelSpec, compile_model, get_spec
+from monte_carlo import MAX_UNIFORMS_PER_CHUNK, draw_uniforms, sample_features
+from schema import NEW, ACTIVE, GROWTH
+from seeding import new_master_seed
+
+__all__ = [
+    'FEE_PARAMETERS',
+    'DEFAULT_METRICS',
+    'sweep_parameters',
+    'parameter_value',
+    'parse_range',
+    'apply_parameters',
+    'ParameterSweep'
+]
+
+# Model-wide fees that can be swept, in addition to plan and addon fields
+FEE_PARAMETERS = ('setup_fee', 'annual_domain_cost', 'monthly_domain_cost')
+
+# Fields of a plan or addon that can be swept
+ITEM_FIELDS = ('price', 'probability')
+
+# Columns reported for every grid point, at the last month
+DEFAULT_METRICS = ('Total Revenue (Cumulative)', 'Total Monthly Revenue')
+
+
+def sweep_parameters(spec: ModelSpec) -> List[str]:
+    """Every parameter name that can be swept for a model"""
+    names = list(FEE_PARAMETERS)
+    for kind, items in (('plan', spec.plans), ('addon', spec.addons)):
+        names.extend(f"{kind}.{item['name']}.{field}" for item in items for field in ITEM_FIELDS)
+    return names
+
+
+def _item(definition: Dict[str, List[Dict]], name: str) -> Tuple[Dict, str]:
+    """The plan/addon dict and field a parameter name refers to"""
+    parts = name.split('.')
+    if len(parts) != 3 or parts[0] not in ('plan', 'addon') or parts[2] not in ITEM_FIELDS:
+        raise ValueError(
+            f"Unknown parameter '{name}', expected one of {FEE_PARAMETERS} "
+            f"or plan.<name>.<field> / addon.<name>.<field> with field in {ITEM_FIELDS}"
+        )
+    kind, item_name, field = parts
+    for item in definition[kind + 's']:
+        if item['name'] == item_name:
+            return item, field
+    names = [item['name'] for item in definition[kind + 's']]
+    raise ValueError(f"Unknown {kind} '{item_name}' in '{name}', expected one of {names}")
+
+
+def parameter_value(spec: ModelSpec, name: str) -> float:
+    """The model's own value of a parameter"""
+    if name in FEE_PARAMETERS:
+        return float(getattr(spec, name))
+    item, field = _item(spec.definition(), name)
+    # Plans without a probability are weighted equally, like compile_model does
+    return float(item.get(field, 1.0))
+
+
+def parse_range(text: str) -> Tuple[str, List[float]]:
+    """Parse a command line range.
+
+    NAME=START:STOP:COUNT gives COUNT evenly spaced values including both
+    ends, NAME=A,B,C lists the values and NAME=A is a single value.
+    """
+    name, sep, values = text.partition('=')
+    name = name.strip()
+    if not sep or not name or not values.strip():
+        raise ValueError(f"Expected NAME=START:STOP:COUNT or NAME=A,B,C, got '{text}'")
+    try:
+        if ':' in values:
+            if values.count(':') != 2:
+                raise ValueError("expected START:STOP:COUNT")
+            start, stop, count = values.split(':')
+            if int(count) < 1:
+                raise ValueError(f"COUNT must be positive in '{text}'")
+            return name, np.linspace(float(start), float(stop), int(count)).tolist()
+        return name, [float(v) for v in values.split(',')]
+    except ValueError as e:
+        raise ValueError(f"Invalid range '{text}': {e}") from None
+
+
+def apply_parameters(spec: ModelSpec, params: Dict[str, float]) -> ModelSpec:
+    """Compile a variant of `spec` with some parameters replaced"""
+    definition = spec.definition()
+    fees = {name: getattr(spec, name) for name in FEE_PARAMETERS}
+    for name, value in params.items():
+        if name in FEE_PARAMETERS:
+            fees[name] = value
+            continue
+        item, field = _item(definition, name)
+        if field == 'probability' and value < 0:
+            raise ValueError(f"{name} must not be negative, got {value}")
+        item[field] = value
+    return compile_model(definition, name=spec.name, **fees)
+
+
+class ParameterSweep:
+    """Evaluates a model over a grid of parameter values.
+
+    `ranges` maps parameter names to the values to try; the grid is their
+    Cartesian product. `trials=0` reports exact expected values, `trials > 0`
+    simulates that many trials per point from common random numbers drawn
+    with `seed`. Metrics are reported at the last of `months`.
+    """
+
+    def __init__(
+        self,
+        ranges: Dict[str, Sequence[float]],
+        customers_per_month: int,
+        months: int = MONTHS_TO_CALCULATE,
+        trials: int = 0,
+        seed: Optional[int] = None,
+        model: ModelLike = None,
+        metrics: Sequence[str] = DEFAULT_METRICS
+    ):
+        self.spec = get_spec(model)
+        valid = sweep_parameters(self.spec)
+        for name, values in ranges.items():
+            if name not in valid:
+                # Raises with the reason (unknown field, plan or addon)
+                _item(self.spec.definition(), name)
+            if not len(values):
+                raise ValueError(f"No values given for {name}")
+        if trials < 0:
+            raise ValueError(f"trials must not be negative, got {trials}")
+        columns = self.spec.schema.columns
+        for metric in metrics:
+            if metric not in columns or metric == "Month":
+                raise ValueError(f"Unknown metric '{metric}', expected one of {columns[1:]}")
+        self.ranges = {name: [float(v) for v in values] for name, values in ranges.items()}
+        self.customers_per_month = customers_per_month
+        self.months = months
+        self.trials = trials
+        # Fixed up front so every group of points replays the same draws
+        self.seed = seed if seed is not None else new_master_seed()
+        self.metrics = list(metrics)
+
+    @property
+    def size(self) -> int:
+        """Number of grid points"""
+        return int(np.prod([len(values) for values in self.ranges.values()]))
+
+    def baseline(self) -> Dict[str, float]:
+        """The model's own value of every swept parameter"""
+        return {name: parameter_value(self.spec, name) for name in self.ranges}
+
+    def points(self) -> List[Dict[str, float]]:
+        """Every grid point, varying the last parameter fastest"""
+        names = list(self.ranges)
+        return [dict(zip(names, values)) for values in product(*self.ranges.values())]
+
+    def run(self) -> pd.DataFrame:
+        """Evaluate the full grid as a tidy table, one row per point"""
+        return self.evaluate(self.points())
+
+    def evaluate(self, points: List[Dict[str, float]]) -> pd.DataFrame:
+        """Evaluate arbitrary points: parameter columns followed by the metrics.
+
+        Expected-value sweeps report '<metric>' and '<metric> (std)'; Monte
+        Carlo sweeps also report the 5th and 95th percentiles over trials.
+        """
+        # Points that share their probabilities share their cohort aggregates
+        groups: Dict[Tuple[Tuple[str, float], ...], List[int]] = {}
+        for i, point in enumerate(points):
+            key = tuple((name, value) for name, value in point.items() if name.endswith('.probability'))
+            groups.setdefault(key, []).append(i)
+
+        stats = {}
+        for key, indices in groups.items():
+            specs = [apply_parameters(self.spec, points[i]) for i in indices]
+            for i, values in zip(indices, self._evaluate_group(specs)):
+                stats[i] = values
+
+        return pd.DataFrame([{**point, **stats[i]} for i, point in enumerate(points)])
+
+    def _metric_weights(self, specs: List[ModelSpec]) -> np.ndarray:
+        """Weights of the metric columns per spec, shape (specs, 3, n_features, metrics)"""
+        idx = [self.spec.schema.index(metric) for metric in self.metrics]
+        return np.stack([spec.schema.weights[:, :, idx] for spec in specs])
+
+    def _evaluate_group(self, specs: List[ModelSpec]) -> List[Dict[str, float]]:
+        """Metric statistics of specs that differ only in prices and fees"""
+        weights = self._metric_weights(specs)
+        if self.trials:
+            values = self._simulate(specs[0], weights)
+            summary = {
+                '': values.mean(axis=1),
+                ' (std)': values.std(axis=1, ddof=1 if self.trials > 1 else 0),
+                ' (p5)': np.percentile(values, 5, axis=1),
+                ' (p95)': np.percentile(values, 95, axis=1),
+            }
+        else:
+            mean, variance = self._expected(specs[0], weights)
+            summary = {'': mean, ' (std)': np.sqrt(variance)}
+        return [
+            {
+                f"{metric}{suffix}": float(stat[p, k])
+                for k, metric in enumerate(self.metrics)
+                for suffix, stat in summary.items()
+            }
+            for p in range(len(specs))
+        ]
+
+    def _expected(self, spec: ModelSpec, weights: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Exact mean and variance at the last month, shape (specs, metrics).
+
+        Same closed form as `expected_revenue`, evaluated at one month for a
+        batch of weight matrices.
+        """
+        mean, cov = customer_moments(spec)
+        n, m = self.customers_per_month, float(self.months)
+        tri = m * (m + 1) / 2
+        sq = m * (m + 1) * (2 * m + 1) / 6
+        w_new, w_act, w_grow = weights[:, NEW], weights[:, ACTIVE], weights[:, GROWTH]
+
+        def lin(w: np.ndarray) -> np.ndarray:
+            return np.einsum('f,pfk->pk', mean, w)
+
+        def quad(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+            return np.einsum('pfk,fg,pgk->pk', a, cov, b)
+
+        expected = n * (m * lin(w_act) + lin(w_new) + tri * lin(w_grow))
+        variance = n * (
+            m * quad(w_act, w_act)
+            + quad(w_new, w_new)
+            + 2 * quad(w_act, w_new)
+            + 2 * tri * quad(w_act, w_grow)
+            + sq * quad(w_grow, w_grow)
+            + 2 * quad(w_new, w_grow)
+        )
+        return expected, np.maximum(variance, 0.0)
+
+    def _simulate(self, spec: ModelSpec, weights: np.ndarray) -> np.ndarray:
+        """Per-trial metrics at the last month, shape (specs, trials, metrics)"""
+        # Every group redraws the same uniforms from the seed (common random numbers)
+        rng = np.random.default_rng(self.seed)
+        months_paid = np.arange(self.months, 0, -1, dtype=np.float64)
+        values = []
+        for start, stop in self._chunks():
+            shape = (stop - start, self.months, self.customers_per_month)
+            features = sample_features(draw_uniforms(rng, shape, self.spec), spec)
+
+            # The last month's NEW, ACTIVE and GROWTH views of the aggregates
+            views = np.stack([
+                features[:, -1],
+                features.sum(axis=1),
+                np.einsum('m,tmf->tf', months_paid, features)
+            ])
+            values.append(np.einsum('vtf,pvfk->ptk', views, weights))
+        return np.concatenate(values, axis=1)
+
+    def _chunks(self) -> List[Tuple[int, int]]:
+        """(start, stop) of the chunks of trials drawn at once"""
+        per_trial = self.months * self.customers_per_month * (sum(self.spec.addon_slots) + 2)
+        chunk = max(1, MAX_UNIFORMS_PER_CHUNK // max(per_trial, 1))
+        return [(start, min(start + chunk, self.trials)) for start in range(0, self.trials, chunk)]
+
+    def tornado(self, metric: Optional[str] = None) -> pd.DataFrame:
+        """One-at-a-time sensitivity of a metric, largest swing first.
+
+        Each parameter is moved to the lowest and highest value of its range
+        while every other parameter keeps the model's own value.
+        """
+        metric = metric or self.metrics[0]
+        if metric not in self.metrics:
+            raise ValueError(f"Metric '{metric}' is not one of the sweep's metrics {self.metrics}")
+        baseline = self.baseline()
+        points = [dict(baseline)]
+        for name, values in self.ranges.items():
+            points.append({**baseline, name: min(values)})
+            points.append({**baseline, name: max(values)})
+        values = self.evaluate(points)[metric].to_numpy()
+
+        rows = []
+        for i, name in enumerate(self.ranges):
+            low, high = values[1 + 2 * i], values[2 + 2 * i]
+            rows.append({
+                'Parameter': name,
+                'Baseline Value': baseline[name],
+                'Low Value': min(self.ranges[name]),
+                'High Value': max(self.ranges[name]),
+                'Baseline': values[0],
+                'At Low': low,
+                'At High': high,
+                'Swing': abs(high - low),
+            })
+        df = pd.DataFrame(rows)
+        return df.sort_values('Swing', ascending=False, ignore_index=True)
@@ -0,0 +1,17 @@
+import pytest
+
+from revenue_calculator import RevenueCalculator
+
+
+def test_customer_record_upsells_are_read_only():
+    calculator = RevenueCalculator(5, 6, seed=1, model='web_design')
+    calculator.calculate_revenue()
+    record = calculator.customers[3]
+    quantities = calculator.customers.quantities.copy()
+    revenue = record.monthly_revenue
+    with pytest.raises(ValueError, match="read-only"):
+        record.upsells.add_upsell('analytics')
+    assert (calculator.customers.quantities == quantities).all()
+    assert record.monthly_revenue == revenue
+    # The table itself still accepts new customers
+    assert calculator.customers.quantities.flags.writeable
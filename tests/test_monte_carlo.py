@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+import monte_carlo
+from model_spec import get_spec
+from monte_carlo import MonteCarloEngine
+
+MODELS = ['web_design', 'buddy']
+
+
+@pytest.mark.parametrize('model', MODELS)
+def test_antithetic_pairs_survive_a_chunk_size_of_one(model, monkeypatch):
+    monkeypatch.setattr(monte_carlo, 'MAX_UNIFORMS_PER_CHUNK', 1)
+    engine = MonteCarloEngine(3, 4, seed=5, spec=get_spec(model), sampling='antithetic')
+    assert engine._chunks(6) == [(0, 2), (2, 4), (4, 6)]
+    assert engine._chunks(5) == [(0, 2), (2, 4), (4, 5)]
+
+    drawn = []
+    sample_features = monte_carlo.sample_features
+
+    def record(uniforms, spec):
+        drawn.append(uniforms)
+        return sample_features(uniforms, spec)
+
+    monkeypatch.setattr(monte_carlo, 'sample_features', record)
+    engine.run(6)
+    for uniforms in drawn:
+        arrays = uniforms.addons + uniforms.groups
+        if uniforms.plan is not None:
+            arrays.append(uniforms.plan)
+        for u in arrays:
+            assert len(u) == 2
+            np.testing.assert_array_equal(u[1], 1.0 - u[0])
@@ -0,0 +1,98 @@
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from model_spec import get_spec
+from revenue_calculator import RevenueCalculator
+from scale_sampling import (BLOCK_CUSTOMERS, FLOAT32_UNIFORM_STEP, ChunkedCohortSampler,
+                            float32_probability_bias)
+from validation import ENGINES, KS_DECIMALS, ks_test, welch_test
+
+MODELS = ['web_design', 'buddy']
+
+
+@pytest.mark.parametrize('model', MODELS)
+def test_float32_probability_bias_is_within_the_grid(model):
+    spec = get_spec(model)
+    bias = float32_probability_bias(spec)
+    assert 0 <= bias <= FLOAT32_UNIFORM_STEP
+    # Every probability is selected by the grid points below it
+    grid = 1 / FLOAT32_UNIFORM_STEP
+    for p in spec.addon_probs:
+        assert abs(np.ceil(p * grid) / grid - p) <= bias
+
+
+def test_float32_uniforms_lie_on_the_grid():
+    u = np.random.default_rng(0).random(100_000, dtype=np.float32).astype(np.float64)
+    steps = u / FLOAT32_UNIFORM_STEP
+    np.testing.assert_array_equal(steps, np.round(steps))
+
+
+@pytest.mark.parametrize('model', MODELS)
+def test_memory_limit_below_one_block_is_rejected(model):
+    spec = get_spec(model)
+    sampler = ChunkedCohortSampler(10, seed=1, spec=spec)
+    block_bytes = BLOCK_CUSTOMERS * sampler.bytes_per_customer
+    with pytest.raises(ValueError, match="below the minimum"):
+        ChunkedCohortSampler(10, seed=1, spec=spec, memory_limit=block_bytes - 1)
+    with pytest.raises(ValueError, match="below the minimum"):
+        RevenueCalculator(10, 3, mode='scale', seed=1, model=spec,
+                          memory_limit=block_bytes - 1).calculate_results()
+
+
+def test_unsupported_dtype_is_rejected():
+    with pytest.raises(ValueError, match="Unsupported dtype"):
+        ChunkedCohortSampler(10, seed=1, dtype=np.float16)
+
+
+@pytest.mark.parametrize('model', MODELS)
+@pytest.mark.parametrize('dtype', ['float32', 'float64'])
+def test_working_memory_stays_within_the_limit(model, dtype):
+    spec = get_spec(model)
+    customers = 3 * BLOCK_CUSTOMERS + 5
+    probe = ChunkedCohortSampler(customers, seed=1, spec=spec, dtype=dtype)
+    limit = 2 * BLOCK_CUSTOMERS * probe.bytes_per_customer
+    sampler = ChunkedCohortSampler(customers, seed=1, spec=spec, dtype=dtype, memory_limit=limit)
+    assert sampler.chunk_customers == 2 * BLOCK_CUSTOMERS
+    assert sampler.working_set_bytes() <= limit
+    tracemalloc.start()
+    try:
+        sampler.sample(2)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert peak <= limit
+
+
+@pytest.mark.parametrize('model', MODELS)
+@pytest.mark.parametrize('dtype', ['float32', 'float64'])
+def test_results_do_not_depend_on_the_memory_limit(model, dtype):
+    spec = get_spec(model)
+    customers = 3 * BLOCK_CUSTOMERS + 5
+    smallest = BLOCK_CUSTOMERS * ChunkedCohortSampler(customers, spec=spec, dtype=dtype).bytes_per_customer
+    results = [
+        RevenueCalculator(customers, 3, mode='scale', seed=5, model=spec, memory_limit=limit,
+                          scale_dtype=dtype).calculate_results()
+        for limit in (smallest, 3 * smallest, None)
+    ]
+    for other in results[1:]:
+        for column in results[0].columns:
+            np.testing.assert_array_equal(results[0][column], other[column])
+
+
+@pytest.mark.parametrize('model', MODELS)
+def test_float32_and_float64_paths_agree(model):
+    spec = get_spec(model)
+    customers, months, trials = 20, 12, 400
+    float32 = ENGINES['scale'](customers, months, trials, 11, spec)[:, -1]
+    float64 = ENGINES['scale_float64'](customers, months, trials, 12, spec)[:, -1]
+    varying = float64.std(axis=0) > 0
+    # Columns that never vary must match exactly
+    np.testing.assert_array_equal(float32[:, ~varying], float64[:, ~varying])
+    # Means and distributions of the last month agree (Bonferroni over both tests)
+    alpha = 0.001 / (2 * varying.sum())
+    _, p = welch_test(float32[:, varying], float64[:, varying])
+    assert (p >= alpha).all()
+    for k in np.flatnonzero(varying):
+        assert ks_test(np.round(float32[:, k], KS_DECIMALS), np.round(float64[:, k], KS_DECIMALS))[1] >= alpha
@@ -0,0 +1,85 @@
+import random
+
+import numpy as np
+import pytest
+
+from model_spec import get_spec
+from monte_carlo import MonteCarloEngine
+from sharding import load_partials, merge_partials, plan_shards, run_shards
+
+MASTER_SEED = 7
+TRIALS = 40
+SHARDS = 4
+MONTHS = 12
+MODELS = ['web_design', 'buddy']
+SCENARIOS = {'2 customers per month': 2, '5 customers per month': 5}
+
+
+def assert_same_summaries(a, b):
+    assert list(a) == list(b)
+    for model in a:
+        assert list(a[model]) == list(b[model])
+        for scenario, summary in a[model].items():
+            other = b[model][scenario]
+            assert summary.trials == other.trials
+            np.testing.assert_array_equal(summary.moments.mean, other.moments.mean)
+            np.testing.assert_array_equal(summary.moments.m2, other.moments.m2)
+            for q in (5, 50, 95):
+                np.testing.assert_array_equal(summary.sketch.quantile(q), other.sketch.quantile(q))
+
+
+@pytest.fixture(scope='module')
+def jobs():
+    return plan_shards(MASTER_SEED, TRIALS, SHARDS, MODELS, SCENARIOS, MONTHS)
+
+
+@pytest.fixture(scope='module')
+def serial_paths(jobs, tmp_path_factory):
+    return run_shards(jobs, str(tmp_path_factory.mktemp('serial')))
+
+
+def test_process_pool_matches_serial_run(jobs, serial_paths, tmp_path):
+    pool_paths = run_shards(jobs, str(tmp_path), workers=2)
+    assert_same_summaries(merge_partials(load_partials(pool_paths)),
+                          merge_partials(load_partials(serial_paths)))
+
+
+def test_merge_order_does_not_matter(serial_paths):
+    expected = merge_partials(load_partials(serial_paths))
+    rng = random.Random(0)
+    for _ in range(3):
+        paths = list(serial_paths)
+        rng.shuffle(paths)
+        assert_same_summaries(merge_partials(load_partials(paths)), expected)
+
+
+def test_merged_statistics_match_the_shard_plan_run_in_one_process(jobs, serial_paths):
+    merged = merge_partials(load_partials(serial_paths))
+    for model in MODELS:
+        for scenario, rate in SCENARIOS.items():
+            shard_jobs = sorted((j for j in jobs if j.model == model and j.scenario == scenario),
+                                key=lambda j: j.shard)
+            values = np.concatenate([
+                MonteCarloEngine(rate, MONTHS, seed=job.seed, spec=get_spec(model))
+                .run(job.trial_range[1] - job.trial_range[0]).values
+                for job in shard_jobs
+            ])
+            summary = merged[model][scenario]
+            assert summary.trials == TRIALS
+            np.testing.assert_allclose(summary.moments.mean, values.mean(axis=0), rtol=1e-12, atol=1e-9)
+            np.testing.assert_allclose(summary.moments.variance(), values.var(axis=0, ddof=1),
+                                       rtol=1e-9, atol=1e-6)
+
+
+def test_subset_of_shards_can_be_merged(serial_paths):
+    partials = [p for p in load_partials(serial_paths) if p.metadata['shard'] in (0, 2)]
+    merged = merge_partials(partials)
+    summary = merged['buddy']['2 customers per month']
+    assert summary.metadata['merged_shards'] == [0, 2]
+    assert summary.trials == TRIALS // SHARDS * 2
+
+
+def test_duplicate_shards_are_rejected(serial_paths):
+    partials = load_partials(serial_paths)
+    with pytest.raises(ValueError, match="Duplicate shards"):
+        merge_partials(partials + partials[:1])
@@ -0,0 +1,41 @@
+import pandas as pd
+import pytest
+
+import sweep
+from sweep import ParameterSweep
+
+RANGES = {'setup_fee': [1500, 3000], 'addon.analytics.probability': [0.1, 0.4]}
+
+
+def _sweep(seed=7):
+    return ParameterSweep(RANGES, 4, months=12, trials=50, seed=seed, model='web_design')
+
+
+def test_trials_are_drawn_in_chunks_below_the_cap(monkeypatch):
+    monkeypatch.setattr(sweep, 'MAX_UNIFORMS_PER_CHUNK', 2000)
+    drawn = []
+    draw_uniforms = sweep.draw_uniforms
+
+    def record(rng, shape, spec):
+        drawn.append(shape)
+        return draw_uniforms(rng, shape, spec)
+
+    monkeypatch.setattr(sweep, 'draw_uniforms', record)
+    grid = _sweep()
+    per_trial = grid.months * grid.customers_per_month * (sum(grid.spec.addon_slots) + 2)
+    grid.run()
+    assert len(drawn) > 2
+    assert all(shape[0] * per_trial <= 2000 for shape in drawn)
+    # Both probability groups draw the full set of trials
+    assert sum(shape[0] for shape in drawn) == 2 * grid.trials
+
+
+@pytest.mark.parametrize('seed', [7, None])
+def test_groups_share_draws_across_chunks(monkeypatch, seed):
+    monkeypatch.setattr(sweep, 'MAX_UNIFORMS_PER_CHUNK', 2000)
+    grid = _sweep(seed)
+    points = grid.points()
+    together = grid.evaluate(points)
+    # Each point evaluated on its own sees the same draws as in the full grid
+    alone = pd.concat([grid.evaluate([point]) for point in points], ignore_index=True)
+    pd.testing.assert_frame_equal(together, alone)
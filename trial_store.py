@@ -0,0 +1,221 @@
+"""
+Out-of-core storage of every Monte Carlo trial.
+
+A TrialStore is a directory holding
+
+    meta.json    columns, shape, dtype and a description of the run
+    values.npy   one (trials, months, columns) array, memory-mapped
+
+The engine writes straight into the mapped array chunk by chunk, so a run
+never needs all trials in RAM. Reopening a store maps the file again, so it
+costs the same however many trials it holds and nothing is parsed beyond
+the two headers. Slices by trial, month or column are zero-copy views of
+the mapped file.
+"""
+import json
+import os
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+if TYPE_CHECKING:
+    from monte_carlo import MonteCarloResult
+    from streaming_stats import TrialSummary
+
+__all__ = ['TrialStore']
+
+# Bump when the on-disk layout changes
+STORE_FORMAT_VERSION = 1
+
+# Trials read at a time by the chunked aggregations (~32 MB of float64 per chunk)
+DEFAULT_CHUNK_VALUES = 4_000_000
+
+Index = Union[int, slice, Sequence[int], np.ndarray, None]
+
+
+class TrialStore:
+    """Memory-mapped (trials, months, columns) array of trial results with its schema"""
+
+    META_FILE = 'meta.json'
+    VALUES_FILE = 'values.npy'
+
+    def __init__(self, path: str, meta: Dict[str, Any], values: np.ndarray):
+        self.path = path
+        self.meta = meta
+        self.values = values
+        self.columns: List[str] = list(meta['columns'])
+        self._column_index = {name: i for i, name in enumerate(self.columns)}
+
+    @classmethod
+    def create(cls, path: str, columns: Sequence[str], months: int, trials: int,
+               dtype: Any = np.float64, metadata: Optional[Dict[str, Any]] = None) -> 'TrialStore':
+        """Create an empty store of `trials` trials, to be filled with `write`"""
+        os.makedirs(path, exist_ok=True)
+        values = np.lib.format.open_memmap(
+            os.path.join(path, cls.VALUES_FILE), mode='w+', dtype=dtype,
+            shape=(trials, months, len(columns))
+        )
+        meta = {
+            'format': STORE_FORMAT_VERSION,
+            'columns': list(columns),
+            'trials': trials,
+            'months': months,
+            'dtype': np.dtype(dtype).name,
+            'trials_written': 0,
+            'complete': False,
+            'metadata': metadata or {},
+        }
+        store = cls(path, meta, values)
+        store._write_meta()
+        return store
+
+    @classmethod
+    def open(cls, path: str, writable: bool = False) -> 'TrialStore':
+        """Map an existing store (read-only unless `writable`)"""
+        with open(os.path.join(path, cls.META_FILE)) as f:
+            meta = json.load(f)
+        if meta.get('format') != STORE_FORMAT_VERSION:
+            raise ValueError(f"Unsupported trial store format {meta.get('format')} in {path}")
+        values = np.load(os.path.join(path, cls.VALUES_FILE), mmap_mode='r+' if writable else 'r')
+        expected = (meta['trials'], meta['months'], len(meta['columns']))
+        if values.shape != expected:
+            raise ValueError(f"{path} holds an array of shape {values.shape}, expected {expected}")
+        return cls(path, meta, values)
+
+    def _write_meta(self) -> None:
+        tmp_path = os.path.join(self.path, self.META_FILE + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(self.meta, f, indent=2)
+        os.replace(tmp_path, os.path.join(self.path, self.META_FILE))
+
+    # Writing
+
+    def write(self, start: int, values: np.ndarray) -> None:
+        """Store trials [start, start + len(values))"""
+        stop = start + len(values)
+        if not 0 <= start <= stop <= self.trials:
+            raise ValueError(f"Trials {start}..{stop} are outside 0..{self.trials}")
+        self.values[start:stop] = values
+        self.meta['trials_written'] = max(self.meta['trials_written'], stop)
+
+    def close(self) -> None:
+        """Flush the values to disk and mark the store complete"""
+        if isinstance(self.values, np.memmap) and self.values.mode != 'r':
+            self.values.flush()
+            self.meta['complete'] = self.meta['trials_written'] == self.trials
+            self._write_meta()
+
+    # Shape and schema
+
+    @property
+    def trials(self) -> int:
+        return self.values.shape[0]
+
+    @property
+    def months(self) -> int:
+        return self.values.shape[1]
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        """Description of the run that filled the store"""
+        return self.meta['metadata']
+
+    def column_index(self, column: str) -> int:
+        try:
+            return self._column_index[column]
+        except KeyError:
+            raise ValueError(f"Unknown column '{column}', expected one of {self.columns}") from None
+
+    # Reading
+
+    def column(self, column: str) -> np.ndarray:
+        """Every trial of one column (stream), shape (trials, months); a view"""
+        return self.values[:, :, self.column_index(column)]
+
+    def month(self, month: int) -> np.ndarray:
+        """Every trial of one month (1-based), shape (trials, columns); a view"""
+        if not 1 <= month <= self.months:
+            raise ValueError(f"Month {month} is outside 1..{self.months}")
+        return self.values[:, month - 1, :]
+
+    def trial(self, trial: int) -> pd.DataFrame:
+        """One trial's monthly table, like `RevenueCalculator.calculate_revenue` without rounding"""
+        return pd.DataFrame(np.asarray(self.values[trial]), columns=self.columns)
+
+    def select(self, trials: Index = None, months: Index = None,
+               columns: Union[str, Sequence[str], None] = None) -> np.ndarray:
+        """Slice by trial (0-based index), month and column names.
+
+        Months are numbered from 1, like in `month()` and the reports; a
+        slice is half-open on month numbers, so slice(1, 13) selects months
+        1-12. Integers and slices give zero-copy views; lists of indices,
+        months or names copy the selected values.
+        """
+        months = self._month_index(months)
+        if isinstance(columns, str):
+            columns = self.column_index(columns)
+        elif columns is not None:
+            columns = [self.column_index(c) for c in columns]
+        view = self.values
+        axis = 0
+        # Index one axis at a time so lists on several axes do not broadcast together
+        for index in (trials, months, columns):
+            if index is not None:
+                view = view[(slice(None),) * axis + (index,)]
+            # An integer removes its axis
+            if not isinstance(index, (int, np.integer)):
+                axis += 1
+        return view
+
+    def _month_index(self, months: Index) -> Index:
+        """0-based array index of months numbered from 1"""
+        if months is None:
+            return None
+        if isinstance(months, slice):
+            for bound in (months.start, months.stop):
+                if bound is not None and not 1 <= bound <= self.months + 1:
+                    raise ValueError(f"Month slice bound {bound} is outside 1..{self.months + 1}")
+            return slice(None if months.start is None else months.start - 1,
+                         None if months.stop is None else months.stop - 1, months.step)
+        index = np.asarray(months)
+        if index.size and (index.min() < 1 or index.max() > self.months):
+            raise ValueError(f"Months {index.tolist()} are outside 1..{self.months}")
+        return int(index) - 1 if index.ndim == 0 else index - 1
+
+    def iter_chunks(self, chunk_trials: Optional[int] = None) -> Iterator[Tuple[int, np.ndarray]]:
+        """Yield (first trial, view) over the written trials, a chunk at a time"""
+        if chunk_trials is None:
+            chunk_trials = max(1, DEFAULT_CHUNK_VALUES // max(self.months * len(self.columns), 1))
+        written = self.meta['trials_written']
+        for start in range(0, written, chunk_trials):
+            yield start, self.values[start:min(start + chunk_trials, written)]
+
+    # Aggregation
+
+    def result(self) -> 'MonteCarloResult':
+        """The written trials as a MonteCarloResult backed by the mapped file (no copy)"""
+        from monte_carlo import MonteCarloResult
+        return MonteCarloResult(self.columns, self.values[:self.meta['trials_written']])
+
+    def mean(self) -> pd.DataFrame:
+        """Per-month mean of every column, accumulated chunk by chunk"""
+        total = np.zeros((self.months, len(self.columns)))
+        for _, chunk in self.iter_chunks():
+            total += chunk.sum(axis=0, dtype=np.float64)
+        df = pd.DataFrame(total / max(self.meta['trials_written'], 1), columns=self.columns)
+        df["Month"] = np.arange(1, self.months + 1)
+        return df
+
+    def summarize(self, relative_accuracy: float = 0.01, chunk_trials: Optional[int] = None) -> 'TrialSummary':
+        """Streaming statistics (mean, variance, percentile bands) of the written trials.
+
+        The result can be passed to `ChartGenerator.generate_fan_charts` and
+        `ExcelGenerator.generate_excel(summaries=...)`.
+        """
+        from streaming_stats import TrialSummary
+        summary = TrialSummary(self.columns, self.months, relative_accuracy)
+        summary.metadata = dict(self.metadata)
+        for _, chunk in self.iter_chunks(chunk_trials):
+            summary.update(np.asarray(chunk, dtype=np.float64))
+        return summary
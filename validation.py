@@ -0,0 +1,468 @@
+"""
+Statistical equivalence harness between the reference and the fast engines.
+
+The reference is the per-customer engine, `RevenueCalculator._process_month`
+with `generate_customer_upsells`: plan draw, one draw per addon quantity
+slot, the random reset of mutually exclusive services (e.g. SEO), the
+`max_quantity` clamping of `add_upsell` and the domain costs subtracted in
+`calculate_monthly_upsell_total` and `calculate_one_time_fees`. Every fast
+engine has to reproduce it.
+
+Two kinds of checks are run:
+  - exact checks where seeds allow them. The reference's random stream is
+    recorded and replayed through the vectorized engine's `sample_features`,
+    which must give exactly the same cohorts, and the column schema must
+    turn those into the reference's columns. Entry points that share a seed
+    (e.g. `simulate_trials` and `MonteCarloEngine.run`) must agree bit for
+    bit.
+    The 'scale' engine must not depend on its memory cap, must stay within
+    it, and its float32 uniforms must bias no probability by more than
+    their 2^-24 grid.
+  - statistical tests of every engine in ENGINES against independent
+    reference trials: Welch's t-test on the per-column means and a two-sample
+    Kolmogorov-Smirnov test on their distributions at the checked months, and
+    a z-test of the reference means against the closed-form expected values.
+    The float32 'scale' engine and its float64 variant are both tested, so a
+    precision loss of the compact dtype would show up as a failure of the
+    former only.
+    p-values use large-sample approximations and a Bonferroni correction, so
+    the whole suite falsely fails with probability at most `alpha`.
+
+Usage:
+    python validation.py                                   # every model, default settings
+    python validation.py --model web_design --customers 4 --trials 2000 --seed 1
+"""
+import argparse
+import random
+import sys
+import tempfile
+import tracemalloc
+from math import exp, sqrt
+from statistics import NormalDist
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config import MONTHS_TO_CALCULATE, MODELS
+from count_sampling import CohortCountSampler
+from expected_value import expected_revenue
+from model_spec import ModelSpec, get_spec
+from models import CustomerTable, CustomerUpsells
+from monte_carlo import CustomerUniforms, MonteCarloEngine, sample_features, simulate_scenarios
+from revenue_calculator import RevenueCalculator
+from scale_sampling import (BLOCK_CUSTOMERS, FLOAT32_UNIFORM_STEP, ChunkedCohortSampler,
+                            float32_probability_bias)
+from seeding import derive_seed, new_master_seed
+from sweep import apply_parameters
+
+__all__ = [
+    'ENGINES',
+    'welch_test',
+    'ks_test',
+    'RecordingRandom',
+    'reference_trials',
+    'cohort_features',
+    'replay_uniforms',
+    'exact_checks',
+    'compare_engines'
+]
+
+# Chance that the statistical tests of one validation fail although every engine is correct
+DEFAULT_ALPHA = 0.001
+
+# Largest relative difference allowed where only the floating point summation order differs
+SUMMATION_TOLERANCE = 1e-9
+
+# Decimals kept before comparing distributions; engines that sum the same prices
+# in another order must tie rather than differ by rounding noise
+KS_DECIMALS = 6
+
+_NORMAL = NormalDist()
+
+# An engine simulates `trials` runs: (customers_per_month, months, trials, seed, spec)
+# -> array of shape (trials, months, columns) in the schema's column order
+Engine = Callable[[int, int, int, int, ModelSpec], np.ndarray]
+
+
+def _monte_carlo(customers: int, months: int, trials: int, seed: int, spec: ModelSpec) -> np.ndarray:
+    return MonteCarloEngine(customers, months, seed=seed, spec=spec).run(trials).values
+
+
+def _counts(customers: int, months: int, trials: int, seed: int, spec: ModelSpec) -> np.ndarray:
+    sampler = CohortCountSampler(customers, np.random.default_rng(seed), spec=spec)
+    return spec.schema.evaluate(sampler.sample((trials, months)))
+
+
+def _scale(dtype: str) -> Engine:
+    def engine(customers: int, months: int, trials: int, seed: int, spec: ModelSpec) -> np.ndarray:
+        features = np.stack([
+            ChunkedCohortSampler(customers, derive_seed(seed, trial), spec=spec, dtype=dtype).sample(months)
+            for trial in range(trials)
+        ])
+        return spec.schema.evaluate(features)
+    return engine
+
+
+# Fast engines checked against the reference
+ENGINES: Dict[str, Engine] = {
+    'monte_carlo': _monte_carlo,
+    'counts': _counts,
+    'scale': _scale('float32'),
+    'scale_float64': _scale('float64'),
+}
+
+
+def welch_test(a: np.ndarray, b: np.ndarray) -> Tuple[float, float]:
+    """Welch's t statistic and two-sided p-value of equal means along axis 0.
+
+    The p-value uses the normal approximation of the t distribution, which is
+    accurate for the hundreds of trials the harness runs.
+    """
+    var_a, var_b = a.var(axis=0, ddof=1), b.var(axis=0, ddof=1)
+    diff = a.mean(axis=0) - b.mean(axis=0)
+    se = np.sqrt(var_a / len(a) + var_b / len(b))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = np.where(se > 0, diff / se, np.where(np.isclose(diff, 0.0), 0.0, np.inf))
+    p = np.array([2.0 * (1.0 - _NORMAL.cdf(abs(x))) if np.isfinite(x) else 0.0 for x in np.ravel(t)])
+    return t, p.reshape(np.shape(t))
+
+
+def _kolmogorov_p(statistic: float, n: int, m: int) -> float:
+    """Asymptotic p-value of a two-sample KS statistic (Stephens' correction)"""
+    ne = n * m / (n + m)
+    lam = (sqrt(ne) + 0.12 + 0.11 / sqrt(ne)) * statistic
+    if lam < 0.2:
+        return 1.0
+    p = 2.0 * sum((-1) ** (k - 1) * exp(-2.0 * k * k * lam * lam) for k in range(1, 101))
+    return float(min(max(p, 0.0), 1.0))
+
+
+def ks_test(a: np.ndarray, b: np.ndarray) -> Tuple[float, float]:
+    """Two-sample Kolmogorov-Smirnov statistic and p-value of two 1-D samples.
+
+    The revenue columns are discrete, for which the asymptotic p-value is
+    conservative.
+    """
+    a, b = np.sort(a), np.sort(b)
+    points = np.concatenate([a, b])
+    cdf_a = np.searchsorted(a, points, side='right') / len(a)
+    cdf_b = np.searchsorted(b, points, side='right') / len(b)
+    statistic = float(np.abs(cdf_a - cdf_b).max())
+    return statistic, _kolmogorov_p(statistic, len(a), len(b))
+
+
+class RecordingRandom:
+    """Records every draw the reference engine makes from a random.Random.
+
+    A wrapper rather than a subclass: overriding `random()` in a subclass
+    would make `choice()` draw through it, changing the stream.
+    """
+
+    def __init__(self, seed: int):
+        self._rng = random.Random(seed)
+        self.log: List[Tuple] = []
+
+    def random(self) -> float:
+        u = self._rng.random()
+        self.log.append(('random', u))
+        return u
+
+    def choices(self, population, weights=None, *, cum_weights=None, k=1):
+        # random.Random.choices only draws through self.random()
+        return random.Random.choices(self, population, weights, cum_weights=cum_weights, k=k)
+
+    def choice(self, seq):
+        selected = self._rng.choice(seq)
+        self.log.append(('choice', tuple(seq), list(seq).index(selected)))
+        return selected
+
+
+def _reference(customers: int, months: int, seed: int, spec: ModelSpec,
+               rng: Optional[random.Random] = None) -> RevenueCalculator:
+    calculator = RevenueCalculator(customers, months, seed=seed, model=spec)
+    if rng is not None:
+        calculator._random = rng
+    calculator.calculate_results()
+    return calculator
+
+
+def reference_trials(customers: int, months: int, trials: int, seed: int,
+                     spec: ModelSpec) -> np.ndarray:
+    """Run the reference engine `trials` times, shape (trials, months, columns)"""
+    columns = spec.schema.columns
+    values = np.empty((trials, months, len(columns)))
+    for i in range(trials):
+        results = _reference(customers, months, derive_seed(seed, 'reference', i), spec).results
+        values[i] = np.column_stack([results[column] for column in columns])
+    return values
+
+
+def cohort_features(customers: CustomerTable, months: int) -> np.ndarray:
+    """Per-month cohort aggregates of the reference's customers, in the schema's feature layout"""
+    spec = customers.spec
+    n = len(customers)
+    month = customers.month_joined[:n] - 1
+    features = np.zeros((months, spec.schema.n_features))
+    np.add.at(features[:, 0], month, 1)
+    if spec.n_plans:
+        np.add.at(features, (month, 1 + customers.plan_index[:n].astype(np.intp)), 1)
+    np.add.at(features[:, 1 + spec.n_plans:], month, customers.quantities[:n])
+    return features
+
+
+def replay_uniforms(log: List[Tuple], customers: int, months: int,
+                    spec: ModelSpec) -> Tuple[CustomerUniforms, int]:
+    """Turn a recorded reference run into the vectorized engine's uniforms.
+
+    Returns the uniforms of shape (months, customers) and the number of
+    exclusive-group resets replayed. A group tie-break that `random.choice`
+    resolved to service k becomes the uniform (k + 0.5) / len(group).
+    """
+    shape = (months, customers)
+    plan = np.empty(shape) if spec.n_plans else None
+    addons = [np.empty(shape + (slots,)) for slots in spec.addon_slots]
+    # Groups without a conflict are never drawn; any uniform replays them
+    groups = [np.full(shape, 0.5) for _ in spec.exclusive_groups]
+    group_of = {
+        tuple(spec.addon_names[i] for i in group): g for g, group in enumerate(spec.exclusive_groups)
+    }
+    events = iter(log)
+    pending = None
+    resets = 0
+
+    def next_random() -> float:
+        nonlocal pending
+        event = pending or next(events)
+        pending = None
+        if event[0] != 'random':
+            raise ValueError(f"Reference drew {event} where a uniform was expected")
+        return event[1]
+
+    for m in range(months):
+        for c in range(customers):
+            if plan is not None:
+                plan[m, c] = next_random()
+            for a, slots in enumerate(spec.addon_slots):
+                for s in range(slots):
+                    addons[a][m, c, s] = next_random()
+            # Tie-breaks follow the addon draws, one per conflicting group
+            for event in events:
+                if event[0] != 'choice':
+                    pending = event
+                    break
+                g = group_of[event[1]]
+                groups[g][m, c] = (event[2] + 0.5) / len(event[1])
+                resets += 1
+    if pending is not None or next(events, None) is not None:
+        raise ValueError("Reference drew more uniforms than the vectorized engine replays")
+    return CustomerUniforms(plan, addons, groups), resets
+
+
+def _max_relative_difference(a: np.ndarray, b: np.ndarray) -> float:
+    scale = np.maximum(np.maximum(np.abs(a), np.abs(b)), 1.0)
+    return float((np.abs(a - b) / scale).max())
+
+
+def exact_checks(customers: int, months: int, seed: int, spec: ModelSpec,
+                 replays: int = 20, trials: int = 50) -> pd.DataFrame:
+    """Checks that must hold exactly (up to summation order) for fixed seeds"""
+    rows = []
+
+    def check(name: str, passed: bool, detail: str) -> None:
+        rows.append({'Check': name, 'Passed': bool(passed), 'Detail': detail})
+
+    # Replay the reference's own draws through the vectorized engine, also with
+    # every addon at probability 0.5 so exclusive-group resets are common
+    stressed = apply_parameters(spec, {f"addon.{name}.probability": 0.5 for name in spec.addon_names})
+    for label, replay_spec in (('replay', spec), ('replay (addons at p=0.5)', stressed)):
+        features_equal = True
+        column_diff = 0.0
+        resets = 0
+        for r in range(replays):
+            rng = RecordingRandom(derive_seed(seed, label, r))
+            calculator = _reference(customers, months, None, replay_spec, rng)
+            reference = cohort_features(calculator.customers, months)
+            uniforms, replayed = replay_uniforms(rng.log, customers, months, replay_spec)
+            resets += replayed
+            features_equal &= np.array_equal(sample_features(uniforms, replay_spec), reference)
+            results = calculator.results
+            table = np.column_stack([results[column] for column in replay_spec.schema.columns])
+            column_diff = max(column_diff,
+                              _max_relative_difference(replay_spec.schema.evaluate(reference), table))
+        check(f"{label}: cohorts", features_equal,
+              f"{replays} reference runs replayed, {resets} exclusive-group resets")
+        check(f"{label}: columns", column_diff <= SUMMATION_TOLERANCE,
+              f"max relative difference {column_diff:.1e}")
+
+    # add_upsell never stores more than an addon's quantity slots
+    clamped = True
+    for name, slots, _ in spec.addon_draws:
+        upsells = CustomerUpsells(spec=spec)
+        upsells.add_upsell(name, slots + 2)
+        upsells.add_upsell(name, 1)
+        clamped &= upsells.get_quantity(name) == slots
+    check('add_upsell clamping', clamped, f"{spec.n_addons} addons")
+
+    # The reference is deterministic for a seed, whichever entry point runs it
+    run_seed = derive_seed(seed, 'rerun')
+    first = _reference(customers, months, run_seed, spec).results
+    second = RevenueCalculator(customers, months, seed=run_seed, model=spec)
+    list(second.iter_months())
+    check('reference: iter_months == calculate_results',
+          all(np.array_equal(first[c], second.results[c]) for c in first.columns), f"seed {run_seed}")
+
+    # Vectorized entry points that share a seed draw the same trials
+    mc_seed = derive_seed(seed, 'monte_carlo')
+    engine = MonteCarloEngine(customers, months, seed=mc_seed, spec=spec).run(trials).values
+    calculator = RevenueCalculator(customers, months, model=spec)
+    check('simulate_trials == MonteCarloEngine.run',
+          np.array_equal(calculator.simulate_trials(trials, seed=mc_seed).values, engine), f"seed {mc_seed}")
+    scenarios = simulate_scenarios({'scenario': customers}, trials, months, mc_seed, spec)
+    check('simulate_scenarios == MonteCarloEngine.run',
+          np.array_equal(scenarios['scenario'].values, engine), f"seed {mc_seed}")
+    with tempfile.TemporaryDirectory() as path:
+        store = calculator.store_trials(trials, path, seed=mc_seed)
+        check('store_trials == MonteCarloEngine.run', np.array_equal(store.values, engine), f"seed {mc_seed}")
+        del store
+
+    # Scale mode: a few chunks per month, results independent of the memory
+    # cap, working memory within it and float32 probabilities within 2^-24
+    scale_seed = derive_seed(seed, 'scale')
+    scale_customers = 3 * BLOCK_CUSTOMERS + customers
+    scale_months = min(months, 3)
+    small = ChunkedCohortSampler(scale_customers, scale_seed, spec=spec)
+    small = ChunkedCohortSampler(scale_customers, scale_seed, spec=spec,
+                                 memory_limit=BLOCK_CUSTOMERS * small.bytes_per_customer)
+    tracemalloc.start()
+    features = small.sample(scale_months)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    check('scale: within memory_limit', peak <= small.memory_limit,
+          f"peak {peak:,} of {small.memory_limit:,} bytes")
+    calculator = RevenueCalculator(scale_customers, scale_months, mode='scale', seed=scale_seed, model=spec)
+    results = calculator.calculate_results()
+    values = spec.schema.evaluate(features)
+    check('scale: independent of memory_limit',
+          all(np.array_equal(results[c], values[:, spec.schema.index(c)]) for c in spec.schema.columns),
+          f"{len(range(0, scale_customers, small.chunk_customers))} chunks vs 1 per month, seed {scale_seed}")
+    bias = float32_probability_bias(spec)
+    check('scale: float32 probability bias', bias <= FLOAT32_UNIFORM_STEP,
+          f"{bias:.1e} (grid {FLOAT32_UNIFORM_STEP:.1e})")
+    return pd.DataFrame(rows)
+
+
+def compare_engines(customers: int, months: int, trials: int, seed: int, spec: ModelSpec,
+                    engines: Sequence[str] = tuple(ENGINES), check_months: Optional[Sequence[int]] = None,
+                    alpha: float = DEFAULT_ALPHA) -> pd.DataFrame:
+    """Statistical tests of every engine against independent reference trials.
+
+    One row per engine, column, checked month (1-based; the middle and last
+    month by default) and test, with its statistic and p-value. A test
+    passes when its p-value is at least `alpha` divided by the number of
+    tests. Columns that never vary must match exactly.
+    """
+    check_months = sorted(set(check_months or (max(months // 2, 1), months)))
+    for month in check_months:
+        if not 1 <= month <= months:
+            raise ValueError(f"Month {month} is outside 1..{months}")
+    columns = [c for c in spec.schema.columns if c != "Month"]
+    idx = [spec.schema.index(c) for c in columns]
+    months_idx = [m - 1 for m in check_months]
+
+    reference = reference_trials(customers, months, trials, seed, spec)[:, months_idx][:, :, idx]
+    rows = []
+
+    def add(engine: str, test: str, k: int, j: int, statistic: float, p: float) -> None:
+        rows.append({'Engine': engine, 'Column': columns[k], 'Month': check_months[j],
+                     'Test': test, 'Statistic': float(statistic), 'p-value': float(p)})
+
+    constant = reference.std(axis=0) == 0
+    for name in engines:
+        values = ENGINES[name](customers, months, trials, derive_seed(seed, name), spec)
+        values = values[:, months_idx][:, :, idx]
+        t, p = welch_test(values, reference)
+        for j in range(len(check_months)):
+            for k in range(len(columns)):
+                if constant[j, k] and np.all(values[:, j, k] == reference[0, j, k]):
+                    add(name, 'exact', k, j, 0.0, 1.0)
+                    continue
+                add(name, 'welch', k, j, t[j, k], p[j, k])
+                add(name, 'ks', k, j, *ks_test(np.round(values[:, j, k], KS_DECIMALS),
+                                               np.round(reference[:, j, k], KS_DECIMALS)))
+
+    # The reference means against the closed-form expected values
+    mean, variance = expected_revenue(customers, months, spec)
+    for j, month in enumerate(check_months):
+        for k, column in enumerate(columns):
+            exact_mean = float(mean[column].iloc[month - 1])
+            se = sqrt(float(variance[column].iloc[month - 1]) / trials)
+            diff = reference[:, j, k].mean() - exact_mean
+            if se == 0:
+                z = 0.0 if abs(diff) <= SUMMATION_TOLERANCE * max(abs(exact_mean), 1.0) else np.inf
+            else:
+                z = diff / se
+            add('expected', 'z', k, j, z, 2.0 * (1.0 - _NORMAL.cdf(abs(z))) if np.isfinite(z) else 0.0)
+
+    table = pd.DataFrame(rows)
+    table['Passed'] = table['p-value'] >= alpha / len(table)
+    return table
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the fast engines against the reference engine")
+    parser.add_argument("--model", nargs='+', choices=list(MODELS), default=list(MODELS),
+                        metavar="MODEL", help=f"Models to validate (default: all of {list(MODELS)})")
+    parser.add_argument("--customers", type=int, default=4, help="Customers acquired per month (default: 4)")
+    parser.add_argument("--months", type=int, default=MONTHS_TO_CALCULATE,
+                        help=f"Months to simulate (default: {MONTHS_TO_CALCULATE})")
+    parser.add_argument("--trials", type=int, default=2000,
+                        help="Trials per engine for the statistical tests (default: 2000)")
+    parser.add_argument("--replays", type=int, default=20,
+                        help="Reference runs replayed exactly through the vectorized engine (default: 20)")
+    parser.add_argument("--engine", nargs='+', choices=list(ENGINES), default=list(ENGINES),
+                        metavar="ENGINE", help=f"Engines to test (default: all of {list(ENGINES)})")
+    parser.add_argument("--check-month", type=int, nargs='+', default=None, metavar="MONTH",
+                        help="Months whose distributions are tested (default: the middle and last month)")
+    parser.add_argument("--alpha", type=float, default=DEFAULT_ALPHA,
+                        help=f"Chance of a false failure of the statistical tests per model (default: {DEFAULT_ALPHA})")
+    parser.add_argument("--seed", type=int, default=None, help="Master seed")
+    parser.add_argument("--verbose", action="store_true", help="Print every statistical test")
+    args = parser.parse_args(argv)
+    if args.trials < 2:
+        parser.error(f"--trials must be at least 2, got {args.trials}")
+
+    master = args.seed if args.seed is not None else new_master_seed()
+    print(f"{args.customers} customers per month, {args.months} months, {args.trials} trials, master seed {master}")
+    failed = False
+    with pd.option_context('display.width', 200, 'display.max_columns', None, 'display.max_rows', None):
+        for model in args.model:
+            spec = get_spec(model)
+            seed = derive_seed(master, model)
+            print(f"\n== {model}: exact checks ==")
+            exact = exact_checks(args.customers, args.months, seed, spec, args.replays)
+            print(exact.to_string(index=False))
+
+            print(f"\n== {model}: statistical tests ==")
+            try:
+                tests = compare_engines(args.customers, args.months, args.trials, seed, spec,
+                                        args.engine, args.check_month, args.alpha)
+            except ValueError as e:
+                parser.error(str(e))
+            summary = tests.groupby(['Engine', 'Test'], sort=False).agg(
+                Tests=('Passed', 'size'), Failed=('Passed', lambda passed: int((~passed).sum())),
+                MinP=('p-value', 'min')
+            ).reset_index().rename(columns={'MinP': 'Min p-value'})
+            print(summary.to_string(index=False))
+            shown = tests if args.verbose else tests[~tests['Passed']]
+            if len(shown):
+                print(shown.to_string(index=False))
+            failed |= not exact['Passed'].all() or not tests['Passed'].all()
+
+    print("\nFAILED" if failed else "\nAll checks passed")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()